@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BINS = 200
+DEFAULT_GRID = (80, 60)
+
+
+def _finite(values, log=False):
+    values = np.asarray(values, dtype=float)
+    keep = np.isfinite(values)
+    if log:
+        keep &= values > 0
+    return values[keep]
+
+
+def histogram_edges(values, max_bins=DEFAULT_MAX_BINS, log=False):
+    """
+    Adaptive bin edges: numpy's "auto" rule (Freedman-Diaconis / Sturges), capped at
+    `max_bins`. With `log`, bins are equally wide in log10 space (stretch spans decades).
+    """
+    values = _finite(values, log)
+    if len(values) == 0:
+        return np.array([0.0, 1.0])
+    if log:
+        values = np.log10(values)
+    lo, hi = float(values.min()), float(values.max())
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.histogram_bin_edges(values, bins="auto", range=(lo, hi))
+    if len(edges) - 1 > max_bins:
+        edges = np.linspace(lo, hi, max_bins + 1)
+    return 10 ** edges if log else edges
+
+
+def _bin_index(values, edges):
+    """Bin of each value (last edge inclusive, as np.histogram); -1 outside the edges or NaN."""
+    index = np.searchsorted(edges, values, side="right") - 1
+    index[values == edges[-1]] = len(edges) - 2
+    index[~((values >= edges[0]) & (values <= edges[-1]))] = -1
+    return index
+
+
+def _centers(edges, index, log):
+    left, right = edges[index], edges[index + 1]
+    return np.sqrt(left * right) if log else (left + right) / 2
+
+
+def _group_codes(df, group_col):
+    if group_col is None:
+        return np.zeros(len(df), dtype=np.int64), [None]
+    codes, names = pd.factorize(df[group_col], sort=True)
+    return codes, list(names)
+
+
+def grouped_histogram(df, column, group_col=None, edges=None, max_bins=DEFAULT_MAX_BINS, log=False):
+    """
+    Counts of `column` per bin (and per `group_col`), with one bincount over all rows.
+
+    All groups share the same edges so overlaid histograms stay comparable. Returns
+    the non-empty bins as a DataFrame [group_col, left, right, center, count].
+    """
+    values = df[column].to_numpy(dtype=float)
+    if edges is None:
+        edges = histogram_edges(values, max_bins, log)
+    nb_bins = len(edges) - 1
+    codes, names = _group_codes(df, group_col)
+    bins = _bin_index(values, edges)
+    valid = (bins >= 0) & (codes >= 0)
+    counts = np.bincount(codes[valid] * nb_bins + bins[valid], minlength=len(names) * nb_bins)
+
+    cells = np.flatnonzero(counts)
+    group, bin_index = np.divmod(cells, nb_bins)
+    result = pd.DataFrame({
+        "left": edges[bin_index],
+        "right": edges[bin_index + 1],
+        "center": _centers(edges, bin_index, log),
+        "count": counts[cells]
+    })
+    if group_col is not None:
+        result.insert(0, group_col, np.asarray(names, dtype=object)[group])
+    return result
+
+
+def density_grid(df, x, y, group_col=None, bins=DEFAULT_GRID, log_x=False, log_y=False, value=None):
+    """
+    2D histogram of (`x`, `y`) per `group_col` on shared adaptive edges.
+
+    Returns the non-empty cells as [group_col, x, y, count] with cell centers (geometric
+    centers on log axes), plus the mean of `value` per cell when given. The figure then
+    carries one mark per occupied cell instead of one per job.
+    """
+    x_values = df[x].to_numpy(dtype=float)
+    y_values = df[y].to_numpy(dtype=float)
+    x_edges = histogram_edges(x_values, bins[0], log_x)
+    y_edges = histogram_edges(y_values, bins[1], log_y)
+    nx, ny = len(x_edges) - 1, len(y_edges) - 1
+    codes, names = _group_codes(df, group_col)
+    xi, yi = _bin_index(x_values, x_edges), _bin_index(y_values, y_edges)
+    valid = (xi >= 0) & (yi >= 0) & (codes >= 0)
+    flat = (codes[valid] * nx + xi[valid]) * ny + yi[valid]
+    size = len(names) * nx * ny
+    counts = np.bincount(flat, minlength=size)
+
+    cells = np.flatnonzero(counts)
+    group, rest = np.divmod(cells, nx * ny)
+    cx, cy = np.divmod(rest, ny)
+    result = pd.DataFrame({
+        x: _centers(x_edges, cx, log_x),
+        y: _centers(y_edges, cy, log_y),
+        "count": counts[cells]
+    })
+    if value is not None:
+        sums = np.bincount(flat, weights=df[value].to_numpy(dtype=float)[valid], minlength=size)
+        result[value] = sums[cells] / counts[cells]
+    if group_col is not None:
+        result.insert(0, group_col, np.asarray(names, dtype=object)[group])
+    return result
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from bisect import insort
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("batsim_protocol")
+
+# Upper bound on REGISTER_JOB events packed into a single reply. Batsim parses
+# the whole reply before answering, so one 100k-job message stalls the simulation.
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def decode_message(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def encode_message(message):
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+# --- Interval sets ---
+
+def interval_set(hosts):
+    """Batsim interval set of host ids, e.g. [0, 1, 2, 3, 7] -> "0-3 7"."""
+    parts = []
+    start = previous = None
+    for host in sorted(hosts):
+        if previous is not None and host == previous + 1:
+            previous = host
+            continue
+        if start is not None:
+            parts.append(f"{start}-{previous}" if previous > start else str(start))
+        start = previous = host
+    if start is not None:
+        parts.append(f"{start}-{previous}" if previous > start else str(start))
+    return " ".join(parts)
+
+
+def parse_interval_set(resources):
+    """Host ids of a Batsim interval set such as "0-3 7"."""
+    for part in str(resources).split():
+        first, _, last = part.partition("-")
+        yield from range(int(first), int(last or first) + 1)
+
+
+# --- Event builders ---
+
+def register_profile_event(now, workload_name, profile_name, profile):
+    return {
+        "timestamp": now,
+        "type": "REGISTER_PROFILE",
+        "data": {
+            "workload_name": workload_name,
+            "profile_name": profile_name,
+            "profile": profile
+        }
+    }
+
+
+def register_job_event(now, job):
+    event = {
+        "timestamp": now,
+        "type": "REGISTER_JOB",
+        "data": {
+            "job_id": job["id"],
+            "job": {
+                "id": job["id"],
+                "profile": job["profile"],
+                "res": job["res"],
+                "walltime": job["walltime"],
+                "subtime": job["subtime"]
+            }
+        }
+    }
+    # Requeued copies name the job they replace (Batsim keeps extra job fields)
+    if "requeued_from" in job:
+        event["data"]["job"]["requeued_from"] = job["requeued_from"]
+    return event
+
+
+def execute_job_event(now, job_id, alloc):
+    return {
+        "timestamp": now,
+        "type": "EXECUTE_JOB",
+        "data": {
+            "job_id": job_id,
+            "alloc": alloc
+        }
+    }
+
+
+def kill_jobs_event(now, job_ids):
+    return {
+        "timestamp": now,
+        "type": "KILL_JOB",
+        "data": {
+            "job_ids": list(job_ids)
+        }
+    }
+
+
+def set_resource_state_event(now, resources, state):
+    return {
+        "timestamp": now,
+        "type": "SET_RESOURCE_STATE",
+        "data": {
+            "resources": resources,
+            "state": str(state)
+        }
+    }
+
+
+def notify_event(now, notify_type):
+    return {
+        "timestamp": now,
+        "type": "NOTIFY",
+        "data": {
+            "type": notify_type
+        }
+    }
+
+
+def call_me_later_event(now, timestamp):
+    return {
+        "timestamp": now,
+        "type": "CALL_ME_LATER",
+        "data": {
+            "timestamp": timestamp
+        }
+    }
+
+
+def allocate_endpoints(index, transport, base_port):
+    """Returns the (bind, connect) endpoint pair of the index-th concurrent run."""
+    if transport == "ipc":
+        path = os.path.join(tempfile.gettempdir(), f"batsim_dyn_{os.getpid()}_{index}.sock")
+        return f"ipc://{path}", f"ipc://{path}"
+    port = base_port + index
+    return f"tcp://*:{port}", f"tcp://localhost:{port}"
+
+
+class RegistrationBatcher:
+    """
+    Releases dynamic jobs for registration in bounded chunks, in subtime order.
+
+    Only jobs whose subtime has been reached are released, at most `chunk_size`
+    per reply. `next_wakeup` gives the timestamp for a CALL_ME_LATER so Batsim
+    wakes the scheduler up for the next chunk instead of receiving everything upfront.
+    `jobs` is either a list, or an iterator already in subtime order that is
+    consumed lazily (e.g. an unbounded job generator).
+    """
+
+    def __init__(self, jobs, chunk_size=DEFAULT_CHUNK_SIZE):
+        if isinstance(jobs, list):
+            jobs = sorted(jobs, key=lambda job: job["subtime"])
+        self.source = iter(jobs)
+        self.next_job = next(self.source, None)
+        self.chunk_size = chunk_size
+        self.requested_wakeups = []
+
+    @property
+    def finished(self):
+        return self.next_job is None
+
+    def close(self):
+        """Stops releasing jobs (e.g. once online metrics converged); the rest are never registered."""
+        self.next_job = None
+
+    def due(self, now):
+        released = []
+        while self.next_job is not None and len(released) < self.chunk_size and self.next_job["subtime"] <= now:
+            released.append(self.next_job)
+            self.next_job = next(self.source, None)
+        return released
+
+    def next_wakeup(self, now):
+        """Timestamp at which the next chunk becomes due, or None once every job is released."""
+        if self.finished:
+            return None
+        return max(now, self.next_job["subtime"])
+
+    def wakeup_event(self, now):
+        """CALL_ME_LATER for the next chunk, unless one for that time is already pending."""
+        wakeup = self.next_wakeup(now)
+        if wakeup is None:
+            return None
+        while self.requested_wakeups and self.requested_wakeups[0] <= now:
+            self.requested_wakeups.pop(0)
+        # Batsim rejects CALL_ME_LATER in the past and we must not spin on "now"
+        # when the chunk limit was hit, so nudge the request forward.
+        if wakeup <= now:
+            wakeup = now + 1e-6
+        if wakeup in self.requested_wakeups:
+            return None
+        insort(self.requested_wakeups, wakeup)
+        return call_me_later_event(now, wakeup)
+
+
+class DecisionLatency:
+    """Wall-clock time spent between receiving a request and sending its reply."""
+
+    def __init__(self):
+        self.samples = []
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ordered = sorted(self.samples)
+        count = len(ordered)
+
+        def percentile(q):
+            return ordered[min(count - 1, int(q * count))]
+
+        return {
+            "count": count,
+            "mean": sum(ordered) / count,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": ordered[-1]
+        }
+
+    def format_summary(self):
+        stats = self.summary()
+        if stats["count"] == 0:
+            return "no decisions recorded"
+        return (
+            f"{stats['count']} decisions, mean={stats['mean'] * 1e3:.3f}ms, "
+            f"p50={stats['p50'] * 1e3:.3f}ms, p95={stats['p95'] * 1e3:.3f}ms, "
+            f"p99={stats['p99'] * 1e3:.3f}ms, max={stats['max'] * 1e3:.3f}ms"
+        )
+
+
+class MessageRecorder:
+    """
+    Appends every protocol message of a session to a JSONL file.
+
+    Each line is `{"t": <seconds since start>, "direction": "recv"|"send", "message": {...}}`.
+    Raw message bytes are spliced in as-is, so recording does not re-encode the JSON.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.started = time.perf_counter()
+
+    def write(self, direction, raw):
+        if b"\n" in raw:
+            raw = encode_message(decode_message(raw))
+        elapsed = time.perf_counter() - self.started
+        self.file.write(b'{"t":%.6f,"direction":"%s","message":' % (elapsed, direction.encode()))
+        self.file.write(raw)
+        self.file.write(b"}\n")
+
+    def close(self):
+        self.file.close()
+
+
+def read_recording(path):
+    """Yields (t, direction, message) tuples from a MessageRecorder file."""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                record = decode_message(line)
+                yield record["t"], record["direction"], record["message"]
+
+
+def serve(socket, decide, label="scheduler", recorder=None, observer=None):
+    """
+    Runs the request/reply loop on a bound ZMQ REP socket until SIMULATION_ENDS.
+
+    `decide(now, events)` returns the list of events for the reply. The time from
+    receiving a request to sending its reply is recorded, since Batsim is blocked
+    for that whole duration. When a MessageRecorder is given, both directions of
+    the stream are captured; an `observer` (e.g. online_metrics.OnlineMetrics) is
+    given every request and reply after the reply is sent. Returns the
+    DecisionLatency of the session.
+    """
+    latency = DecisionLatency()
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    while True:
+        raw = socket.recv()
+        if recorder is not None:
+            recorder.write("recv", raw)
+        started = time.perf_counter()
+        message = decode_message(raw)
+
+        now = message["now"]
+        events = message["events"]
+        if debug:
+            for event in events:
+                logger.debug("[%s @ %.2f] Event received: %s", label, now, event["type"])
+
+        ended = any(event["type"] == "SIMULATION_ENDS" for event in events)
+        if ended:
+            reply_events = []
+        else:
+            reply_events = decide(now, events)
+
+        reply = encode_message({"now": now, "events": reply_events})
+        socket.send(reply)
+        latency.record(time.perf_counter() - started)
+        if recorder is not None:
+            recorder.write("send", reply)
+        if observer is not None:
+            observer.observe(now, events, reply_events)
+
+        if ended:
+            logger.info("[%s @ %.2f] Simulation ended.", label, now)
+            break
+
+    logger.info("[%s] Decision latency: %s", label, latency.format_summary())
+    return latency
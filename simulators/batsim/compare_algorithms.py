@@ -1,45 +1,72 @@
+import argparse
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
-from scipy.stats import mannwhitneyu
-from itertools import combinations
 
-import pandas as pd
-import plotly.express as px
+from machine_metrics import (
+    STATE_COLUMNS,
+    mean_over_runs,
+    read_platform_wattage,
+    time_weighted_states,
+    windowed_utilization,
+)
+from queue_metrics import queue_state_by_group
+from result_store import discover_runs, ingest, load_table
+from comparison_stats import compare_groups, format_pairwise, group_arrays
+from figure_export import DEFAULT_RASTER_THRESHOLD, FigureSpec, raster_scatter, render_figures
+from gantt_raster import render_gantt
+from aggregate import density_grid, grouped_histogram, histogram_edges
+from downsample import DEFAULT_MAX_POINTS, METHODS, downsample_frame
+from occupancy import occupancy_summary
 
 # Evalys imports
 from evalys.jobset import JobSet
 from evalys import visu
 import matplotlib.pyplot as plt
 
-# Setup paths and schedulers
+parser = argparse.ArgumentParser(description="Compare Batsim and AccaSim runs of several schedulers")
+parser.add_argument("--results-root", default=".",
+                    help="Directory searched for runs (Batsim out_jobs.csv, AccaSim sched-*.swf)")
+parser.add_argument("--store", default="results_store", help="Partitioned Parquet store the runs are ingested into")
+parser.add_argument("--schedulers", nargs="+", default=None, help="Only compare these schedulers (default: all)")
+parser.add_argument("--seeds", nargs="+", type=int, default=None, help="Only load these seeds (default: all)")
+parser.add_argument("--workloads", nargs="+", default=None, help="Only load these workloads (default: all)")
+parser.add_argument("--workers", type=int, default=None, help="Threads used to ingest new runs")
+parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples per scheduler and metric")
+parser.add_argument("--stats-workers", type=int, default=None, help="Processes used for the statistical tests")
+parser.add_argument("--render-workers", type=int, default=4, help="Figures exported concurrently by Kaleido")
+parser.add_argument("--raster-threshold", type=int, default=DEFAULT_RASTER_THRESHOLD,
+                    help="Scatter figures with more marks are drawn with matplotlib")
+parser.add_argument("--force-render", action="store_true", help="Re-render figures whose inputs did not change")
+parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS,
+                    help="Points kept per time-series trace (about the plot width in pixels times 4)")
+parser.add_argument("--downsample", choices=METHODS, default="minmax",
+                    help="Time-series downsampling: min/max per pixel bucket (keeps every peak) or LTTB")
+parser.add_argument("--platform", help="Platform XML whose wattages estimate energy for runs without Batsim's energy plugin")
+args = parser.parse_args()
+
+# Setup paths and ingest new or updated runs into the store
 base_dir = Path.cwd()
-schedulers = {
-    "conservative_bf": base_dir / "conservative_bf_results",
-    "easy_bf": base_dir / "easy_bf_results",
-    "easy_bf_fast": base_dir / "easy_bf_fast_results",
-    "filler": base_dir / "filler_results",
-    "fcfs": base_dir / "fcfs_results",
-    "fcfs_fast": base_dir / "fcfs_fast_results"
-}
-
-# Load jobs and machines data for all schedulers
-job_dfs = []
-machine_dfs = []
-
-for name, path in schedulers.items():
-    jobs_df = pd.read_csv(path / "out_jobs.csv")
-    jobs_df["scheduler"] = name
-    job_dfs.append(jobs_df)
-    
-    machines_df = pd.read_csv(path / "out_machine_states.csv")
-    machines_df["scheduler"] = name
-    machine_dfs.append(machines_df)
-
-jobs_df = pd.concat(job_dfs, ignore_index=True)
-machines_df = pd.concat(machine_dfs, ignore_index=True)
+ingest(discover_runs(args.results_root), args.store, args.workers)
+
+# Load only the partitions (and, for machine states, columns) the comparison uses
+jobs_df = load_table(args.store, "jobs", args.schedulers, args.seeds, args.workloads)
+machines_df = load_table(args.store, "machine_states", args.schedulers, args.seeds, args.workloads,
+                         columns=["time"] + STATE_COLUMNS)
+# Batsim run summaries (whole-platform energy); AccaSim-only stores have none
+schedule_df = None
+if Path(args.store, "schedule").is_dir():
+    schedule_df = load_table(args.store, "schedule", args.schedulers, args.seeds, args.workloads,
+                             columns=["consumed_joules"])
+schedulers = sorted(jobs_df["scheduler"].unique())
+
+# Per-scheduler views, split once instead of filtering the full frames per use.
+# Machine states are step functions of one run, so several seeds or workloads of a
+# scheduler are averaged over time rather than interleaved
+jobs_by_scheduler = dict(tuple(jobs_df.groupby("scheduler", observed=True)))
+machine_means = mean_over_runs(machines_df, STATE_COLUMNS)
 
 out_dir = base_dir / "comparison_plots"
 out_dir.mkdir(exist_ok=True)
@@ -48,232 +75,246 @@ out_dir.mkdir(exist_ok=True)
 summary_lines = []
 
 def summary_stat(df, metric, group_col="scheduler"):
-    summary = df.groupby(group_col)[metric].agg(['mean', 'median', 'std', 'count'])
+    summary = df.groupby(group_col, observed=True)[metric].agg(['mean', 'median', 'std', 'count'])
     return summary
 
 # Average stretch per scheduler
 stretch_summary = summary_stat(jobs_df, "stretch")
 summary_lines.append("Average Stretch per Scheduler:\n" + stretch_summary.to_string() + "\n")
 
-# Pairwise Mann-Whitney U test on stretch
-summary_lines.append("Pairwise Mann-Whitney U tests for Stretch:\n")
-for sched1, sched2 in combinations(schedulers.keys(), 2):
-    data1 = jobs_df[jobs_df["scheduler"] == sched1]["stretch"]
-    data2 = jobs_df[jobs_df["scheduler"] == sched2]["stretch"]
-    u_stat, p_val = mannwhitneyu(data1, data2, alternative='two-sided')
-    summary_lines.append(f"{sched1} vs {sched2}: U={u_stat:.3f}, p={p_val:.4f}")
-
-summary_lines.append("\nAverage Waiting Time per Scheduler:\n" + summary_stat(jobs_df, "waiting_time").to_string() + "\n")
-
-# Pairwise Mann-Whitney U test on waiting time
-summary_lines.append("Pairwise Mann-Whitney U tests for Waiting Time:\n")
-for sched1, sched2 in combinations(schedulers.keys(), 2):
-    data1 = jobs_df[jobs_df["scheduler"] == sched1]["waiting_time"]
-    data2 = jobs_df[jobs_df["scheduler"] == sched2]["waiting_time"]
-    u_stat, p_val = mannwhitneyu(data1, data2, alternative='two-sided')
-    summary_lines.append(f"{sched1} vs {sched2}: U={u_stat:.3f}, p={p_val:.4f}")
-
-# Average machine utilization over time per scheduler
-machines_df["total_machines"] = machines_df["nb_computing"] + machines_df["nb_idle"] + machines_df["nb_sleeping"]
-machines_df["utilization"] = machines_df["nb_computing"] / machines_df["total_machines"]
-util_summary = machines_df.groupby("scheduler")["utilization"].agg(['mean', 'median', 'std', 'count'])
-summary_lines.append("Average Machine Utilization per Scheduler:\n" + util_summary.to_string() + "\n")
-
-# Pairwise Mann-Whitney U test on machine utilization
-summary_lines.append("Pairwise Mann-Whitney U tests for Machine Utilization:\n")
-for sched1, sched2 in combinations(schedulers.keys(), 2):
-    data1 = machines_df[machines_df["scheduler"] == sched1]["utilization"]
-    data2 = machines_df[machines_df["scheduler"] == sched2]["utilization"]
-    u_stat, p_val = mannwhitneyu(data1, data2, alternative='two-sided')
-    summary_lines.append(f"{sched1} vs {sched2}: U={u_stat:.3f}, p={p_val:.4f}")
+summary_lines.append("Average Waiting Time per Scheduler:\n" + summary_stat(jobs_df, "waiting_time").to_string() + "\n")
+
+# Time-weighted machine utilization per scheduler (machine states are step functions
+# sampled at irregular event times, so rows are weighted by how long they hold),
+# integrated per run and pooled over each scheduler's runs
+wattage = read_platform_wattage(args.platform) if args.platform else None
+util_summary = time_weighted_states(machines_df, jobs_df, wattage=wattage, schedule_df=schedule_df)
+summary_lines.append("Time-Weighted Machine Utilization per Scheduler:\n" + util_summary.to_string() + "\n")
+
+# What sleeping hosts (the energy policy) saves against what it costs in waiting time
+if "energy_joules" in util_summary:
+    tradeoff = util_summary[["energy_joules", "utilization", "sleeping_fraction", "switching_fraction"]].join(
+        jobs_df.groupby("scheduler", observed=True)["waiting_time"].agg(mean_waiting_time="mean"))
+    tradeoff["energy_vs_best"] = tradeoff["energy_joules"] / tradeoff["energy_joules"].min()
+    summary_lines.append("Energy / Utilization / Waiting Time Trade-off per Scheduler:\n" + tradeoff.to_string() + "\n")
+
+# Per-host occupancy from allocated_resources: how evenly hosts were used and how
+# often allocations were split into several contiguous blocks
+occupancy = occupancy_summary(jobs_df)
+summary_lines.append("Per-Host Occupancy per Scheduler:\n" + occupancy.to_string() + "\n")
+
+# Pairwise tests and bootstrap CIs on per-scheduler arrays; utilization is sampled
+# per time window of every run rather than per (autocorrelated) event row
+util_windows = windowed_utilization(machines_df, nb_windows=50, jobs_df=jobs_df)
+samples = {
+    "stretch": group_arrays(jobs_df, "stretch"),
+    "waiting_time": group_arrays(jobs_df, "waiting_time"),
+    "utilization": group_arrays(util_windows, "utilization")
+}
+pairwise, intervals = compare_groups(samples, nb_resamples=args.bootstrap, workers=args.stats_workers)
+pairwise.to_csv(out_dir / "pairwise_tests.csv", index=False)
+intervals.to_csv(out_dir / "bootstrap_intervals.csv", index=False)
+
+for metric, title in [("stretch", "Stretch"), ("waiting_time", "Waiting Time"),
+                      ("utilization", "Machine Utilization (50 time windows)")]:
+    summary_lines.append(f"Pairwise Mann-Whitney U tests for {title} (Holm / Benjamini-Hochberg adjusted, "
+                         "r = rank-biserial correlation):\n")
+    summary_lines.extend(format_pairwise(pairwise, metric))
+    metric_intervals = intervals[intervals["metric"] == metric].pivot(
+        index="scheduler", columns="statistic", values=["estimate", "ci_low", "ci_high"])
+    summary_lines.append(f"\n95% bootstrap CIs for {title} ({args.bootstrap} resamples):\n"
+                         + metric_intervals.to_string() + "\n")
 
 with open(out_dir / "comparison_summary.txt", "w") as f:
     f.write("\n".join(summary_lines))
 
 
 # --- Plotting ---
+# Each figure is described first and rendered at the end, so unchanged figures are
+# skipped and the rest are exported together (see figure_export.render_figures)
+
+figures = []
+
+# Per-job figures are drawn from pre-aggregated bins and grid cells (see aggregate.py),
+# so their size does not grow with the number of jobs
+
+# 1. Stretch vs Requested Resources (density grid, log-binned stretch)
+stretch_cells = density_grid(jobs_df, "requested_number_of_resources", "stretch", "scheduler", log_y=True)
+
+def stretch_vs_resources():
+    return px.scatter(
+        stretch_cells,
+        x="requested_number_of_resources",
+        y="stretch",
+        color="scheduler",
+        size="count",
+        log_y=True,
+        title="Stretch vs Requested Resources by Scheduler",
+        labels={"count": "Jobs"}
+    )
 
-# 1. Stretch vs Requested Resources
-fig1 = px.scatter(
-    jobs_df,
-    x="requested_number_of_resources",
-    y="stretch",
-    color="scheduler",
-    title="Stretch vs Requested Resources by Scheduler",
-    hover_data=["job_id", "submission_time", "execution_time"]
-)
-fig1.write_image(out_dir / "stretch_vs_requested_resources.png")
-
-# 2. Gantt-style Timeline Plot (all schedulers combined)
-fig2 = px.timeline(
-    jobs_df,
-    x_start="starting_time",
-    x_end="finish_time",
-    y="job_id",
-    color="scheduler",
-    hover_data=["requested_number_of_resources", "stretch"],
-    title="Job Execution Timeline by Scheduler"
-)
-fig2.update_yaxes(autorange="reversed")
-fig2.write_image(out_dir / "job_execution_timeline.png")
+figures.append(FigureSpec(
+    "stretch_vs_requested_resources.png", stretch_vs_resources,
+    data=[stretch_cells], size=len(stretch_cells),
+    raster=lambda path: raster_scatter(path, jobs_df, "requested_number_of_resources", "stretch", color="scheduler",
+                                       title="Stretch vs Requested Resources by Scheduler")
+))
+
+# 2. Gantt-style Timeline Plot (one host x time panel per scheduler)
+figures.append(FigureSpec(
+    "job_execution_timeline.png", None,
+    data=[jobs_df[["scheduler", "allocated_resources", "starting_time", "finish_time"]]],
+    raster=lambda path: render_gantt(path, jobs_df, color="scheduler", facet="scheduler",
+                                     title="Job Execution Timeline by Scheduler")
+))
 
 # 3. Machine State Over Time (all schedulers + states)
-fig3 = go.Figure()
+# Downsampled here rather than in the figure builder, so the figure digest covers
+# --max-points and --downsample through the traces themselves
 states = ["nb_computing", "nb_idle", "nb_sleeping", "nb_switching_on", "nb_switching_off"]
-for state in states:
-    for scheduler in schedulers.keys():
-        sched_machines = machines_df[machines_df["scheduler"] == scheduler]
+machine_traces = pd.concat([
+    downsample_frame(machine_means, "time", state, "scheduler", args.max_points, args.downsample)
+    .rename(columns={state: "machines"}).assign(state=state)
+    for state in states
+], ignore_index=True)
+
+def machine_states_over_time():
+    fig3 = go.Figure()
+    for (state, scheduler), trace in machine_traces.groupby(["state", "scheduler"], observed=True, sort=False):
         fig3.add_trace(go.Scatter(
-            x=sched_machines["time"],
-            y=sched_machines[state],
+            x=trace["time"],
+            y=trace["machines"],
             mode='lines',
+            line_shape='hv',
             name=f"{scheduler} - {state}"
         ))
 
-fig3.update_layout(
-    title="Machine States Over Time by Scheduler",
-    xaxis_title="Simulation Time",
-    yaxis_title="Number of Machines",
-    legend_title="Scheduler and State",
-    height=700,
-    width=1000
-)
-fig3.write_image(out_dir / "machine_states_over_time.png")
-
-# 4. Histogram of Job Waiting Times
-fig4 = px.histogram(
-    jobs_df,
-    x="waiting_time",
-    nbins=50,
-    title="Histogram of Job Waiting Times by Scheduler",
-    labels={"waiting_time": "Waiting Time (seconds)"},
-    color="scheduler",
-    opacity=0.6,
-    barmode="overlay"
-)
-fig4.update_layout(
-    xaxis_title="Waiting Time (seconds)",
-    yaxis_title="Number of Jobs",
-    bargap=0.1
-)
-fig4.write_image(out_dir / "histogram_waiting_times.png")
-
-# 5. Waiting Time vs Submission Time
-fig5 = px.scatter(
-    jobs_df,
-    x="submission_time",
-    y="waiting_time",
-    color="scheduler",
-    title="Waiting Time vs Submission Time by Scheduler",
-    labels={
-        "submission_time": "Submission Time (seconds)",
-        "waiting_time": "Waiting Time (seconds)"
-    },
-    hover_data=["job_id", "requested_number_of_resources", "profile"]
-)
-fig5.update_traces(marker=dict(size=6, opacity=0.7))
-fig5.update_layout(
-    xaxis_title="Submission Time",
-    yaxis_title="Waiting Time",
-    legend_title="Scheduler"
-)
-fig5.write_image(out_dir / "waiting_vs_submission_time.png")
-
-# 6. Distribution of Failures Over Time
-failures_df = jobs_df[jobs_df["success"] == 0].copy()
-bins = np.arange(jobs_df["submission_time"].min(), jobs_df["submission_time"].max() + 1, 1)
-failures_df["submission_bin"] = pd.cut(failures_df["submission_time"], bins)
-failures_count = failures_df.groupby(["scheduler", "submission_bin"]).size().reset_index(name="failures")
-failures_count["bin_start"] = failures_count["submission_bin"].apply(lambda x: x.left)
-
-fig6 = px.bar(
-    failures_count,
-    x="bin_start",
-    y="failures",
-    color="scheduler",
-    title="Distribution of Failures Over Time (Submission Time Bins) by Scheduler",
-    labels={"bin_start": "Submission Time (s)", "failures": "Number of Failed Jobs"}
-)
-fig6.write_image(out_dir / "failures_over_time.png")
-
-# 7. Queue Length Over Time (all schedulers)
-queue_dfs = []
-for name in schedulers.keys():
-    jobs_temp = jobs_df[jobs_df["scheduler"] == name]
-    machines_temp = machines_df[machines_df["scheduler"] == name]
-    times = machines_temp["time"].values
-    
-    queue_lengths = []
-    for t in times:
-        submitted = jobs_temp[jobs_temp["submission_time"] <= t]
-        started = jobs_temp[jobs_temp["starting_time"] <= t]
-        queue_length = len(submitted) - len(started)
-        queue_lengths.append(queue_length)
-        
-    qdf = pd.DataFrame({"time": times, "queue_length": queue_lengths})
-    qdf["scheduler"] = name
-    queue_dfs.append(qdf)
-
-queue_all = pd.concat(queue_dfs, ignore_index=True)
-
-fig7 = px.line(
-    queue_all,
-    x="time",
-    y="queue_length",
-    color="scheduler",
-    title="Queue Length Over Time by Scheduler",
-    labels={"time": "Simulation Time (s)", "queue_length": "Number of Jobs in Queue"}
-)
-fig7.write_image(out_dir / "queue_length_over_time.png")
-
-# 8. Gantt Chart of Jobs (Success Colored, all schedulers combined)
-jobs_sorted = jobs_df.sort_values("submission_time")
-
-fig8 = px.timeline(
-    jobs_sorted,
-    x_start="starting_time",
-    x_end="finish_time",
-    y="job_id",
-    color="success",
-    title="Gantt Chart of Jobs (Success Colored, All Schedulers)",
-    hover_data=["scheduler", "profile", "requested_number_of_resources", "waiting_time", "execution_time"]
-)
-fig8.update_yaxes(autorange="reversed")
-fig8.write_image(out_dir / "gantt_chart_jobs.png")
-
-# 9. Evalys Gantt Chart per scheduler (saved individually)
-for name, path in schedulers.items():
-    job_csv = path / "out_jobs.csv"
-    df = pd.read_csv(job_csv)
-
-    df = df.sort_values(by='starting_time').reset_index(drop=True)
-
-    df['job_index'] = df.index
-
-    df['start'] = pd.to_datetime(df['starting_time'], unit='s')
-    df['end'] = pd.to_datetime(df['finish_time'], unit='s')
-
-    # Plot Gantt chart
-    plot = px.timeline(
-        df,
-        x_start='start',
-        x_end='end',
-        y='job_index',
-        hover_data=['job_id', 'start', 'end'],  # Keep original job_id in tooltip
-        title=f"Plotly Gantt Chart for Scheduler '{name}' Jobs",
+    fig3.update_layout(
+        title="Machine States Over Time by Scheduler (mean over runs)",
+        xaxis_title="Simulation Time",
+        yaxis_title="Number of Machines",
+        legend_title="Scheduler and State",
+        height=700,
+        width=1000
+    )
+    return fig3
+
+figures.append(FigureSpec("machine_states_over_time.png", machine_states_over_time, data=[machine_traces]))
+
+# 4. Histogram of Job Waiting Times (adaptive bins shared by all schedulers)
+waiting_hist = grouped_histogram(jobs_df, "waiting_time", "scheduler", max_bins=50)
+
+def waiting_time_histogram():
+    fig4 = px.bar(
+        waiting_hist,
+        x="center",
+        y="count",
+        title="Histogram of Job Waiting Times by Scheduler",
+        labels={"center": "Waiting Time (seconds)"},
+        color="scheduler",
+        opacity=0.6,
+        barmode="overlay"
+    )
+    # Bins are equally wide; draw each bar across its bin
+    fig4.update_traces(width=float((waiting_hist["right"] - waiting_hist["left"]).max()))
+    fig4.update_layout(
+        xaxis_title="Waiting Time (seconds)",
+        yaxis_title="Number of Jobs",
+        bargap=0.1
     )
+    return fig4
+
+figures.append(FigureSpec("histogram_waiting_times.png", waiting_time_histogram, data=[waiting_hist]))
+
+# 5. Waiting Time vs Submission Time (density grid)
+waiting_cells = density_grid(jobs_df, "submission_time", "waiting_time", "scheduler")
+
+def waiting_vs_submission():
+    fig5 = px.scatter(
+        waiting_cells,
+        x="submission_time",
+        y="waiting_time",
+        color="scheduler",
+        size="count",
+        title="Waiting Time vs Submission Time by Scheduler",
+        labels={
+            "submission_time": "Submission Time (seconds)",
+            "waiting_time": "Waiting Time (seconds)",
+            "count": "Jobs"
+        }
+    )
+    fig5.update_traces(marker=dict(opacity=0.7))
+    fig5.update_layout(
+        xaxis_title="Submission Time",
+        yaxis_title="Waiting Time",
+        legend_title="Scheduler"
+    )
+    return fig5
 
-    plot.update_yaxes(
-        title="Job ID",  # More readable label
-        tickmode='linear',
-        dtick=100  # Adjust spacing between y-ticks (e.g., every 100 jobs)
+figures.append(FigureSpec(
+    "waiting_vs_submission_time.png", waiting_vs_submission,
+    data=[waiting_cells], size=len(waiting_cells),
+    raster=lambda path: raster_scatter(path, jobs_df, "submission_time", "waiting_time", color="scheduler",
+                                       title="Waiting Time vs Submission Time by Scheduler",
+                                       xlabel="Submission Time", ylabel="Waiting Time")
+))
+
+# 6. Distribution of Failures Over Time
+# Adaptive bins over the whole submission range instead of one bin per second
+failures_count = grouped_histogram(jobs_df[jobs_df["success"] == 0], "submission_time", "scheduler",
+                                   edges=histogram_edges(jobs_df["submission_time"]))
+failures_count = failures_count.rename(columns={"left": "bin_start", "count": "failures"})
+
+def failures_over_time():
+    return px.bar(
+        failures_count,
+        x="bin_start",
+        y="failures",
+        color="scheduler",
+        title="Distribution of Failures Over Time (Submission Time Bins) by Scheduler",
+        labels={"bin_start": "Submission Time (s)", "failures": "Number of Failed Jobs"}
     )
 
-    plot.update_layout(
-        height=1000,
-        xaxis_title="Time",
-        margin=dict(l=20, r=20, t=60, b=20),
+figures.append(FigureSpec("failures_over_time.png", failures_over_time,
+                          data=[failures_count[["scheduler", "bin_start", "failures"]]]))
+
+# 7. Queue Length Over Time (all schedulers, mean over runs)
+queue_means = mean_over_runs(queue_state_by_group(jobs_df, machines_df), ["queue_length"])
+queue_all = downsample_frame(queue_means, "time", "queue_length", "scheduler", args.max_points, args.downsample)
+
+def queue_length_over_time():
+    return px.line(
+        queue_all,
+        line_shape="hv",
+        x="time",
+        y="queue_length",
+        color="scheduler",
+        title="Queue Length Over Time by Scheduler (mean over runs)",
+        labels={"time": "Simulation Time (s)", "queue_length": "Number of Jobs in Queue"}
     )
 
-    output_png = out_dir / f"plotly_gantt_chart_{name}_jobs.png"
-    plot.write_image(str(output_png), scale=2)
+figures.append(FigureSpec("queue_length_over_time.png", queue_length_over_time,
+                          data=[queue_all[["scheduler", "time", "queue_length"]]]))
+
+# 8. Gantt Chart of Jobs (Success Colored, all schedulers)
+figures.append(FigureSpec(
+    "gantt_chart_jobs.png", None,
+    data=[jobs_df[["scheduler", "allocated_resources", "starting_time", "finish_time", "success"]]],
+    raster=lambda path: render_gantt(path, jobs_df, color="success", facet="scheduler",
+                                     title="Gantt Chart of Jobs (Success Colored, All Schedulers)")
+))
+
+# 9. Gantt Chart per scheduler (saved individually)
+for name in schedulers:
+    df = jobs_by_scheduler[name]
+    figures.append(FigureSpec(
+        f"plotly_gantt_chart_{name}_jobs.png", None,
+        data=[df[["allocated_resources", "starting_time", "finish_time", "profile"]]],
+        raster=lambda path, name=name, df=df: render_gantt(path, df, color="profile",
+                                                           title=f"Gantt Chart for Scheduler '{name}' Jobs")
+    ))
+
+render_status = render_figures(figures, out_dir, workers=args.render_workers,
+                               raster_threshold=args.raster_threshold, force=args.force_render)
+for filename, status in render_status.items():
+    print(f"{filename}: {status}")
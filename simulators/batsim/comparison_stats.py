@@ -0,0 +1,194 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy.stats import mannwhitneyu, norm
+
+CORRECTIONS = ["holm", "bh"]
+STATISTICS = {"mean": np.mean, "median": np.median}
+
+# Upper bound on the resample matrix held at once (elements, ~64 MB of float64)
+BOOTSTRAP_BUDGET = 8_000_000
+
+# Per-metric {group: _RankedSample}, set once per worker process
+_samples = None
+
+
+def group_arrays(df, metric, group_col="scheduler"):
+    """Splits one metric column into a {group: float array} dict with a single sort, dropping NaNs."""
+    codes, names = pd.factorize(df[group_col], sort=True)
+    values = df[metric].to_numpy(dtype=float)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(1, len(names)))
+    return {name: chunk[~np.isnan(chunk)]
+            for name, chunk in zip(names, np.split(values[order], bounds))}
+
+
+def adjust_pvalues(p_values, method="holm"):
+    """Holm (family-wise error) or Benjamini-Hochberg (false discovery rate) adjusted p-values."""
+    p = np.asarray(p_values, dtype=float)
+    n = len(p)
+    if n == 0:
+        return p
+    order = np.argsort(p)
+    ranked = p[order]
+    if method == "holm":
+        adjusted = np.maximum.accumulate(ranked * (n - np.arange(n)))
+    elif method == "bh":
+        adjusted = np.minimum.accumulate((ranked * n / np.arange(1, n + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown correction: {method}")
+    result = np.empty(n)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+def bootstrap_ci(values, statistic="mean", nb_resamples=1000, confidence=0.95, rng=None):
+    """
+    Percentile bootstrap confidence interval of `statistic` over `values`.
+
+    Resamples are drawn as index matrices and reduced along an axis, in chunks
+    sized so that large samples never materialize more than BOOTSTRAP_BUDGET
+    elements at once.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.nan, np.nan, np.nan
+    rng = rng if rng is not None else np.random.default_rng()
+    reduce = STATISTICS[statistic]
+    chunk = max(1, BOOTSTRAP_BUDGET // len(values))
+    estimates = np.empty(nb_resamples)
+    for start in range(0, nb_resamples, chunk):
+        stop = min(start + chunk, nb_resamples)
+        indices = rng.integers(0, len(values), size=(stop - start, len(values)))
+        estimates[start:stop] = reduce(values[indices], axis=1)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(estimates, [tail, 100 - tail])
+    return float(reduce(values)), float(low), float(high)
+
+
+class _RankedSample:
+    """A sample with its distinct values and their counts, reused by every pair it is tested in."""
+
+    def __init__(self, values):
+        self.values = values
+        self.unique, self.counts = np.unique(values, return_counts=True)
+        self.counts = self.counts.astype(float)
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.counts)))
+        self.tie_term = float(np.sum(self.counts ** 3 - self.counts))
+
+
+def mann_whitney(x, y):
+    """
+    Two-sided Mann-Whitney U test of two _RankedSample, as scipy's asymptotic method
+    (tie and continuity corrected).
+
+    Works on the distinct values only, so a pair costs two searchsorted calls
+    instead of ranking the concatenated samples. Falls back to scipy (exact test)
+    for samples of 8 or fewer values.
+    """
+    n1, n2 = len(x.values), len(y.values)
+    if min(n1, n2) <= 8:
+        return mannwhitneyu(x.values, y.values, alternative="two-sided")
+    below = np.searchsorted(y.unique, x.unique, side="left")
+    above = np.searchsorted(y.unique, x.unique, side="right")
+    # Pairs (x_i, y_j) with x_i > y_j, plus half of the ties
+    smaller = y.cumulative[below]
+    equal = y.cumulative[above] - smaller
+    u1 = float(np.sum(x.counts * (smaller + 0.5 * equal)))
+
+    shared = above > below
+    cx, cy = x.counts[shared], y.counts[below[shared]]
+    tie_term = x.tie_term + y.tie_term + float(np.sum(
+        (cx + cy) ** 3 - (cx + cy) - (cx ** 3 - cx) - (cy ** 3 - cy)))
+
+    n = n1 + n2
+    mu = n1 * n2 / 2
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return u1, 1.0
+    z = (max(u1, n1 * n2 - u1) - mu - 0.5) / sigma
+    return u1, float(min(1.0, 2 * norm.sf(z)))
+
+
+def _init_worker(samples):
+    global _samples
+    _samples = samples
+
+
+def _pairwise_task(task):
+    metric, a, b = task
+    x, y = _samples[metric][a], _samples[metric][b]
+    n_a, n_b = len(x.values), len(y.values)
+    if n_a == 0 or n_b == 0:
+        return {"metric": metric, "a": a, "b": b, "n_a": n_a, "n_b": n_b}
+    u_stat, p_val = mann_whitney(x, y)
+    return {
+        "metric": metric, "a": a, "b": b, "n_a": n_a, "n_b": n_b,
+        "U": u_stat, "p": p_val,
+        # Rank-biserial correlation: P(x > y) - P(x < y), in [-1, 1]
+        "rank_biserial": 2 * u_stat / (n_a * n_b) - 1,
+        "mean_diff": np.mean(x.values) - np.mean(y.values)
+    }
+
+
+def _bootstrap_task(task):
+    metric, name, nb_resamples, confidence, seed = task
+    rng = np.random.default_rng(seed)
+    rows = []
+    for statistic in STATISTICS:
+        estimate, low, high = bootstrap_ci(_samples[metric][name].values, statistic, nb_resamples, confidence, rng)
+        rows.append({"metric": metric, "scheduler": name, "statistic": statistic,
+                     "estimate": estimate, "ci_low": low, "ci_high": high})
+    return rows
+
+
+def _run_tasks(function, tasks, samples, workers):
+    if workers == 1 or len(tasks) < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        # Forking shares the sample arrays without pickling them; elsewhere run in-process
+        _init_worker(samples)
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init_worker, initargs=(samples,)) as pool:
+        return list(pool.map(function, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+
+def compare_groups(samples, nb_resamples=1000, confidence=0.95, workers=None, seed=0):
+    """
+    Pairwise Mann-Whitney U tests and bootstrap confidence intervals per metric.
+
+    `samples` maps metric -> {group: values} (see group_arrays). Every metric x pair
+    test and metric x group bootstrap is an independent task run on a process pool.
+    p-values are adjusted with Holm and Benjamini-Hochberg within each metric.
+
+    Returns (pairwise, intervals) DataFrames.
+    """
+    workers = workers or os.cpu_count()
+    samples = {metric: {name: _RankedSample(values) for name, values in groups.items()}
+               for metric, groups in samples.items()}
+    pair_tasks = [(metric, a, b) for metric, groups in samples.items() for a, b in combinations(groups, 2)]
+    seeds = np.random.SeedSequence(seed).spawn(sum(len(groups) for groups in samples.values()))
+    boot_tasks = [(metric, name, nb_resamples, confidence, seeds.pop())
+                  for metric, groups in samples.items() for name in groups]
+
+    pairwise = pd.DataFrame(_run_tasks(_pairwise_task, pair_tasks, samples, workers),
+                            columns=["metric", "a", "b", "n_a", "n_b", "U", "p", "rank_biserial", "mean_diff"])
+    for method in CORRECTIONS:
+        pairwise[f"p_{method}"] = pairwise.groupby("metric", sort=False)["p"].transform(
+            lambda p: adjust_pvalues(p.to_numpy(), method))
+
+    intervals = pd.DataFrame([row for rows in _run_tasks(_bootstrap_task, boot_tasks, samples, workers)
+                              for row in rows])
+    return pairwise, intervals
+
+
+def format_pairwise(pairwise, metric):
+    """Summary lines of the pairwise tests of one metric."""
+    return [
+        f"{row.a} vs {row.b}: U={row.U:.3f}, p={row.p:.4f}, p_holm={row.p_holm:.4f}, "
+        f"p_bh={row.p_bh:.4f}, r={row.rank_biserial:+.3f}"
+        for row in pairwise[pairwise["metric"] == metric].itertuples()
+    ]
@@ -0,0 +1,193 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import time
+from array import array
+
+from batsim_protocol import interval_set
+from policy_queue import POLICIES, PolicyQueue
+
+# Host speed (flop/s) used to turn parallel_homogeneous profiles into durations;
+# the cluster512 platform the batsched results were produced on runs at 1 Gflop/s.
+DEFAULT_HOST_SPEED = 1e9
+
+# Event kinds, ordered so that completions at a given time free their hosts
+# before submissions at the same time are scheduled.
+COMPLETION = 0
+SUBMISSION = 1
+
+JOB_COLUMNS = [
+    "job_id", "workload_name", "profile", "submission_time", "requested_number_of_resources",
+    "requested_time", "success", "final_state", "starting_time", "execution_time", "finish_time",
+    "waiting_time", "turnaround_time", "stretch", "allocated_resources", "consumed_energy", "metadata"
+]
+MACHINE_COLUMNS = ["time", "nb_sleeping", "nb_switching_on", "nb_switching_off", "nb_idle", "nb_computing"]
+
+
+def profile_duration(profile, walltime, host_speed):
+    ptype = profile.get("type")
+    if ptype == "delay":
+        return float(profile["delay"])
+    if ptype == "parallel_homogeneous":
+        return float(profile["cpu"]) / host_speed
+    if ptype == "parallel":
+        return max(profile["cpu"]) / host_speed
+    return float(walltime)
+
+
+class Simulation:
+    """
+    Discrete-event simulation of a Batsim JSON workload on `nb_res` identical hosts.
+
+    Hosts are modelled as a free count (plus a stack of free host ids so that
+    `allocated_resources` can be reported) and there is no network model: a job
+    runs for its profile duration, capped by its walltime. Job state lives in flat
+    arrays indexed by job number, and waiting jobs stay in a policy_queue.PolicyQueue
+    between events, so each event only starts the jobs the policy picks from its
+    order (EASY backfilling reserves hosts for the blocked head job using the
+    walltimes of the running jobs, not their real durations).
+    """
+
+    def __init__(self, workload, algorithm, nb_res=None, host_speed=DEFAULT_HOST_SPEED, seed=None):
+        self.algorithm = algorithm
+        self.nb_res = nb_res or workload["nb_res"]
+        profiles = workload["profiles"]
+        jobs = workload["jobs"]
+        count = len(jobs)
+
+        self.names = [job["id"] for job in jobs]
+        self.profile_names = [job["profile"] for job in jobs]
+        self.subtime = array("d", (float(job["subtime"]) for job in jobs))
+        self.walltime = array("d", (float(job.get("walltime", -1)) for job in jobs))
+        self.res = array("l", (int(job["res"]) for job in jobs))
+        self.duration = array("d", (profile_duration(profiles[job["profile"]], job.get("walltime", -1), host_speed)
+                                    for job in jobs))
+        self.return_code = array("l", (int(profiles[job["profile"]].get("ret", 0)) for job in jobs))
+        self.start = array("d", bytes(8 * count))
+        self.finish = array("d", bytes(8 * count))
+        self.allocations = [None] * count
+        self.queue = PolicyQueue(algorithm, seed)
+        # Expected end (start + walltime) and size of the running jobs, for backfilling
+        self.running = {}
+        self.rejected = []
+
+        self.events = [(self.subtime[i], SUBMISSION, i) for i in range(count)]
+        heapq.heapify(self.events)
+        # Stack of free host ids, lowest ids on top, so freed blocks are reused first
+        self.free_hosts = list(range(self.nb_res - 1, -1, -1))
+        self.nb_computing = 0
+        self.machine_states = [(0.0, self.nb_res, 0)]
+
+    def run(self):
+        events = self.events
+        queue = self.queue
+        running = self.running
+
+        while events:
+            now = events[0][0]
+            while events and events[0][0] == now:
+                _, kind, i = heapq.heappop(events)
+                if kind == COMPLETION:
+                    self.free_hosts.extend(self.allocations[i])
+                    self.nb_computing -= self.res[i]
+                    del running[i]
+                elif self.res[i] > self.nb_res:
+                    self.rejected.append(i)
+                else:
+                    queue.push(i, self.subtime[i], self.walltime[i], self.res[i])
+
+            if queue and self.free_hosts:
+                for i, res, walltime in queue.select(now, len(self.free_hosts), running.values()):
+                    self.allocations[i] = self.free_hosts[-res:]
+                    del self.free_hosts[-res:]
+                    self.nb_computing += res
+                    self.start[i] = now
+                    runtime = self.duration[i]
+                    if 0 < self.walltime[i] < runtime:
+                        runtime = self.walltime[i]
+                    self.finish[i] = now + runtime
+                    running[i] = (now + walltime, res)
+                    heapq.heappush(events, (now + runtime, COMPLETION, i))
+
+            if self.nb_computing != self.machine_states[-1][2]:
+                state = (now, self.nb_res - self.nb_computing, self.nb_computing)
+                if self.machine_states[-1][0] == now:
+                    self.machine_states[-1] = state
+                else:
+                    self.machine_states.append(state)
+
+        return self
+
+    def write_outputs(self, prefix):
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f"{prefix}_jobs.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(JOB_COLUMNS)
+            rejected = set(self.rejected)
+            for i in sorted(range(len(self.names)), key=lambda i: (self.finish[i], i)):
+                if i in rejected:
+                    continue
+                workload_name, _, job_id = str(self.names[i]).rpartition("!")
+                execution_time = self.finish[i] - self.start[i]
+                waiting_time = self.start[i] - self.subtime[i]
+                turnaround_time = self.finish[i] - self.subtime[i]
+                if 0 < self.walltime[i] < self.duration[i]:
+                    success, final_state = 0, "COMPLETED_WALLTIME_REACHED"
+                elif self.return_code[i] != 0:
+                    success, final_state = 0, "COMPLETED_FAILED"
+                else:
+                    success, final_state = 1, "COMPLETED_SUCCESSFULLY"
+                stretch = turnaround_time / execution_time if execution_time > 0 else 1.0
+                writer.writerow([
+                    job_id, workload_name or "w0", self.profile_names[i], f"{self.subtime[i]:.6f}", self.res[i],
+                    f"{self.walltime[i]:.6f}", success, final_state, f"{self.start[i]:.6f}",
+                    f"{execution_time:.6f}", f"{self.finish[i]:.6f}", f"{waiting_time:.6f}",
+                    f"{turnaround_time:.6f}", f"{stretch:.6f}", interval_set(self.allocations[i]),
+                    "-1.000000", ""
+                ])
+
+        with open(f"{prefix}_machine_states.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(MACHINE_COLUMNS)
+            for t, nb_idle, nb_computing in self.machine_states:
+                writer.writerow([t, 0, 0, 0, nb_idle, nb_computing])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lightweight discrete-event simulator for Batsim JSON workloads")
+    parser.add_argument("-w", "--workload", required=True, help="Batsim JSON workload (e.g. from generate_workload.py)")
+    parser.add_argument("-a", "--algorithm", default="fcfs", choices=sorted(POLICIES),
+                        help="Scheduling policy (see policy_queue.py)")
+    parser.add_argument("-e", "--export", default=None,
+                        help="Output prefix, Batsim style (default: <algorithm>_des_results/out)")
+    parser.add_argument("--nb-res", type=int, default=None, help="Number of hosts (default: the workload's nb_res)")
+    parser.add_argument("--host-speed", type=float, default=DEFAULT_HOST_SPEED,
+                        help="Host speed in flop/s for parallel_homogeneous profiles")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random policy's order")
+    args = parser.parse_args()
+
+    with open(args.workload) as f:
+        workload = json.load(f)
+
+    started = time.perf_counter()
+    simulation = Simulation(workload, args.algorithm, args.nb_res, args.host_speed, args.seed).run()
+    elapsed = time.perf_counter() - started
+
+    prefix = args.export or os.path.join(f"{args.algorithm}_des_results", "out")
+    simulation.write_outputs(prefix)
+
+    nb_jobs = len(simulation.names)
+    print(f"Simulated {nb_jobs} jobs with '{args.algorithm}' on {simulation.nb_res} hosts "
+          f"in {elapsed:.2f}s ({nb_jobs / elapsed if elapsed > 0 else 0:.0f} jobs/s)")
+    if simulation.rejected:
+        print(f"Rejected {len(simulation.rejected)} jobs requesting more than {simulation.nb_res} hosts")
+    print(f"Output saved to: {prefix}_jobs.csv, {prefix}_machine_states.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+# AccaSim bench-*.swf rows: "1027839845;1;1.35;0.57;0.78;123.38", one per dispatching timepoint
+BENCH_COLUMNS = ["time", "queue_size", "dispatch_ms", "scheduling_ms", "allocation_ms", "memory_mb"]
+BENCH_TYPES = [pa.int64(), pa.int64(), pa.float64(), pa.float64(), pa.float64(), pa.float64()]
+BENCH_PATTERN, BENCH_PREFIX = "bench-*.swf", "bench-"
+PERCENTILES = [50, 90, 99, 99.9]
+COMPONENTS = {"dispatch": "dispatch_ms", "scheduling": "scheduling_ms", "allocation": "allocation_ms"}
+# Queue sizes are grouped in quarter-octave bins before fitting, so the many
+# timepoints at small queue sizes do not outweigh the few at large ones
+BINS_PER_OCTAVE = 4
+MIN_FIT_BINS = 3
+
+
+def read_bench(path):
+    """One AccaSim benchmark file as a DataFrame of BENCH_COLUMNS."""
+    table = pv.read_csv(path, read_options=pv.ReadOptions(column_names=BENCH_COLUMNS),
+                        parse_options=pv.ParseOptions(delimiter=";"),
+                        convert_options=pv.ConvertOptions(column_types=dict(zip(BENCH_COLUMNS, BENCH_TYPES))))
+    return table.to_pandas()
+
+
+def discover_bench_files(experiment):
+    """(dispatcher, workload, path) of every <dispatcher>/bench-<workload>.swf of an AccaSim experiment folder."""
+    return [(path.parent.name, path.stem[len(BENCH_PREFIX):], path)
+            for path in sorted(Path(experiment).rglob(BENCH_PATTERN))]
+
+
+def fit_scaling(queue_size, latency):
+    """
+    Power-law fit latency ≈ c · queue_size^k on the median latency of each queue-size bin.
+
+    Returns (k, standard error of k, c, number of bins); k is NaN when the queue
+    took fewer than MIN_FIT_BINS distinct sizes. k > 1 means each dispatch gets
+    more expensive per queued job as the queue grows.
+    """
+    rows = (queue_size > 0) & (latency > 0)
+    if not rows.any():
+        return np.nan, np.nan, np.nan, 0
+    bins = np.floor(np.log2(queue_size[rows]) * BINS_PER_OCTAVE)
+    medians = pd.DataFrame({"bin": bins, "queue": queue_size[rows], "latency": latency[rows]}).groupby("bin").median()
+    if len(medians) < MIN_FIT_BINS:
+        return np.nan, np.nan, np.nan, len(medians)
+    x, y = np.log(medians["queue"].to_numpy(float)), np.log(medians["latency"].to_numpy(float))
+    (k, log_c), residuals, *_ = np.polyfit(x, y, 1, full=True)
+    dof = len(x) - 2
+    sse = float(residuals[0]) if len(residuals) else 0.0
+    se = np.sqrt(sse / dof / ((x - x.mean()) ** 2).sum()) if dof > 0 else np.nan
+    return k, se, np.exp(log_c), len(medians)
+
+
+def memory_growth(df):
+    """Memory at the start, end and peak, and its linear growth per 1000 dispatching timepoints."""
+    memory = df["memory_mb"].to_numpy()
+    slope = np.polyfit(np.arange(len(memory)), memory, 1)[0] * 1000 if len(memory) > 1 else np.nan
+    return {"memory_start_mb": memory[0], "memory_end_mb": memory[-1], "memory_peak_mb": memory.max(),
+            "memory_growth_mb": memory[-1] - memory[0], "memory_mb_per_1k_timepoints": slope}
+
+
+def profile_dispatcher(df, queue_depth=None):
+    """
+    Cost profile of one dispatcher from its benchmark rows.
+
+    Dispatch time is attributed to scheduling and allocation (anything else
+    AccaSim measured as dispatch is "other"). Each component gets a power-law
+    scaling exponent against the queue size, flagged as super-linear when the
+    lower end of its 95% interval is above 1. With `queue_depth`, the fitted
+    dispatch latency is extrapolated to that queue size.
+    """
+    dispatch = df["dispatch_ms"].to_numpy()
+    total = dispatch.sum()
+    profile = {
+        "timepoints": len(df),
+        "max_queue_size": int(df["queue_size"].max()) if len(df) else 0,
+        "total_dispatch_s": total / 1000,
+        "scheduling_share": df["scheduling_ms"].sum() / total if total > 0 else np.nan,
+        "allocation_share": df["allocation_ms"].sum() / total if total > 0 else np.nan,
+    }
+    # Rounding of the logged times can make the remainder slightly negative
+    profile["other_share"] = max(1 - profile["scheduling_share"] - profile["allocation_share"], 0.0)
+    for percentile, value in zip(PERCENTILES, np.percentile(dispatch, PERCENTILES) if len(df) else [np.nan] * 4):
+        profile[f"p{percentile:g}_ms"] = value
+    profile["max_ms"] = dispatch.max() if len(df) else np.nan
+
+    queue_size = df["queue_size"].to_numpy()
+    for name, column in COMPONENTS.items():
+        k, se, c, nb_bins = fit_scaling(queue_size, df[column].to_numpy())
+        profile[f"{name}_exponent"] = k
+        profile[f"{name}_superlinear"] = bool(k - 1.96 * se > 1) if np.isfinite(se) else False
+        if name == "dispatch":
+            profile["fit_bins"] = nb_bins
+            if queue_depth:
+                profile[f"predicted_ms_at_{queue_depth}"] = c * queue_depth ** k
+    profile.update(memory_growth(df))
+    return profile
+
+
+def profile_experiment(experiment, queue_depth=None):
+    """One profile row per dispatcher and workload of an experiment folder."""
+    rows = []
+    for dispatcher, workload, path in discover_bench_files(experiment):
+        rows.append(dict(dispatcher=dispatcher, workload=workload, **profile_dispatcher(read_bench(path), queue_depth)))
+    return pd.DataFrame(rows).set_index(["dispatcher", "workload"]) if rows else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile AccaSim dispatcher costs from bench-*.swf files")
+    parser.add_argument("experiment",
+                        help="AccaSim experiment folder (results/<experiment>) with one folder per dispatcher")
+    parser.add_argument("--queue-depth", type=int, default=None,
+                        help="Production queue depth to extrapolate the dispatch latency to")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Flag dispatchers whose extrapolated latency exceeds this many milliseconds")
+    parser.add_argument("-o", "--output", default=None, help="CSV file for the profile table")
+    args = parser.parse_args()
+
+    profiles = profile_experiment(args.experiment, args.queue_depth)
+    if profiles.empty:
+        parser.error(f"no {BENCH_PATTERN} files under {args.experiment}")
+    if args.output:
+        profiles.to_csv(args.output)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.4g}".format):
+        print("\n--- Dispatcher Time Attribution ---")
+        print(profiles[["timepoints", "total_dispatch_s", "scheduling_share", "allocation_share", "other_share"]])
+        print("\n--- Dispatch Latency (ms) ---")
+        print(profiles[[f"p{percentile:g}_ms" for percentile in PERCENTILES] + ["max_ms"]])
+        print("\n--- Scaling with Queue Size (latency ~ queue_size^k) ---")
+        scaling = [column for name in COMPONENTS for column in (f"{name}_exponent", f"{name}_superlinear")]
+        print(profiles[["max_queue_size", "fit_bins"] + scaling
+                       + ([f"predicted_ms_at_{args.queue_depth}"] if args.queue_depth else [])])
+        print("\n--- Memory ---")
+        print(profiles[["memory_start_mb", "memory_end_mb", "memory_peak_mb", "memory_growth_mb",
+                        "memory_mb_per_1k_timepoints"]])
+
+    for (dispatcher, workload), profile in profiles.iterrows():
+        if profile["fit_bins"] < MIN_FIT_BINS:
+            print(f"{dispatcher} ({workload}): queue size took too few values to fit scaling")
+        superlinear = [name for name in COMPONENTS if profile[f"{name}_superlinear"]]
+        if superlinear:
+            print(f"{dispatcher} ({workload}): super-linear {', '.join(superlinear)} time "
+                  f"(dispatch exponent {profile['dispatch_exponent']:.2f})")
+        if args.queue_depth and args.budget_ms is not None:
+            predicted = profile[f"predicted_ms_at_{args.queue_depth}"]
+            if np.isfinite(predicted) and predicted > args.budget_ms:
+                print(f"{dispatcher} ({workload}): {predicted:.1f} ms per dispatch expected at "
+                      f"{args.queue_depth} queued jobs, over the {args.budget_ms:g} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 2000
+METHODS = ["minmax", "lttb"]
+
+
+def minmax_indices(x, y, nb_buckets):
+    """
+    Indices of the first, lowest, highest and last sample of every x bucket.
+
+    With one bucket per pixel column this draws the same image as the full
+    series: every peak and trough survives, and so does the value carried
+    into the next bucket. `x` must be sorted.
+    """
+    n = len(x)
+    if n <= 4 * nb_buckets:
+        return np.arange(n)
+    span = max(float(x[-1] - x[0]), 1e-12)
+    bucket = np.minimum(((x - x[0]) / span * nb_buckets).astype(np.int64), nb_buckets - 1)
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [n])) - 1
+    # Stable sorts by value within each bucket give the lowest and highest sample positions
+    order = np.lexsort((y, bucket))
+    lowest = order[starts]
+    highest = order[ends]
+    return np.unique(np.concatenate((starts, lowest, highest, ends)))
+
+
+def lttb_indices(x, y, nb_points):
+    """
+    Largest-Triangle-Three-Buckets selection of `nb_points` samples (first and last kept).
+
+    Each bucket keeps the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket, which follows the visual shape of
+    the series. One vectorized pass per output point.
+    """
+    n = len(x)
+    if nb_points >= n or nb_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, nb_points - 1).astype(np.int64)
+    selected = np.empty(nb_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(nb_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[previous] - mean_x) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (mean_y - y[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_series(x, y, max_points=DEFAULT_MAX_POINTS, method="minmax"):
+    """Reduces a sorted step-function series to about `max_points` samples; returns (x, y)."""
+    x, y = np.asarray(x), np.asarray(y)
+    if method == "minmax":
+        indices = minmax_indices(x, y, max(1, max_points // 4))
+    elif method == "lttb":
+        indices = lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[indices], y[indices]
+
+
+def downsample_frame(df, x, y, group_col=None, max_points=DEFAULT_MAX_POINTS, method="minmax"):
+    """Long-form version of downsample_series: every `group_col` group is reduced separately."""
+    groups = [(None, df)] if group_col is None else df.groupby(group_col, observed=True, sort=True)
+    parts = []
+    for name, group in groups:
+        group = group.sort_values(x, kind="stable")
+        xs, ys = downsample_series(group[x].to_numpy(), group[y].to_numpy(), max_points, method)
+        part = pd.DataFrame({x: xs, y: ys})
+        if group_col is not None:
+            part.insert(0, group_col, name)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True) if parts else df[[x, y]].iloc[:0]
@@ -0,0 +1,196 @@
+import json
+import logging
+import math
+
+from batsim_protocol import interval_set, set_resource_state_event
+from machine_metrics import MASTER_HOST, break_even_time, read_host_power
+
+logger = logging.getLogger("energy_policy")
+
+COMPUTE_PSTATE = 0
+HOST_STATES = ["computing", "idle", "sleeping", "switching_on", "switching_off"]
+
+
+class PowerManager:
+    """
+    Puts idle hosts to sleep and wakes them up ahead of demand, for the multifactor decider.
+
+    Every host has a break-even time from the platform (see
+    machine_metrics.break_even_time). An idle host is switched to its sleep pstate
+    once the idle period it is expected to still have (an exponential average of
+    its past idle periods minus the time it has been idle) exceeds that time, or
+    once it has been idle for that long anyway. Enough idle hosts are kept awake to
+    absorb the node demand forecast over the wake-up latency (decayed average of
+    the hosts requested per second), and sleeping hosts are woken as soon as the
+    queue or the forecast needs them.
+
+    Host states are integrated over simulated time with the platform wattages, so
+    the energy (and what staying always on would have cost) is known at the end; a
+    JSON summary is written to `path` on close.
+    """
+
+    def __init__(self, platform, path=None, smoothing=0.3, horizon=3600.0):
+        self.platform_power = read_host_power(platform)
+        self.path = path
+        self.smoothing = smoothing
+        self.horizon = horizon
+        self.hosts = []
+        self.demand = 0.0
+        self.demand_time = None
+        self.nb_sleeps = 0
+        self.wakeups = {"forecast": 0, "queue": 0}
+        self.now = 0.0
+
+    def begin(self, data, now):
+        """Matches the compute resources of SIMULATION_BEGINS with the platform hosts."""
+        resources = data.get("compute_resources")
+        if resources:
+            names = [resource["name"] for resource in sorted(resources, key=lambda r: r["id"])]
+        else:
+            compute = [name for name in self.platform_power if name != MASTER_HOST]
+            nb_hosts = data.get("nb_compute_resources", data.get("nb_resources", len(compute)))
+            names = [compute[i % len(compute)] for i in range(nb_hosts)]
+        # Hosts missing from the platform file are never put to sleep and draw no power
+        unknown = {"idle": 0.0, "full": 0.0, "sleep_pstate": None}
+        self.hosts = [self.platform_power.get(name, unknown) for name in names]
+        self.break_even = [break_even_time(power) for power in self.hosts]
+        self.state = ["idle"] * len(names)
+        self.since = [now] * len(names)
+        self.predicted_idle = [0.0] * len(names)
+        self.energy = {state: 0.0 for state in HOST_STATES}
+        self.host_seconds = {state: 0.0 for state in HOST_STATES}
+        self.switch_on_time = max((power.get("switch_on_time", 0.0) for power in self.hosts), default=0.0)
+        self.now = now
+        return list(range(len(names)))
+
+    def _watts(self, host, state):
+        power = self.hosts[host]
+        if state == "computing":
+            return power["full"]
+        if state == "idle" or power.get("sleep_pstate") is None:
+            return power["idle"]
+        return power[{"sleeping": "sleep", "switching_on": "switch_on", "switching_off": "switch_off"}[state]]
+
+    def _set(self, host, state, now):
+        elapsed = now - self.since[host]
+        previous = self.state[host]
+        self.host_seconds[previous] += elapsed
+        self.energy[previous] += self._watts(host, previous) * elapsed
+        if previous == "idle" and state == "computing":
+            self.predicted_idle[host] += self.smoothing * (elapsed - self.predicted_idle[host])
+        self.state[host] = state
+        self.since[host] = now
+
+    def allocated(self, hosts, now):
+        for host in hosts:
+            self._set(host, "computing", now)
+
+    def released(self, hosts, now):
+        for host in hosts:
+            self._set(host, "idle", now)
+
+    def submitted(self, job, now):
+        """Adds a job's hosts to the decayed demand estimate."""
+        if self.demand_time is not None:
+            self.demand *= math.exp(-(now - self.demand_time) / self.horizon)
+        self.demand += job["res"]
+        self.demand_time = now
+
+    def forecast(self, now):
+        """Hosts expected to be requested during one wake-up latency."""
+        if self.demand_time is None:
+            return 0
+        rate = self.demand * math.exp(-(now - self.demand_time) / self.horizon) / self.horizon
+        return round(rate * self.switch_on_time)
+
+    def state_changed(self, hosts, pstate, now):
+        """Applies a RESOURCE_STATE_CHANGED; returns the hosts that are awake and idle again."""
+        awake = []
+        for host in hosts:
+            if int(pstate) == COMPUTE_PSTATE:
+                self._set(host, "idle", now)
+                awake.append(host)
+            else:
+                self._set(host, "sleeping", now)
+        return awake
+
+    def plan(self, now, free_hosts, nb_missing):
+        """
+        SET_RESOURCE_STATE events for this decision, and the time of the next check.
+
+        `free_hosts` (idle and awake) loses the hosts put to sleep; `nb_missing` is the
+        number of hosts the blocked top job still lacks.
+        """
+        self.now = now
+        events = []
+        reserve = self.forecast(now)
+        nb_waking = self.state.count("switching_on")
+        # A blocked job takes every free host, so the forecast comes on top of what it lacks
+        nb_available = 0 if nb_missing > 0 else len(free_hosts)
+        deficit = nb_missing + reserve - nb_available - nb_waking
+        if deficit > 0:
+            sleeping = [host for host, state in enumerate(self.state) if state == "sleeping"][:deficit]
+            if sleeping:
+                for host in sleeping:
+                    self._set(host, "switching_on", now)
+                self.wakeups["queue" if nb_missing > 0 else "forecast"] += len(sleeping)
+                events.append(set_resource_state_event(now, interval_set(sleeping), COMPUTE_PSTATE))
+            return events, None
+
+        # Hosts idle for the longest are the first to go to sleep
+        candidates = sorted((host for host in free_hosts if self.hosts[host].get("sleep_pstate") is not None),
+                            key=lambda host: self.since[host])
+        nb_sleepable = nb_available - reserve
+        to_sleep, next_check = [], None
+        for host in candidates:
+            if len(to_sleep) >= nb_sleepable:
+                break
+            # Compared as a timestamp so that a CALL_ME_LATER at `check` always finds the host eligible
+            check = self.since[host] + self.break_even[host]
+            if check <= now or self.predicted_idle[host] - (now - self.since[host]) >= self.break_even[host]:
+                to_sleep.append(host)
+            else:
+                next_check = check if next_check is None else min(next_check, check)
+        if to_sleep:
+            asleep = set(to_sleep)
+            free_hosts[:] = [host for host in free_hosts if host not in asleep]
+            by_pstate = {}
+            for host in to_sleep:
+                self._set(host, "switching_off", now)
+                by_pstate.setdefault(self.hosts[host]["sleep_pstate"], []).append(host)
+            self.nb_sleeps += len(to_sleep)
+            events.extend(set_resource_state_event(now, interval_set(hosts), pstate)
+                          for pstate, hosts in by_pstate.items())
+        return events, next_check
+
+    def summary(self):
+        for host in range(len(self.hosts)):
+            self._set(host, self.state[host], self.now)
+        idle_watts = sum(self._watts(host, "idle") for host in range(len(self.hosts))) / max(len(self.hosts), 1)
+        not_computing = sum(seconds for state, seconds in self.host_seconds.items() if state != "computing")
+        total = sum(self.energy.values())
+        always_on = self.energy["computing"] + idle_watts * not_computing
+        machine_seconds = sum(self.host_seconds.values())
+        return {
+            "end_time": self.now,
+            "energy_joules": total,
+            "always_on_joules": always_on,
+            "saved_fraction": 1 - total / always_on if always_on > 0 else 0.0,
+            "utilization": self.host_seconds["computing"] / machine_seconds if machine_seconds > 0 else None,
+            "energy_by_state": self.energy,
+            "host_seconds_by_state": self.host_seconds,
+            "nb_sleeps": self.nb_sleeps,
+            "nb_wakeups": self.wakeups
+        }
+
+    def close(self):
+        if not self.hosts:
+            return
+        summary = self.summary()
+        logger.info("[energy] %.3g J (%.1f%% less than always on), %d sleeps, wake-ups: %s",
+                    summary["energy_joules"], 100 * summary["saved_fraction"], summary["nb_sleeps"],
+                    summary["nb_wakeups"])
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump(summary, f, indent=2)
+        self.hosts = []
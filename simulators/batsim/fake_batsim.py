@@ -0,0 +1,258 @@
+import argparse
+import heapq
+import json
+import logging
+import time
+
+from batsim_protocol import DecisionLatency, decode_message, encode_message, read_recording
+
+logger = logging.getLogger("fake_batsim")
+
+# Flop rate used to turn parallel_homogeneous profiles into durations, matching
+# the 1 Gflop/s hosts of the platforms the recorded results were produced on.
+DEFAULT_HOST_SPEED = 1e9
+
+
+class ZmqScheduler:
+    """Calls an external scheduler process over a REQ socket, the way Batsim does."""
+
+    def __init__(self, endpoint):
+        import zmq
+
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.connect(endpoint)
+
+    def __call__(self, now, events):
+        self.socket.send(encode_message({"now": now, "events": events}))
+        return decode_message(self.socket.recv())["events"]
+
+    def close(self):
+        self.socket.close(linger=0)
+        self.context.term()
+
+
+def job_duration(job, profile, host_speed=DEFAULT_HOST_SPEED):
+    if profile is not None:
+        if profile.get("type") == "delay":
+            return float(profile["delay"])
+        if profile.get("type") == "parallel_homogeneous":
+            return float(profile["cpu"]) / host_speed
+    return float(job["walltime"])
+
+
+class FakeBatsim:
+    """
+    Stand-in for Batsim that drives a Python scheduler without SimGrid.
+
+    The event loop emits SIMULATION_BEGINS, JOB_SUBMITTED, JOB_COMPLETED,
+    REQUESTED_CALL and SIMULATION_ENDS, and advances time from the scheduler's
+    replies: EXECUTE_JOB schedules a completion after the job's profile duration
+    (capped by its walltime), CALL_ME_LATER schedules a REQUESTED_CALL and dynamic
+    REGISTER_JOB events are acknowledged with JOB_SUBMITTED. Resources are not
+    contended, as with --enable-compute-sharing. SET_RESOURCE_STATE is answered
+    with RESOURCE_STATE_CHANGED after `switch_delay` seconds (no energy model).
+    """
+
+    def __init__(self, decide, nb_res=1, workload=None, acknowledge_dynamic_jobs=True,
+                 host_speed=DEFAULT_HOST_SPEED, switch_delay=0.0):
+        self.decide = decide
+        self.switch_delay = switch_delay
+        self.nb_res = nb_res
+        self.acknowledge_dynamic_jobs = acknowledge_dynamic_jobs
+        self.host_speed = host_speed
+        self.latency = DecisionLatency()
+
+        self.queue = []
+        self.sequence = 0
+        self.jobs = {}
+        self.profiles = {}
+        self.running = {}
+        self.registration_finished = workload is not None
+        self.nb_completed = 0
+        self.nb_killed = 0
+
+        if workload is not None:
+            self.nb_res = workload.get("nb_res", nb_res)
+            for name, profile in workload["profiles"].items():
+                self.profiles[f"w0!{name}"] = profile
+            for job in workload["jobs"]:
+                job = dict(job, id=f"w0!{job['id']}", profile=f"w0!{job['profile']}")
+                self.jobs[job["id"]] = job
+                self.push(job["subtime"], {"type": "JOB_SUBMITTED", "data": {"job_id": job["id"], "job": job}})
+
+    def push(self, timestamp, event):
+        event["timestamp"] = timestamp
+        heapq.heappush(self.queue, (timestamp, self.sequence, event))
+        self.sequence += 1
+
+    def apply(self, now, reply_events):
+        for event in reply_events:
+            etype = event["type"]
+            data = event.get("data", {})
+            timestamp = max(now, event.get("timestamp", now))
+
+            if etype == "REGISTER_PROFILE":
+                self.profiles[f"{data['workload_name']}!{data['profile_name']}"] = data["profile"]
+
+            elif etype == "REGISTER_JOB":
+                job = dict(data["job"])
+                workload_name = job["id"].split("!", 1)[0]
+                if "!" not in job["profile"]:
+                    job["profile"] = f"{workload_name}!{job['profile']}"
+                self.jobs[job["id"]] = job
+                if self.acknowledge_dynamic_jobs:
+                    self.push(timestamp, {"type": "JOB_SUBMITTED", "data": {"job_id": job["id"], "job": data["job"]}})
+
+            elif etype == "EXECUTE_JOB":
+                job = self.jobs[data["job_id"]]
+                duration = job_duration(job, self.profiles.get(job["profile"]), self.host_speed)
+                walltime = job.get("walltime", -1)
+                state = "COMPLETED_SUCCESSFULLY"
+                if 0 < walltime < duration:
+                    duration = walltime
+                    state = "COMPLETED_WALLTIME_REACHED"
+                self.running[job["id"]] = data["alloc"]
+                self.push(timestamp + duration, {
+                    "type": "JOB_COMPLETED",
+                    "data": {
+                        "job_id": job["id"],
+                        "job_state": state,
+                        "return_code": 0 if state == "COMPLETED_SUCCESSFULLY" else -1,
+                        "alloc": data["alloc"]
+                    }
+                })
+
+            elif etype == "KILL_JOB":
+                killed = [job_id for job_id in data["job_ids"] if self.running.pop(job_id, None) is not None]
+                self.nb_killed += len(killed)
+                self.push(timestamp, {"type": "JOB_KILLED", "data": {"job_ids": killed}})
+
+            elif etype == "SET_RESOURCE_STATE":
+                self.push(timestamp + self.switch_delay, {"type": "RESOURCE_STATE_CHANGED", "data": dict(data)})
+
+            elif etype == "CALL_ME_LATER":
+                self.push(data["timestamp"], {"type": "REQUESTED_CALL", "data": {}})
+
+            elif etype == "NOTIFY" and data.get("type") == "registration_finished":
+                self.registration_finished = True
+
+    def call(self, now, events):
+        started = time.perf_counter()
+        reply_events = self.decide(now, events)
+        self.latency.record(time.perf_counter() - started)
+        return reply_events
+
+    def run(self):
+        self.push(0.0, {
+            "type": "SIMULATION_BEGINS",
+            "data": {
+                "nb_resources": self.nb_res,
+                "nb_compute_resources": self.nb_res,
+                "allow_compute_sharing": True,
+                "config": {"dynamic-jobs-enabled": True, "dynamic-jobs-acknowledged": self.acknowledge_dynamic_jobs}
+            }
+        })
+
+        now = 0.0
+        while self.queue:
+            now = self.queue[0][0]
+            events = []
+            while self.queue and self.queue[0][0] == now:
+                event = heapq.heappop(self.queue)[2]
+                if event["type"] == "JOB_COMPLETED":
+                    # Completion of a job that was killed in the meantime
+                    if self.running.pop(event["data"]["job_id"], None) is None:
+                        continue
+                    self.nb_completed += 1
+                events.append(event)
+            if events:
+                self.apply(now, self.call(now, events))
+
+        if not self.registration_finished:
+            logger.warning("Scheduler never sent registration_finished; ending the simulation anyway.")
+        self.call(now, [{"timestamp": now, "type": "SIMULATION_ENDS", "data": {}}])
+
+        return {
+            "simulated_time": now,
+            "nb_jobs": len(self.jobs),
+            "nb_completed": self.nb_completed,
+            "nb_killed": self.nb_killed
+        }
+
+
+def replay(decide, recording_path):
+    """Feeds the Batsim side of a recorded session to `decide`, ignoring its replies."""
+    latency = DecisionLatency()
+    for _, direction, message in read_recording(recording_path):
+        if direction != "recv":
+            continue
+        started = time.perf_counter()
+        decide(message["now"], message["events"])
+        latency.record(time.perf_counter() - started)
+    return latency
+
+
+def format_benchmark(label, latency, wall_time, sim_stats=None):
+    stats = latency.summary()
+    busy = sum(latency.samples)
+    rate = stats["count"] / busy if busy > 0 else float("inf")
+    line = f"{label:>12}: {rate:12.1f} decisions/s | {latency.format_summary()} | wall {wall_time:.2f}s"
+    if sim_stats is not None:
+        line += (f" | simulated {sim_stats['simulated_time']:.1f}s, "
+                 f"{sim_stats['nb_completed']}/{sim_stats['nb_jobs']} jobs completed")
+    return line
+
+
+def main():
+    from multiple_dynamic import generate_jobs, make_decider
+
+    parser = argparse.ArgumentParser(description="Benchmark Python Batsim schedulers without Batsim")
+    parser.add_argument("--algorithms", nargs="+", default=["fcfs", "sjf", "random", "easy_bf", "filler"])
+    parser.add_argument("--num-jobs", type=int, default=10000)
+    parser.add_argument("--min-walltime", type=float, default=10.0)
+    parser.add_argument("--max-walltime", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--nb-res", type=int, default=4)
+    parser.add_argument("--workload", help="Static Batsim JSON workload submitted through JOB_SUBMITTED (for schedulers that handle it)")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recorded message stream instead of simulating")
+    parser.add_argument("--endpoint", help="Drive an external scheduler at this ZMQ endpoint instead of the built-in policies")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+
+    workload = None
+    if args.workload:
+        with open(args.workload) as f:
+            workload = json.load(f)
+
+    if args.endpoint:
+        policies = [(args.endpoint, lambda: ZmqScheduler(args.endpoint))]
+    else:
+        jobs = generate_jobs(args.num_jobs, args.min_walltime, args.max_walltime, args.seed)
+        policies = [
+            (algorithm, lambda algorithm=algorithm: make_decider(algorithm, list(jobs), args.chunk_size))
+            for algorithm in args.algorithms
+        ]
+
+    print("\n--- Scheduler Benchmark ---")
+    for label, factory in policies:
+        decide = factory()
+        started = time.perf_counter()
+        if args.replay:
+            latency = replay(decide, args.replay)
+            sim_stats = None
+        else:
+            simulator = FakeBatsim(decide, nb_res=args.nb_res, workload=workload)
+            sim_stats = simulator.run()
+            latency = simulator.latency
+        print(format_benchmark(label, latency, time.perf_counter() - started, sim_stats))
+        if isinstance(decide, ZmqScheduler):
+            decide.close()
+    print("---------------------------\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+MANIFEST_NAME = "figures_manifest.json"
+DEFAULT_RASTER_THRESHOLD = 200_000
+
+
+class FigureSpec:
+    """
+    One output image, described before anything is drawn.
+
+    `build()` returns the Plotly figure; `raster(path)` optionally draws the same
+    data with matplotlib and is used for figures with more than the raster
+    threshold of marks (`size`), when Kaleido cannot run, or always when there
+    is no `build`. `data` lists the
+    DataFrames/arrays the figure is drawn from; together with the code of the
+    builders it decides whether an existing image is still up to date.
+    """
+
+    def __init__(self, filename, build, data=(), raster=None, size=0, scale=None, width=None, height=None):
+        self.filename = filename
+        self.build = build
+        self.data = data
+        self.raster = raster
+        self.size = size
+        self.options = {"scale": scale, "width": width, "height": height}
+
+    def digest(self, use_raster):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.filename}|{self.options}|{use_raster}".encode())
+        for function in (self.build, self.raster):
+            if function is not None:
+                h.update(_code_key(function))
+        for item in self.data:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                h.update(pd.util.hash_pandas_object(item, index=False).to_numpy().tobytes())
+                columns = item.columns if isinstance(item, pd.DataFrame) else [item.name]
+                h.update(",".join(map(str, columns)).encode())
+            else:
+                h.update(np.ascontiguousarray(item).tobytes())
+        return h.hexdigest()
+
+
+def _code_key(function):
+    """Bytecode, constants and simple closure values of a builder, so code edits invalidate images."""
+    code = function.__code__
+    cells = [cell.cell_contents for cell in function.__closure__ or ()]
+    simple = [value for value in cells if isinstance(value, (str, int, float, bool, tuple))]
+    return code.co_code + repr((code.co_consts, simple)).encode()
+
+
+def _load_manifest(path):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def _write_plotly(specs, out_dir, workers):
+    """Exports figures through one persistent Kaleido browser with `workers` tabs rendering concurrently."""
+    figures = [spec.build() for spec in specs]
+    paths = [out_dir / spec.filename for spec in specs]
+    if not hasattr(pio, "write_images"):
+        # Kaleido < 1.0 keeps its own persistent renderer process; export one by one
+        for figure, path, spec in zip(figures, paths, specs):
+            figure.write_image(path, **{k: v for k, v in spec.options.items() if v is not None})
+        return
+    import kaleido
+    from choreographer.browsers.chromium import Chromium
+
+    # The sync server starts Chrome in its own thread, where a missing browser would leave
+    # the export waiting forever; look Chrome up the way Kaleido does before starting it
+    if Chromium.find_browser(skip_local=False) is None:
+        raise RuntimeError("Kaleido requires Chrome; install it with `kaleido_get_chrome`")
+    kaleido.start_sync_server(n=workers, silence_warnings=True)
+    try:
+        pio.write_images(
+            figures, paths,
+            scale=[spec.options["scale"] for spec in specs],
+            width=[spec.options["width"] for spec in specs],
+            height=[spec.options["height"] for spec in specs]
+        )
+    finally:
+        kaleido.stop_sync_server(silence_warnings=True)
+
+
+def render_figures(specs, out_dir, workers=4, raster_threshold=DEFAULT_RASTER_THRESHOLD, force=False):
+    """
+    Renders all `specs` into `out_dir`, skipping images whose inputs did not change.
+
+    Vector figures are exported together (see _write_plotly); figures above
+    `raster_threshold` marks that have a raster fallback are drawn with
+    matplotlib instead. If Kaleido is unavailable, every figure with a fallback
+    is rasterized. Returns {filename: status}.
+    """
+    out_dir = Path(out_dir)
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path)
+    status = {}
+    vector, raster, digests = [], [], {}
+
+    for spec in specs:
+        use_raster = spec.raster is not None and (spec.build is None or spec.size > raster_threshold)
+        digest = spec.digest(use_raster)
+        # An image rasterized because Kaleido was unavailable also counts as current
+        current = {digest, spec.digest(True)} if spec.raster is not None else {digest}
+        if not force and manifest.get(spec.filename) in current and (out_dir / spec.filename).exists():
+            status[spec.filename] = "up to date"
+            continue
+        digests[spec.filename] = digest
+        (raster if use_raster else vector).append(spec)
+
+    if vector:
+        try:
+            _write_plotly(vector, out_dir, workers)
+            status.update({spec.filename: "rendered" for spec in vector})
+        except (RuntimeError, ImportError) as error:
+            # Typically Kaleido without a Chrome install
+            for spec in vector:
+                if spec.raster is not None:
+                    raster.append(spec)
+                    digests[spec.filename] = spec.digest(True)
+                else:
+                    status[spec.filename] = f"failed: {str(error).strip().splitlines()[0]}"
+                    digests.pop(spec.filename)
+
+    for spec in raster:
+        spec.raster(out_dir / spec.filename)
+        status[spec.filename] = "rasterized"
+
+    manifest.update(digests)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return {spec.filename: status[spec.filename] for spec in specs}
+
+
+# --- matplotlib raster fallbacks ---
+
+def _color_groups(df, color):
+    if color is None:
+        return [(None, df)]
+    return list(df.groupby(color, observed=True, sort=True))
+
+
+def raster_scatter(path, df, x, y, color=None, title=None, xlabel=None, ylabel=None, dpi=150):
+    """Scatter plot drawn as a rasterized matplotlib image; cost grows with points, not with DOM size."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for name, group in _color_groups(df, color):
+        ax.scatter(group[x], group[y], s=2, alpha=0.6, linewidths=0, rasterized=True,
+                   label=None if name is None else str(name))
+    ax.set(title=title, xlabel=xlabel or x, ylabel=ylabel or y)
+    if color is not None:
+        ax.legend(title=color, markerscale=4, fontsize="small")
+    fig.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
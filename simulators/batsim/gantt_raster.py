@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from occupancy import parse_allocations
+
+DEFAULT_WIDTH = 1600
+DEFAULT_HEIGHT = 800
+BACKGROUND = (1.0, 1.0, 1.0)
+
+
+def rasterize(start, end, first_host, last_host, categories, nb_categories, nb_hosts,
+              t_min, t_max, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """
+    Coverage canvas of shape (nb_categories, rows, width) for host-range x time rectangles.
+
+    Every rectangle adds +1/-1 at its four corners of a 2D difference array (one
+    np.bincount over all rectangles) and a cumulative sum along both axes turns
+    that into per-pixel coverage, so the cost is O(rectangles + pixels).
+    Rectangles narrower than a pixel still cover one pixel column.
+    """
+    rows = min(height, nb_hosts)
+    span = max(t_max - t_min, 1e-12)
+    x0 = np.clip(np.floor((start - t_min) / span * width), 0, width - 1).astype(np.int64)
+    x1 = np.clip(np.ceil((end - t_min) / span * width), 0, width).astype(np.int64)
+    x1 = np.maximum(x1, x0 + 1)
+    y0 = np.floor(first_host * rows / nb_hosts).astype(np.int64)
+    y1 = np.maximum(np.ceil((last_host + 1) * rows / nb_hosts).astype(np.int64), y0 + 1)
+
+    stride_y, stride_c = width + 1, (rows + 1) * (width + 1)
+    base = categories.astype(np.int64) * stride_c
+    corners = np.concatenate([base + y0 * stride_y + x0, base + y0 * stride_y + x1,
+                              base + y1 * stride_y + x0, base + y1 * stride_y + x1])
+    weights = np.concatenate([np.ones_like(x0), -np.ones_like(x0), -np.ones_like(x0), np.ones_like(x0)])
+    diff = np.bincount(corners, weights=weights, minlength=nb_categories * stride_c)
+    diff = diff.reshape(nb_categories, rows + 1, width + 1)
+    return diff.cumsum(axis=1).cumsum(axis=2)[:, :rows, :width]
+
+
+def colorize(coverage, palette):
+    """RGB image where each pixel takes the color of its most-covering category."""
+    dominant = coverage.argmax(axis=0)
+    image = np.asarray(palette, dtype=float)[dominant]
+    image[coverage.sum(axis=0) <= 0] = BACKGROUND
+    return image
+
+
+def gantt_canvas(jobs_df, color=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                 nb_hosts=None, time_range=None):
+    """
+    Rasterizes jobs onto a host x time canvas from `allocated_resources`.
+
+    Returns (coverage, labels, nb_hosts, (t_min, t_max)); `labels` are the
+    categories of `color` (or a single "jobs" category).
+    """
+    started = jobs_df[jobs_df["starting_time"].notna() & jobs_df["allocated_resources"].notna()]
+    rows, first_host, last_host = parse_allocations(started["allocated_resources"])
+    if color is None:
+        codes, labels = np.zeros(len(started), dtype=np.int64), ["jobs"]
+    else:
+        codes, labels = pd.factorize(started[color], sort=True)
+        labels = [str(label) for label in labels]
+    start = started["starting_time"].to_numpy(dtype=float)
+    end = started["finish_time"].to_numpy(dtype=float)
+    if nb_hosts is None:
+        nb_hosts = int(last_host.max()) + 1 if len(last_host) else 1
+    if time_range is None:
+        time_range = (float(start.min()), float(end.max())) if len(start) else (0.0, 1.0)
+    coverage = rasterize(start[rows], end[rows], first_host, last_host, codes[rows], max(len(labels), 1),
+                         nb_hosts, time_range[0], time_range[1], width, height)
+    return coverage, labels, nb_hosts, time_range
+
+
+def render_gantt(path, jobs_df, color=None, facet=None, title=None,
+                 width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=150):
+    """
+    Saves a raster Gantt chart (hosts on y, time on x) of `jobs_df` to `path`.
+
+    With `facet`, one panel per value (e.g. per scheduler) is drawn on a shared
+    time axis. Cost depends on the canvas size, not on the number of jobs.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
+    panels = [(None, jobs_df)] if facet is None else list(jobs_df.groupby(facet, observed=True, sort=True))
+    time_range = (float(jobs_df["starting_time"].min()), float(jobs_df["finish_time"].max()))
+    if color is not None:
+        all_labels = [str(label) for label in pd.factorize(jobs_df[color], sort=True)[1]]
+    else:
+        all_labels = ["jobs"]
+    palette = {label: plt.get_cmap("tab10" if len(all_labels) <= 10 else "tab20")(i % 20)[:3]
+               for i, label in enumerate(all_labels)}
+
+    panel_height = height / dpi if facet is None else max(2.0, height / dpi / 2)
+    fig, axes = plt.subplots(len(panels), 1, sharex=True, squeeze=False,
+                             figsize=(width / dpi, panel_height * len(panels)))
+    for ax, (name, df) in zip(axes[:, 0], panels):
+        coverage, labels, nb_hosts, _ = gantt_canvas(df, color, width, height, time_range=time_range)
+        image = colorize(coverage, [palette[label] for label in labels])
+        ax.imshow(image, aspect="auto", interpolation="nearest", origin="lower",
+                  extent=(time_range[0], time_range[1], 0, nb_hosts))
+        ax.set_ylabel("Host" if name is None else f"{name}\nHost")
+    axes[-1, 0].set_xlabel("Time (s)")
+    if title:
+        fig.suptitle(title)
+    if color is not None:
+        fig.legend(handles=[Patch(color=palette[label], label=label) for label in all_labels],
+                   title=color, loc="center left", bbox_to_anchor=(1.0, 0.5), fontsize="small")
+    fig.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
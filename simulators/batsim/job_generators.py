@@ -0,0 +1,216 @@
+import math
+import random
+from collections import deque
+
+# --- Arrival processes: infinite iterators of submission times ---
+
+def fixed_arrivals(interval=1.0, start=0.0):
+    t = start
+    while True:
+        yield t
+        t += interval
+
+
+def poisson_arrivals(rate, rng, start=0.0):
+    """Exponential inter-arrival times with `rate` jobs per second."""
+    t = start
+    while True:
+        yield t
+        t += rng.expovariate(rate)
+
+
+def uniform_arrivals(min_interval, max_interval, rng, start=0.0):
+    t = start
+    while True:
+        yield t
+        t += rng.uniform(min_interval, max_interval)
+
+
+ARRIVAL_PROCESSES = ["fixed", "poisson", "uniform"]
+
+
+def make_arrivals(name, rng, rate=1.0, min_interval=0.5, max_interval=1.5):
+    if name == "fixed":
+        return fixed_arrivals(1.0 / rate)
+    elif name == "poisson":
+        return poisson_arrivals(rate, rng)
+    elif name == "uniform":
+        return uniform_arrivals(min_interval, max_interval, rng)
+    else:
+        raise ValueError(f"Unknown arrival process: {name}")
+
+
+# --- Size distributions: callables drawing one value from the rng ---
+
+RES_DISTRIBUTIONS = ["fixed", "uniform", "pow2"]
+WALLTIME_DISTRIBUTIONS = ["uniform", "lognormal"]
+RUNTIME_DISTRIBUTIONS = ["fixed", "fraction"]
+
+
+def make_res_distribution(name, min_res=1, max_res=1):
+    if name == "fixed":
+        return lambda rng: min_res
+    elif name == "uniform":
+        return lambda rng: rng.randint(min_res, max_res)
+    elif name == "pow2":
+        exponents = range(int(math.log2(min_res)), int(math.log2(max_res)) + 1)
+        return lambda rng: 2 ** rng.choice(exponents)
+    else:
+        raise ValueError(f"Unknown resource distribution: {name}")
+
+
+def make_walltime_distribution(name, min_walltime, max_walltime):
+    if name == "uniform":
+        return lambda rng: rng.uniform(min_walltime, max_walltime)
+    elif name == "lognormal":
+        # Median at the geometric mean of the range, ~95% of the mass inside it
+        mu = (math.log(min_walltime) + math.log(max_walltime)) / 2
+        sigma = (math.log(max_walltime) - math.log(min_walltime)) / 4
+        return lambda rng: min(max(rng.lognormvariate(mu, sigma), min_walltime), max_walltime)
+    else:
+        raise ValueError(f"Unknown walltime distribution: {name}")
+
+
+def make_runtime_distribution(name, runtime=15.0):
+    """Actual run time of a job given its walltime."""
+    if name == "fixed":
+        return lambda rng, walltime: runtime
+    elif name == "fraction":
+        return lambda rng, walltime: walltime * rng.uniform(0.5, 1.0)
+    else:
+        raise ValueError(f"Unknown runtime distribution: {name}")
+
+
+def delay_profile(job):
+    """Name and Batsim profile of the delay profile a job runs, shared by jobs of equal (whole second) run time."""
+    seconds = max(1, math.ceil(job["runtime"]))
+    return f"delay_{seconds}s", {"type": "delay", "delay": float(seconds)}
+
+
+def dynamic_jobs(arrivals, res_dist, walltime_dist, runtime_dist, rng, num_jobs=None,
+                 workload_name="dyn", dependency_prob=0.0, max_parents=1, window=32, nb_users=0, qos_mix=None):
+    """
+    Lazily yields jobs in submission order; `num_jobs=None` never stops.
+
+    With `nb_users` each job belongs to one of that many users ("user1", ...), and
+    with `qos_mix` ({name: weight}) it gets a QOS drawn by weight; both are only
+    used by the multifactor priority policy and leave the other draws unchanged.
+
+    With probability `dependency_prob` a job depends on up to `max_parents` jobs
+    drawn from the `window` most recent ones, which gives workflow-shaped DAGs
+    while only ever keeping `window` job ids in memory.
+    """
+    recent = deque(maxlen=window)
+    count = 0
+    for subtime in arrivals:
+        if num_jobs is not None and count >= num_jobs:
+            return
+        count += 1
+        walltime = walltime_dist(rng)
+        job = {
+            "id": f"{workload_name}!job{count}",
+            "res": res_dist(rng),
+            "walltime": walltime,
+            "runtime": runtime_dist(rng, walltime),
+            "subtime": subtime,
+            "parents": []
+        }
+        job["profile"] = delay_profile(job)[0]
+        if nb_users:
+            job["user"] = f"user{rng.randint(1, nb_users)}"
+        if qos_mix:
+            job["qos"] = rng.choices(list(qos_mix), weights=list(qos_mix.values()))[0]
+        if recent and rng.random() < dependency_prob:
+            job["parents"] = rng.sample(list(recent), rng.randint(1, min(max_parents, len(recent))))
+        recent.append(job["id"])
+        yield job
+
+
+class DependencyTracker:
+    """
+    Holds back jobs until all their parents have completed.
+
+    Only unfinished jobs are tracked, so memory is bounded by the jobs currently
+    queued, running or blocked rather than by the total number of jobs.
+    """
+
+    def __init__(self):
+        self.unfinished = set()
+        self.waiting_on = {}
+        self.children = {}
+
+    @property
+    def nb_blocked(self):
+        return len(self.waiting_on)
+
+    def submit(self, job):
+        """Returns the job in a list if it can be submitted now, else keeps it blocked."""
+        self.unfinished.add(job["id"])
+        parents = [parent for parent in job.get("parents", []) if parent in self.unfinished]
+        if not parents:
+            return [job]
+        self.waiting_on[job["id"]] = [job, len(parents)]
+        for parent in parents:
+            self.children.setdefault(parent, []).append(job["id"])
+        return []
+
+    def complete(self, job_id):
+        """Marks a job as completed and returns the children it unblocked."""
+        self.unfinished.discard(job_id)
+        ready = []
+        for child in self.children.pop(job_id, []):
+            entry = self.waiting_on[child]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.waiting_on[child]
+                ready.append(entry[0])
+        return ready
+
+
+def parse_qos_mix(value):
+    """Parses "normal:0.9,high:0.1" into {"normal": 0.9, "high": 0.1}."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition(":")
+        mix[name] = float(weight or 1.0)
+    return mix
+
+
+def add_generator_arguments(parser, dependencies=True, seed=True):
+    """Command-line options shared by the scripts that generate dynamic jobs."""
+    parser.add_argument("--arrival", choices=ARRIVAL_PROCESSES, default="fixed", help="Job arrival process")
+    parser.add_argument("--arrival-rate", type=float, default=1.0, help="Jobs per second (fixed and poisson arrivals)")
+    parser.add_argument("--min-interval", type=float, default=0.5, help="Minimum inter-arrival time (uniform arrivals)")
+    parser.add_argument("--max-interval", type=float, default=1.5, help="Maximum inter-arrival time (uniform arrivals)")
+    parser.add_argument("--res-dist", choices=RES_DISTRIBUTIONS, default="fixed", help="Requested resources distribution")
+    parser.add_argument("--min-res", type=int, default=1, help="Minimum requested resources")
+    parser.add_argument("--max-res", type=int, default=1, help="Maximum requested resources")
+    parser.add_argument("--walltime-dist", choices=WALLTIME_DISTRIBUTIONS, default="uniform", help="Walltime distribution")
+    parser.add_argument("--runtime-dist", choices=RUNTIME_DISTRIBUTIONS, default="fixed",
+                        help="'fixed' runs every job for --runtime seconds, 'fraction' for 50-100%% of its walltime")
+    parser.add_argument("--runtime", type=float, default=15.0, help="Run time of every job with --runtime-dist fixed")
+    parser.add_argument("--nb-users", type=int, default=0, help="Number of users owning the jobs (multifactor fair-share)")
+    parser.add_argument("--qos-mix", type=parse_qos_mix, default=None, metavar="QOS:WEIGHT,...",
+                        help="QOS drawn per job, e.g. normal:0.9,high:0.1 (multifactor priority)")
+    if dependencies:
+        parser.add_argument("--dependency-prob", type=float, default=0.0, help="Probability that a job depends on earlier jobs")
+        parser.add_argument("--max-parents", type=int, default=1, help="Maximum number of parents of a dependent job")
+    if seed:
+        parser.add_argument("--seed", type=int, default=None, help="Random seed")
+
+
+def jobs_from_arguments(args, num_jobs, workload_name="dyn", seed=None):
+    rng = random.Random(seed if seed is not None else getattr(args, "seed", None))
+    return dynamic_jobs(
+        make_arrivals(args.arrival, rng, args.arrival_rate, args.min_interval, args.max_interval),
+        make_res_distribution(args.res_dist, args.min_res, args.max_res),
+        make_walltime_distribution(args.walltime_dist, args.min_walltime, args.max_walltime),
+        make_runtime_distribution(args.runtime_dist, args.runtime),
+        rng,
+        num_jobs=num_jobs,
+        workload_name=workload_name,
+        dependency_prob=getattr(args, "dependency_prob", 0.0),
+        max_parents=getattr(args, "max_parents", 1),
+        nb_users=getattr(args, "nb_users", 0),
+        qos_mix=getattr(args, "qos_mix", None)
+    )
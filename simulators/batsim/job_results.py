@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+# One typed schema for the jobs of every simulator: Batsim's out_jobs.csv columns.
+# Repeated strings are dictionary-encoded.
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+JOB_SCHEMA = pa.schema([
+    ("job_id", pa.string()),
+    ("workload_name", _CATEGORY),
+    ("profile", _CATEGORY),
+    ("submission_time", pa.float64()),
+    ("requested_number_of_resources", pa.int64()),
+    ("requested_time", pa.float64()),
+    ("success", pa.int64()),
+    ("final_state", _CATEGORY),
+    ("starting_time", pa.float64()),
+    ("execution_time", pa.float64()),
+    ("finish_time", pa.float64()),
+    ("waiting_time", pa.float64()),
+    ("turnaround_time", pa.float64()),
+    ("stretch", pa.float64()),
+    ("allocated_resources", pa.string()),
+    ("consumed_energy", pa.float64()),
+    ("metadata", pa.string()),
+])
+MACHINE_STATE_SCHEMA = pa.schema([
+    ("time", pa.float64()),
+    ("nb_sleeping", pa.int64()),
+    ("nb_switching_on", pa.int64()),
+    ("nb_switching_off", pa.int64()),
+    ("nb_idle", pa.int64()),
+    ("nb_computing", pa.int64()),
+])
+# Run summary of Batsim's out_schedule.csv (one row); consumed_joules is the whole
+# platform's energy, 0 when Batsim ran without --energy
+SCHEDULE_SCHEMA = pa.schema([
+    ("batsim_version", pa.string()),
+    ("consumed_joules", pa.float64()),
+    ("makespan", pa.float64()),
+    ("nb_jobs", pa.int64()),
+    ("nb_jobs_finished", pa.int64()),
+    ("nb_jobs_killed", pa.int64()),
+    ("nb_jobs_rejected", pa.int64()),
+    ("nb_machine_switches", pa.int64()),
+    ("time_computing", pa.float64()),
+    ("time_idle", pa.float64()),
+    ("time_sleeping", pa.float64()),
+    ("time_switching_off", pa.float64()),
+    ("time_switching_on", pa.float64()),
+])
+
+# Default AccaSim "schedule_output" format (config/essentials.config):
+# {job_id};{user};{queue_time}__{assignations}__{start_time};{end_time};{total_nodes};{total_cpu};{total_mem};{expected_duration};
+# where assignations is "node;cores;mem#" repeated for every allocated node
+ACCASIM_HEAD_FIELDS = ["job_id", "user", "queue_time"]
+ACCASIM_TAIL_FIELDS = ["start_time", "end_time", "total_nodes", "total_cpu", "total_mem", "expected_duration"]
+ACCASIM_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+ACCASIM_FINAL_STATE = "COMPLETED_SUCCESSFULLY"
+
+
+def to_job_table(df):
+    """Casts a job DataFrame to JOB_SCHEMA; missing columns are null (consumed_energy -1, as Batsim without energy)."""
+    columns = {}
+    for field in JOB_SCHEMA:
+        if field.name in df:
+            values = df[field.name]
+            if pa.types.is_string(field.type) or pa.types.is_dictionary(field.type):
+                values = values.astype("string")
+            columns[field.name] = pa.array(values, from_pandas=True)
+        elif field.name == "consumed_energy":
+            columns[field.name] = pa.array(np.full(len(df), -1.0))
+        else:
+            columns[field.name] = pa.nulls(len(df))
+    return pa.table({name: array.cast(JOB_SCHEMA.field(name).type) for name, array in columns.items()},
+                    schema=JOB_SCHEMA)
+
+
+def read_batsim_jobs(path):
+    """Batsim out_jobs.csv (also written by des_sim.py) as a JOB_SCHEMA table."""
+    return to_job_table(pd.read_csv(path, dtype={"job_id": str, "metadata": str}))
+
+
+def read_batsim_machine_states(path):
+    """Batsim out_machine_states.csv as a MACHINE_STATE_SCHEMA table."""
+    df = pd.read_csv(path)
+    return pa.table({field.name: pa.array(df[field.name]).cast(field.type) for field in MACHINE_STATE_SCHEMA},
+                     schema=MACHINE_STATE_SCHEMA)
+
+
+def read_batsim_schedule(path):
+    """Batsim out_schedule.csv as a SCHEDULE_SCHEMA table; columns this Batsim version lacks are null."""
+    df = pd.read_csv(path, dtype={"batsim_version": str})
+    return pa.table({field.name: pa.array(df[field.name], from_pandas=True).cast(field.type) if field.name in df
+                     else pa.nulls(len(df), field.type) for field in SCHEDULE_SCHEMA}, schema=SCHEDULE_SCHEMA)
+
+
+def _seconds(strings):
+    return pc.cast(pc.strptime(strings, format=ACCASIM_TIME_FORMAT, unit="s"), pa.int64()).to_numpy(
+        zero_copy_only=False)
+
+
+def _constant(value, n):
+    return pa.DictionaryArray.from_arrays(pa.array(np.zeros(n, dtype=np.int32)), pa.array([value]))
+
+
+def read_accasim_sched(path, workload_name=None):
+    """
+    Reads an AccaSim sched-*.swf file into a JOB_SCHEMA table plus the host of
+    every allocation.
+
+    The whole file is parsed with Arrow compute kernels (splitting on the "__" and
+    ";" separators, timestamp parsing and list operations over all lines), so no
+    Python code runs per job. Times become seconds since the first submission,
+    which is time 0 of the workload as in Batsim when the workload starts at 0.
+    Node ids (1-based in AccaSim) become 0-based hosts written as a Batsim interval
+    set; a node listed twice for one job (AccaSim allocates cores) is kept once.
+    The file only lists jobs that ran to completion, so every job is successful.
+    AccaSim has a one-second resolution, so stretch uses an execution time of at
+    least one second.
+
+    Returns (jobs, allocation_job, allocation_host), the last two being the job row
+    and host of every allocated node.
+    """
+    lines = pv.read_csv(path, read_options=pv.ReadOptions(column_names=["line"]),
+                        parse_options=pv.ParseOptions(delimiter="\x1f", quote_char=False),
+                        convert_options=pv.ConvertOptions(column_types={"line": pa.string()}))["line"]
+    parts = pc.split_pattern(lines.combine_chunks(), "__")
+    if len(parts) and pc.min(pc.list_value_length(parts)).as_py() != 3:
+        raise ValueError(f"{path}: not in AccaSim's default schedule_output format")
+    head = pc.split_pattern(pc.list_element(parts, 0), ";", max_splits=2)
+    tail = pc.split_pattern(pc.list_element(parts, 2), ";")
+    field = dict(zip(ACCASIM_HEAD_FIELDS, (pc.list_element(head, i) for i in range(len(ACCASIM_HEAD_FIELDS)))))
+    field.update(zip(ACCASIM_TAIL_FIELDS, (pc.list_element(tail, i) for i in range(len(ACCASIM_TAIL_FIELDS)))))
+    nb_jobs = len(parts)
+
+    queued, start, end = (_seconds(field[name]) for name in ("queue_time", "start_time", "end_time"))
+    origin = queued.min() if nb_jobs else 0
+    submission, starting, finish = queued - origin, start - origin, end - origin
+
+    # "1;2;141252#2;2;896959#" -> [1, 2] -> 0-based hosts, sorted and unique per job
+    blocks = pc.split_pattern(pc.list_element(parts, 1), "#")
+    flat = pc.list_flatten(blocks)
+    non_empty = pc.not_equal(flat, "").to_numpy(zero_copy_only=False)
+    nodes = pc.list_element(pc.split_pattern(pc.filter(flat, non_empty), ";", max_splits=1), 0)
+    allocation_host = pc.cast(nodes, pa.int64()).to_numpy() - 1
+    allocation_job = pc.list_parent_indices(blocks).to_numpy()[non_empty]
+    order = np.lexsort((allocation_host, allocation_job))
+    allocation_job, allocation_host = allocation_job[order], allocation_host[order]
+    unique = np.concatenate(([True], (np.diff(allocation_job) != 0) | (np.diff(allocation_host) != 0)))
+    allocation_job, allocation_host = allocation_job[unique], allocation_host[unique]
+    offsets = pa.array(np.concatenate(([0], np.cumsum(np.bincount(allocation_job, minlength=nb_jobs)))), pa.int32())
+    allocated = pc.binary_join(pa.ListArray.from_arrays(offsets, pc.cast(pa.array(allocation_host), pa.string())),
+                               " ")
+
+    execution = (finish - starting).astype(float)
+    turnaround = (finish - submission).astype(float)
+    jobs = {
+        "job_id": field["job_id"],
+        "workload_name": _constant(workload_name or "accasim", nb_jobs),
+        "profile": _constant("accasim", nb_jobs),
+        "submission_time": submission.astype(float),
+        "requested_number_of_resources": pc.cast(field["total_nodes"], pa.int64()),
+        "requested_time": pc.cast(field["expected_duration"], pa.float64()),
+        "success": np.ones(nb_jobs, dtype=np.int64),
+        "final_state": _constant(ACCASIM_FINAL_STATE, nb_jobs),
+        "starting_time": starting.astype(float),
+        "execution_time": execution,
+        "finish_time": finish.astype(float),
+        "waiting_time": (starting - submission).astype(float),
+        "turnaround_time": turnaround,
+        "stretch": turnaround / np.maximum(execution, 1.0),
+        "allocated_resources": allocated,
+        "consumed_energy": np.full(nb_jobs, -1.0),
+        "metadata": pa.nulls(nb_jobs, pa.string()),
+    }
+    return pa.table(jobs).cast(JOB_SCHEMA), allocation_job, allocation_host
+
+
+def machine_states_from_allocations(jobs, allocation_job, allocation_host, nb_hosts=None):
+    """
+    Batsim-style machine states (computing / idle host counts over time) rebuilt
+    from job intervals, for simulators that do not write them.
+
+    A host shared by several jobs (AccaSim allocates cores) counts once: per-host
+    job counts are accumulated over the host's start/finish events and only their
+    0 -> 1 and 1 -> 0 transitions change the number of computing hosts.
+    `nb_hosts` defaults to the highest host used plus one.
+    """
+    starts = jobs["starting_time"].to_numpy()[allocation_job]
+    finishes = jobs["finish_time"].to_numpy()[allocation_job]
+    if nb_hosts is None:
+        nb_hosts = int(allocation_host.max()) + 1 if len(allocation_host) else 0
+    host = np.concatenate((allocation_host, allocation_host))
+    time = np.concatenate((starts, finishes))
+    delta = np.concatenate((np.ones(len(starts), dtype=np.int64), -np.ones(len(finishes), dtype=np.int64)))
+    # Per host in time order, finishes before starts at the same time
+    order = np.lexsort((delta, time, host))
+    host, time, delta = host[order], time[order], delta[order]
+    # Every host's events sum to zero, so the running total restarts at 0 for each host
+    busy = np.cumsum(delta) > 0
+    was_busy = np.concatenate(([False], busy[:-1]))
+    was_busy[np.flatnonzero(np.diff(host)) + 1] = False
+    change = busy.astype(np.int64) - was_busy
+    changed = change != 0
+    time, change = time[changed], change[changed]
+    order = np.argsort(time, kind="stable")
+    time, computing = time[order], np.cumsum(change[order])
+    # Last count at every distinct time, starting from all hosts idle at time 0
+    last = np.concatenate((np.diff(time) != 0, [True])) if len(time) else np.zeros(0, dtype=bool)
+    time, computing = time[last], computing[last]
+    if not len(time) or time[0] > 0:
+        time, computing = np.concatenate(([0.0], time)), np.concatenate(([0], computing))
+    zeros = np.zeros(len(time), dtype=np.int64)
+    return pa.table({"time": time, "nb_sleeping": zeros, "nb_switching_on": zeros, "nb_switching_off": zeros,
+                     "nb_idle": nb_hosts - computing, "nb_computing": computing}, schema=MACHINE_STATE_SCHEMA)
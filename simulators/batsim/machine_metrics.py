@@ -0,0 +1,259 @@
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+STATE_COLUMNS = ["nb_computing", "nb_idle", "nb_sleeping", "nb_switching_on", "nb_switching_off"]
+# Columns that, with the scheduler, identify one run (see result_store.PARTITION_KEYS).
+# Step functions only make sense within a run, so they are integrated per run first.
+RUN_COLUMNS = ["seed", "workload"]
+# Batsim treats hosts named like this as the master host, not as a compute resource
+MASTER_HOST = "master_host"
+_SPEED_PREFIXES = {"": 1.0, "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18}
+
+
+def _run_keys(df, group_col, run_cols):
+    """[group_col] plus the run columns `df` has: the columns identifying one simulation run."""
+    return [group_col] + [col for col in run_cols if col in df and col != group_col]
+
+
+def _sorted_steps(machines_df, keys, end_times):
+    """
+    Sorts machine states by (keys, time) and returns (codes, runs, times, durations, df).
+
+    Each row holds until the next row of the same run (distinct values of `keys`);
+    the last row of a run holds until that run's end time (if given), otherwise it
+    has zero duration. `runs` is a MultiIndex of the runs, in code order.
+    """
+    df = machines_df.sort_values(keys + ["time"], kind="stable")
+    codes, runs = pd.MultiIndex.from_frame(df[keys]).factorize()
+    runs = pd.MultiIndex.from_tuples(runs, names=keys)
+    times = df["time"].to_numpy(dtype=float)
+
+    next_times = np.empty_like(times)
+    next_times[:-1] = times[1:]
+    last = np.ones(len(times), dtype=bool)
+    last[:-1] = codes[1:] != codes[:-1]
+    group_end = times.copy()
+    if end_times is not None:
+        ends = end_times.reindex(runs).to_numpy(dtype=float)
+        group_end = np.where(np.isnan(ends[codes]), times, np.maximum(ends[codes], times))
+    next_times[last] = group_end[last]
+    return codes, runs, times, next_times - times, df
+
+
+def read_platform_wattage(platform_path):
+    """
+    Average per-host wattage (W) per machine state from a SimGrid platform XML.
+
+    Built from read_host_power, so hosts of a <cluster> count too; the master host
+    is not a compute resource and is left out. Hosts without a sleep pstate draw
+    their idle wattage in the sleeping and switching states. None when no compute
+    host has wattage properties.
+    """
+    hosts = [power for name, power in read_host_power(platform_path).items() if name != MASTER_HOST]
+    if not hosts:
+        return None
+    watts = {state: [] for state in STATE_COLUMNS}
+    for power in hosts:
+        can_sleep = power["sleep_pstate"] is not None
+        watts["nb_computing"].append(power["full"])
+        watts["nb_idle"].append(power["idle"])
+        watts["nb_sleeping"].append(power["sleep"] if can_sleep else power["idle"])
+        watts["nb_switching_on"].append(power["switch_on"] if can_sleep else power["idle"])
+        watts["nb_switching_off"].append(power["switch_off"] if can_sleep else power["idle"])
+    return {state: float(np.mean(values)) for state, values in watts.items()}
+
+
+def _parse_speed(value):
+    """Flop/s of a SimGrid speed such as "100.0Mf" or "0.006666667f"."""
+    match = re.fullmatch(r"\s*([0-9.eE+-]+)\s*([kMGTPE]?)f\s*", value)
+    return float(match.group(1)) * _SPEED_PREFIXES[match.group(2)]
+
+
+def read_host_power(platform_path):
+    """
+    Per-host power model from a SimGrid platform XML: {host name: {...}}.
+
+    Gives the idle/full wattage of pstate 0, and for hosts with `sleep_pstates`
+    the first sleep pstate with its sleep and switch wattages. Switch durations are
+    those of the virtual pstates, which compute one flop at their speed (as Batsim
+    does). Hosts of a <cluster> share its properties. Hosts without wattage
+    properties are ignored.
+    """
+    hosts = {}
+    root = ET.parse(platform_path).getroot()
+    for host in [*root.iter("host"), *root.iter("cluster")]:
+        props = {prop.get("id"): prop.get("value") for prop in host.iter("prop")}
+        if "wattage_per_state" not in props:
+            continue
+        pstates = [tuple(float(w) for w in state.split(":")) for state in props["wattage_per_state"].split(",")]
+        speeds = [_parse_speed(speed) for speed in host.get("speed", "1f").split(",")]
+        power = {"idle": pstates[0][0], "full": pstates[0][-1], "sleep_pstate": None}
+        if props.get("sleep_pstates"):
+            sleep_state, off_state, on_state = (int(p) for p in props["sleep_pstates"].split(",")[0].split(":"))
+            power.update({
+                "sleep_pstate": sleep_state,
+                "sleep": pstates[sleep_state][0],
+                "switch_off": pstates[off_state][0],
+                "switch_on": pstates[on_state][0],
+                "switch_off_time": 1.0 / speeds[off_state],
+                "switch_on_time": 1.0 / speeds[on_state]
+            })
+        if host.tag == "cluster":
+            # Cluster properties apply to every host prefix<radical>suffix
+            for part in host.get("radical").split(","):
+                first, _, last = part.partition("-")
+                for i in range(int(first), int(last or first) + 1):
+                    hosts[f"{host.get('prefix')}{i}{host.get('suffix')}"] = power
+        else:
+            hosts[host.get("id")] = power
+    return hosts
+
+
+def break_even_time(power):
+    """
+    Shortest idle period (s) worth sleeping through: switching off and on again
+    costs more than staying idle for any shorter period. Infinite without a sleep pstate.
+    """
+    if power.get("sleep_pstate") is None or power["idle"] <= power["sleep"]:
+        return float("inf")
+    switch_time = power["switch_off_time"] + power["switch_on_time"]
+    switch_energy = power["switch_off"] * power["switch_off_time"] + power["switch_on"] * power["switch_on_time"]
+    return max(switch_time, (switch_energy - power["sleep"] * switch_time) / (power["idle"] - power["sleep"]))
+
+
+def time_weighted_states(machines_df, jobs_df=None, group_col="scheduler", wattage=None, run_cols=RUN_COLUMNS,
+                         schedule_df=None):
+    """
+    Exact time-weighted machine-state metrics per group from out_machine_states.csv.
+
+    The state counts are step functions of time, so each row is weighted by how
+    long it holds instead of counting event rows equally. They are integrated per
+    run (group plus the `run_cols` the frame has), each run ending at its last job
+    finish time when `jobs_df` is given, and the runs of a group are then pooled:
+    fractions are taken over the machine-seconds of all its runs, while duration
+    and energy are means per run.
+
+    Energy is the whole platform's, decided per run: Batsim's `consumed_joules`
+    from `schedule_df` (out_schedule.csv) when that run was simulated with
+    --energy, otherwise the machine-state integral times the platform `wattage`
+    (see read_platform_wattage) when given. Runs with neither are left out of
+    the energy columns.
+    """
+    keys = _run_keys(machines_df, group_col, run_cols)
+    end_times = None
+    if jobs_df is not None:
+        end_times = jobs_df.groupby(keys, observed=True)["finish_time"].max()
+    codes, runs, _, durations, df = _sorted_steps(machines_df, keys, end_times)
+
+    per_run = pd.DataFrame({state: np.bincount(codes, weights=df[state].to_numpy(dtype=float) * durations,
+                                               minlength=len(runs))
+                            for state in STATE_COLUMNS}, index=runs)
+    per_run["elapsed"] = np.bincount(codes, weights=durations, minlength=len(runs))
+    if jobs_df is not None:
+        per_run["jobs"] = jobs_df.groupby(keys, observed=True).size().reindex(runs)
+    energy = pd.Series(np.nan, index=runs)
+    if wattage is not None:
+        energy = sum(per_run[state] * wattage[state] for state in STATE_COLUMNS)
+    if schedule_df is not None and len(schedule_df):
+        # Batsim writes 0 joules when its energy plugin was off
+        measured = schedule_df[schedule_df["consumed_joules"] > 0]
+        measured = measured.groupby(keys, observed=True)["consumed_joules"].sum().reindex(runs)
+        energy = measured.where(measured.notna(), energy)
+    if energy.notna().any():
+        per_run["energy"] = energy
+
+    by_group = per_run.groupby(level=group_col, observed=True, sort=False)
+    totals = by_group.sum(min_count=1)
+    nb_runs = by_group.size()
+    machine_seconds = totals[STATE_COLUMNS].sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = pd.DataFrame({
+            "runs": nb_runs,
+            "duration": totals["elapsed"] / nb_runs,
+            "utilization": totals["nb_computing"] / machine_seconds,
+            "idle_fraction": totals["nb_idle"] / machine_seconds,
+            "sleeping_fraction": totals["nb_sleeping"] / machine_seconds,
+            "switching_fraction": (totals["nb_switching_on"] + totals["nb_switching_off"]) / machine_seconds,
+            "mean_computing": totals["nb_computing"] / totals["elapsed"]
+        })
+        result.index.name = group_col
+        if "energy" in per_run:
+            with_energy = per_run[per_run["energy"].notna()].groupby(level=group_col, observed=True, sort=False)
+            result["energy_joules"] = with_energy["energy"].mean()
+            if "jobs" in per_run:
+                result["energy_per_job"] = with_energy["energy"].sum() / with_energy["jobs"].sum()
+
+    return result
+
+
+def windowed_utilization(machines_df, nb_windows=50, jobs_df=None, group_col="scheduler", run_cols=RUN_COLUMNS):
+    """
+    Time-weighted utilization over `nb_windows` equal windows of every run.
+
+    The per-window values are far less autocorrelated than raw event rows, which
+    makes them a better sample for comparing schedulers; the windows of all runs
+    of a group form its sample. Rows carry the group and run columns.
+    """
+    keys = _run_keys(machines_df, group_col, run_cols)
+    end_times = None
+    if jobs_df is not None:
+        end_times = jobs_df.groupby(keys, observed=True)["finish_time"].max()
+    codes, runs, times, durations, df = _sorted_steps(machines_df, keys, end_times)
+    computing = df["nb_computing"].to_numpy(dtype=float)
+    total = df[STATE_COLUMNS].to_numpy(dtype=float).sum(axis=1)
+
+    frames = []
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        t = times[start:stop]
+        dt = durations[start:stop]
+        edges = np.linspace(t[0], t[-1] + dt[-1], nb_windows + 1)
+
+        def cumulative(values):
+            # Integral of the step function from t[0] up to each window edge
+            area = np.concatenate(([0.0], np.cumsum(values * dt)))
+            idx = np.clip(np.searchsorted(t, edges, side="right") - 1, 0, len(t) - 1)
+            return area[idx] + values[idx] * np.minimum(edges - t[idx], dt[idx])
+
+        busy = np.diff(cumulative(computing[start:stop]))
+        available = np.diff(cumulative(total[start:stop]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            utilization = busy / available
+        frame = pd.DataFrame({"window_start": edges[:-1], "utilization": utilization})
+        for i, key in enumerate(keys):
+            frame.insert(i, key, runs[codes[start]][i])
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).dropna(subset=["utilization"])
+
+
+def mean_over_runs(df, columns, group_col="scheduler", run_cols=RUN_COLUMNS):
+    """
+    Step functions of `columns` over "time", averaged across the runs of every group.
+
+    Every run is evaluated at the union of its group's time points (holding its
+    value until its next point, and its first value before it starts), so the mean
+    is exact rather than an interleaving of unrelated runs' rows. Returns a long
+    frame [group_col, time, *columns].
+    """
+    keys = _run_keys(df, group_col, run_cols)
+    frames = []
+    for name, group in df.groupby(group_col, observed=True, sort=True):
+        times = np.unique(group["time"].to_numpy(dtype=float))
+        runs = group.groupby(keys[1:], observed=True, sort=False) if len(keys) > 1 else [(None, group)]
+        total = np.zeros((len(times), len(columns)))
+        nb_runs = 0
+        for _, run in runs:
+            run = run.sort_values("time", kind="stable")
+            # Last row at or before every time point
+            idx = np.searchsorted(run["time"].to_numpy(dtype=float), times, side="right") - 1
+            total += run[columns].to_numpy(dtype=float)[np.maximum(idx, 0)]
+            nb_runs += 1
+        frame = pd.DataFrame(total / nb_runs, columns=columns)
+        frame.insert(0, "time", times)
+        frame.insert(0, group_col, name)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else df[[group_col, "time"] + list(columns)].iloc[:0]
@@ -0,0 +1,396 @@
+import copy
+import logging
+
+import numpy as np
+
+from batsim_protocol import (
+    DEFAULT_CHUNK_SIZE,
+    RegistrationBatcher,
+    call_me_later_event,
+    execute_job_event,
+    interval_set,
+    kill_jobs_event,
+    notify_event,
+    parse_interval_set,
+    register_job_event,
+    register_profile_event,
+)
+from job_generators import delay_profile
+
+logger = logging.getLogger("multifactor")
+
+DEFAULT_WEIGHTS = {"age": 1000, "fairshare": 10000, "jobsize": 1000, "partition": 1000, "qos": 10000}
+DEFAULT_QOS_PRIORITIES = {"normal": 0, "high": 100}
+DEFAULT_USER, DEFAULT_QOS, DEFAULT_PARTITION = "default", "normal", "batch"
+
+_SLURM_WEIGHTS = {
+    "PriorityWeightAge": "age",
+    "PriorityWeightFairshare": "fairshare",
+    "PriorityWeightJobSize": "jobsize",
+    "PriorityWeightPartition": "partition",
+    "PriorityWeightQOS": "qos",
+}
+
+
+def slurm_duration(value, default_unit=60.0):
+    """Seconds in a Slurm time value: "days-hours[:min[:sec]]", "hours:min:sec", "min:sec" or minutes."""
+    days = 0
+    if "-" in value:
+        days, value = value.split("-", 1)
+        parts = [int(part) for part in value.split(":")] + [0, 0]
+        return int(days) * 86400 + parts[0] * 3600 + parts[1] * 60 + parts[2]
+    parts = [int(part) for part in value.split(":")]
+    if len(parts) == 1:
+        return parts[0] * default_unit
+    if len(parts) == 2:
+        return parts[0] * 60 + parts[1]
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+class PriorityConfig:
+    """
+    Slurm priority/multifactor settings: factor weights, PriorityMaxAge,
+    PriorityFavorSmall, PriorityDecayHalfLife, PriorityCalcPeriod, plus QOS and
+    partition priorities and per-user fair-share shares (1 by default).
+    """
+
+    def __init__(self, weights=None, max_age=7 * 86400, favor_small=False, decay_half_life=7 * 86400,
+                 calc_period=300, nb_nodes=None, qos_priorities=None, partition_priorities=None, shares=None):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.max_age = max_age
+        self.favor_small = favor_small
+        self.decay_half_life = decay_half_life
+        self.calc_period = calc_period
+        self.nb_nodes = nb_nodes
+        self.qos_priorities = dict(qos_priorities if qos_priorities is not None else DEFAULT_QOS_PRIORITIES)
+        self.partition_priorities = dict(partition_priorities or {DEFAULT_PARTITION: 1})
+        self.shares = dict(shares or {})
+
+    @classmethod
+    def from_slurm_conf(cls, path, **overrides):
+        """Reads the priority settings and PartitionName=... PriorityJobFactor=... lines of a slurm.conf."""
+        config = cls(**overrides)
+        partitions = {}
+        with open(path) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                fields = dict(item.split("=", 1) for item in line.split() if "=" in item)
+                if "PartitionName" in fields:
+                    partitions[fields["PartitionName"]] = int(fields.get("PriorityJobFactor", 1))
+                    continue
+                for key, value in fields.items():
+                    if key in _SLURM_WEIGHTS:
+                        config.weights[_SLURM_WEIGHTS[key]] = int(value)
+                    elif key == "PriorityMaxAge":
+                        config.max_age = slurm_duration(value)
+                    elif key == "PriorityDecayHalfLife":
+                        config.decay_half_life = slurm_duration(value)
+                    elif key == "PriorityCalcPeriod":
+                        config.calc_period = slurm_duration(value)
+                    elif key == "PriorityFavorSmall":
+                        config.favor_small = value.upper() in ("YES", "TRUE", "1")
+        if partitions:
+            config.partition_priorities = partitions
+        return config
+
+
+class MultifactorQueue:
+    """
+    Pending jobs in NumPy arrays, ordered by Slurm's multifactor priority.
+
+    The size, QOS and partition terms are fixed per job and computed once at
+    insertion; age and fair-share are recomputed for the whole queue in one
+    vectorized expression every `calc_period` seconds (like PriorityCalcPeriod).
+    Usage charged by finished jobs is accumulated and only applied at that
+    recalculation, as Slurm does. In between, new jobs are merged into the cached
+    order with one searchsorted/insert per decision and removed jobs are masked
+    out, so a decision does not re-sort the queue. Ties go to the earliest
+    submission.
+    """
+
+    def __init__(self, config=None, capacity=1024):
+        self.config = config or PriorityConfig()
+        self.qos_max = max(max(self.config.qos_priorities.values(), default=0), 1)
+        self.partition_max = max(max(self.config.partition_priorities.values(), default=0), 1)
+        self.jobs = [None] * capacity
+        self.subtime = np.zeros(capacity)
+        self.static = np.zeros(capacity)
+        self.user = np.zeros(capacity, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.slots = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        # Slots freed since the last full calculation may still sit in the cached order
+        self.released = []
+        self.added = []
+
+        self.users = {}
+        self.usage = np.zeros(0)
+        self.usage_time = 0.0
+        # (user code, node-seconds, time) charged since the last calculation
+        self.charges = []
+
+        self.order_slots = np.zeros(0, dtype=np.int64)
+        self.order_keys = np.zeros(0)
+        self.last_calc = None
+        self.stale = True
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = len(self.jobs)
+        self.jobs.extend([None] * capacity)
+        for name in ("subtime", "static", "user", "active"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate((array, np.zeros_like(array))))
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _user_code(self, name):
+        if name not in self.users:
+            self.users[name] = len(self.users)
+            self.usage = np.append(self.usage, 0.0)
+            # A new user changes every normalized share
+            self.stale = True
+        return self.users[name]
+
+    def _static_priority(self, job):
+        config, weights = self.config, self.config.weights
+        nb_nodes = config.nb_nodes or max(job["res"], 1)
+        size = min(job["res"] / nb_nodes, 1.0)
+        if config.favor_small:
+            size = 1.0 - size
+        return (weights["jobsize"] * size
+                + weights["qos"] * config.qos_priorities.get(job.get("qos", DEFAULT_QOS), 0) / self.qos_max
+                + weights["partition"] * config.partition_priorities.get(
+                    job.get("partition", DEFAULT_PARTITION), 0) / self.partition_max)
+
+    def add(self, job):
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.jobs[slot] = job
+        self.subtime[slot] = job["subtime"]
+        self.static[slot] = self._static_priority(job)
+        self.user[slot] = self._user_code(job.get("user", DEFAULT_USER))
+        self.active[slot] = True
+        self.slots[job["id"]] = slot
+        self.added.append(slot)
+
+    def remove(self, job_id):
+        slot = self.slots.pop(job_id)
+        self.active[slot] = False
+        self.jobs[slot] = None
+        self.released.append(slot)
+
+    def _decayed(self, values, since, now):
+        half_life = self.config.decay_half_life
+        if half_life <= 0:
+            return values
+        return values * 0.5 ** (np.maximum(now - since, 0) / half_life)
+
+    def _usage_at(self, now):
+        """Decayed usage per user at `now`, pending charges included, without applying them."""
+        usage = self._decayed(self.usage, self.usage_time, now)
+        if self.charges:
+            codes, node_seconds, times = (np.array(column) for column in zip(*self.charges))
+            usage = usage + np.bincount(codes, weights=self._decayed(node_seconds, times, now),
+                                        minlength=len(usage))
+        return usage
+
+    def charge(self, user, node_seconds, now):
+        """Records the node-seconds of a finished job; they count from the next calculation."""
+        self.charges.append((self._user_code(user), node_seconds, now))
+
+    def fairshare(self, usage=None):
+        """Classic Slurm fair-share factor per user: 2^(-usage_share / normalized_shares)."""
+        usage = self.usage if usage is None else usage
+        shares = np.array([self.config.shares.get(name, 1.0) for name in self.users], dtype=float)
+        shares /= max(shares.sum(), 1e-12)
+        total = usage.sum()
+        usage = usage / total if total > 0 else np.zeros_like(usage)
+        return np.exp2(-usage / np.maximum(shares, 1e-12))
+
+    def _priorities(self, slots, now, fairshare=None):
+        config = self.config
+        fairshare = self._fairshare if fairshare is None else fairshare
+        age = np.clip(now - self.subtime[slots], 0, config.max_age) / max(config.max_age, 1e-12)
+        return (self.static[slots] + config.weights["age"] * age
+                + config.weights["fairshare"] * fairshare[self.user[slots]])
+
+    def _recalculate(self, now):
+        self.usage = self._usage_at(now)
+        self.usage_time = max(self.usage_time, now)
+        self.charges = []
+        self._fairshare = self.fairshare()
+        slots = np.flatnonzero(self.active)
+        priorities = self._priorities(slots, now)
+        order = np.lexsort((self.subtime[slots], -priorities))
+        self.order_slots = slots[order]
+        self.order_keys = -priorities[order]
+        self.last_calc = now
+        self.stale = False
+        self.free.extend(self.released)
+        self.released = []
+        self.added = []
+
+    def _merge_added(self):
+        """Inserts the jobs added since the last calculation at their priority at that time."""
+        slots = np.array(self.added, dtype=np.int64)
+        slots = slots[self.active[slots]]
+        keys = -self._priorities(slots, self.last_calc)
+        order = np.lexsort((self.subtime[slots], keys))
+        slots, keys = slots[order], keys[order]
+        positions = np.searchsorted(self.order_keys, keys, side="right")
+        self.order_keys = np.insert(self.order_keys, positions, keys)
+        self.order_slots = np.insert(self.order_slots, positions, slots)
+        self.added = []
+
+    def order(self, now):
+        """Yields pending jobs from highest to lowest priority."""
+        if self.stale or self.last_calc is None or now - self.last_calc >= self.config.calc_period:
+            self._recalculate(now)
+        elif self.added:
+            self._merge_added()
+        for slot in self.order_slots[self.active[self.order_slots]]:
+            yield self.jobs[slot]
+
+    def priorities(self, now):
+        """{job_id: priority} of every pending job at `now` (for inspection; the queue is left unchanged)."""
+        fairshare = self.fairshare(self._usage_at(now))
+        slots = np.fromiter(self.slots.values(), dtype=np.int64, count=len(self.slots))
+        return dict(zip(self.slots, self._priorities(slots, now, fairshare).tolist()))
+
+
+def make_multifactor_decider(jobs, chunk_size=DEFAULT_CHUNK_SIZE, config=None, metrics=None, preemption=None,
+                             power=None):
+    """
+    Decider running jobs in multifactor priority order on the platform's hosts.
+
+    Unlike the other Python policies, hosts are allocated explicitly: jobs start
+    from the top of the priority order while enough hosts are free, and the first
+    job that does not fit blocks the rest (Slurm's main scheduling loop, without
+    backfill). Completed jobs are charged to their user's fair-share usage.
+
+    With a preemption.QosPreemption, a blocked job whose QOS may preempt others
+    gets lower-QOS running jobs killed and starts once their hosts are released;
+    the victims are registered again as new dynamic jobs. registration_finished is
+    then only sent once the queue is empty, since any queued job may still cause a
+    requeue. With an energy_policy.PowerManager, only awake idle hosts are free and
+    the manager's SET_RESOURCE_STATE requests are added to every reply.
+    """
+    workload_name = "dyn"
+    # Copied: nb_nodes is filled in from SIMULATION_BEGINS
+    config = copy.copy(config or PriorityConfig())
+    queue = MultifactorQueue(config)
+    batcher = RegistrationBatcher(jobs, chunk_size)
+    registered_profiles = set()
+    running = {}
+    killing = set()
+    free_hosts = []
+    state = {"started": False, "registration_finished_sent": False, "next_check": None}
+
+    def decide(now, events):
+        response_events = []
+        released = []
+        requeued = []
+        for event in events:
+            kind, data = event["type"], event.get("data", {})
+            if kind == "SIMULATION_BEGINS":
+                state["started"] = True
+                nb_hosts = data.get("nb_compute_resources", data.get("nb_resources", 1))
+                free_hosts[:] = range(nb_hosts) if power is None else power.begin(data, now)
+                if config.nb_nodes is None:
+                    config.nb_nodes = nb_hosts
+            elif kind in ("JOB_COMPLETED", "JOB_KILLED"):
+                for job_id in data.get("job_ids", [data.get("job_id")]):
+                    if job_id in running:
+                        job, hosts, start = running.pop(job_id)
+                        released.extend(hosts)
+                        if power is not None:
+                            power.released(hosts, now)
+                        queue.charge(job.get("user", DEFAULT_USER), len(hosts) * (now - start), now)
+                        if preemption is not None:
+                            preemption.finished(job_id)
+                            if job_id in killing:
+                                killing.discard(job_id)
+                                if kind == "JOB_KILLED":
+                                    requeued.append(preemption.requeue(job, now))
+            elif kind == "RESOURCE_STATE_CHANGED" and power is not None:
+                released.extend(power.state_changed(parse_interval_set(data["resources"]), data["state"], now))
+        if not state["started"]:
+            return response_events
+        if released:
+            free_hosts.extend(released)
+            free_hosts.sort()
+
+        if metrics is not None and metrics.converged and not batcher.finished:
+            logger.info("[multifactor @ %.2f] Metrics converged, no more jobs are submitted.", now)
+            batcher.close()
+
+        for job in requeued:
+            response_events.append(register_job_event(now, job))
+            queue.add(job)
+
+        for job in batcher.due(now):
+            profile_name, profile_data = delay_profile(job)
+            if profile_name not in registered_profiles:
+                response_events.append(register_profile_event(now, workload_name, profile_name, profile_data))
+                registered_profiles.add(profile_name)
+            response_events.append(register_job_event(now, job))
+            if job["res"] > config.nb_nodes:
+                logger.warning("[multifactor @ %.2f] Rejecting %s: %d hosts requested, %d available.",
+                               now, job["id"], job["res"], config.nb_nodes)
+                response_events.append({"timestamp": now, "type": "REJECT_JOB", "data": {"job_id": job["id"]}})
+                continue
+            queue.add(job)
+            if power is not None:
+                power.submitted(job, now)
+
+        to_start = []
+        nb_missing = 0
+        for job in queue.order(now):
+            if job["res"] > len(free_hosts):
+                nb_missing = job["res"] - len(free_hosts)
+                # One preemption at a time: the victims' hosts come back with their JOB_KILLED
+                if preemption is not None and not killing:
+                    victims = preemption.victims(job, job.get("qos", DEFAULT_QOS), job["res"] - len(free_hosts), now)
+                    if victims:
+                        logger.info("[multifactor @ %.2f] Preempting %d jobs for %s.", now, len(victims), job["id"])
+                        response_events.append(kill_jobs_event(now, victims))
+                        killing.update(victims)
+                break
+            to_start.append(job)
+            hosts = free_hosts[:job["res"]]
+            del free_hosts[:job["res"]]
+            running[job["id"]] = (job, hosts, now)
+            if power is not None:
+                power.allocated(hosts, now)
+            if preemption is not None:
+                preemption.started(job, job.get("qos", DEFAULT_QOS), len(hosts), now)
+            response_events.append(execute_job_event(now, job["id"], interval_set(hosts)))
+        for job in to_start:
+            queue.remove(job["id"])
+
+        if power is not None:
+            power_events, next_check = power.plan(now, free_hosts, nb_missing)
+            response_events.extend(power_events)
+            # One pending call at a time, for the earliest host that may reach its break-even time
+            if state["next_check"] is not None and state["next_check"] <= now:
+                state["next_check"] = None
+            if next_check is not None and (state["next_check"] is None or next_check < state["next_check"]):
+                state["next_check"] = next_check
+                response_events.append(call_me_later_event(now, next_check))
+
+        if batcher.finished:
+            if not state["registration_finished_sent"] and (preemption is None or (not len(queue) and not killing)):
+                response_events.append(notify_event(now, "registration_finished"))
+                state["registration_finished_sent"] = True
+        else:
+            wakeup = batcher.wakeup_event(now)
+            if wakeup is not None:
+                response_events.append(wakeup)
+        return response_events
+
+    return decide
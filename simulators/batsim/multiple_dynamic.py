@@ -1,202 +1,362 @@
-import zmq
-import json
 import random
 import argparse
+import json
+import logging
+import multiprocessing
 import os
 import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def fcfs_scheduler(jobs, executed_jobs, now):
-    return [
-        job for job in sorted(jobs, key=lambda job: job["subtime"])
-        if job["id"] not in executed_jobs and now >= job["subtime"]
-    ]
+from batsim_protocol import (
+    DEFAULT_CHUNK_SIZE,
+    MessageRecorder,
+    RegistrationBatcher,
+    allocate_endpoints,
+    execute_job_event,
+    interval_set,
+    notify_event,
+    register_job_event,
+    register_profile_event,
+    serve,
+)
+from energy_policy import PowerManager
+from job_generators import (
+    add_generator_arguments,
+    delay_profile,
+    dynamic_jobs,
+    fixed_arrivals,
+    jobs_from_arguments,
+    make_res_distribution,
+    make_runtime_distribution,
+    make_walltime_distribution,
+)
+from multifactor import PriorityConfig, make_multifactor_decider
+from online_metrics import DEFAULT_INTERVAL, OnlineMetrics
+from policy_queue import PolicyQueue
+from preemption import QosPreemption, parse_preemptable
+from result_cache import ResultCache, cache_key, tool_version
 
-def sjf_scheduler(jobs, executed_jobs, now):
-    sorted_jobs = sorted(jobs, key=lambda job: job["walltime"])
-    return [
-        job for job in sorted_jobs
-        if job["id"] not in executed_jobs and now >= job["subtime"]
-    ]
+logger = logging.getLogger("multiple_dynamic")
 
-def random_scheduler(jobs, executed_jobs, now):
-    ready_jobs = [
-        job for job in jobs
-        if job["id"] not in executed_jobs and now >= job["subtime"]
-    ]
-    random.shuffle(ready_jobs)
-    return ready_jobs
+def make_decider(algorithm, jobs, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None, priority_config=None,
+                 preemption=None, power=None):
+    """
+    Builds the `decide` callback of one policy. With an OnlineMetrics that has a
+    convergence tolerance, job submission stops once its metrics converged.
+    "multifactor" uses `priority_config` (a multifactor.PriorityConfig), and
+    "qos_preempt" adds QOS preemption with requeue (a preemption.QosPreemption)
+    and "energy" sleeps idle hosts (an energy_policy.PowerManager, required).
+    """
+    if algorithm == "energy":
+        if power is None:
+            raise ValueError("The energy algorithm needs a PowerManager built from the platform")
+        return make_multifactor_decider(jobs, chunk_size, priority_config, metrics, power=power)
+    if algorithm == "qos_preempt":
+        return make_multifactor_decider(jobs, chunk_size, priority_config, metrics, preemption or QosPreemption())
+    if algorithm == "multifactor":
+        return make_multifactor_decider(jobs, chunk_size, priority_config, metrics)
+    workload_name = "dyn"
 
-def easy_bf_scheduler(jobs, executed_jobs, now):
-    waiting_jobs = [
-        job for job in jobs if job["id"] not in executed_jobs and now >= job["subtime"]
-    ]
-    if not waiting_jobs:
-        return []
-    first_job = waiting_jobs[0]
-    backfilled = [first_job]
-    for job in waiting_jobs[1:]:
-        if job["walltime"] <= first_job["walltime"]:
-            backfilled.append(job)
-    return backfilled
-
-def filler_scheduler(jobs, executed_jobs, now):
-    ready_jobs = [
-        job for job in jobs
-        if job["id"] not in executed_jobs and now >= job["subtime"]
-    ]
-    return sorted(ready_jobs, key=lambda job: (job["walltime"], job["res"]))
-
-def select_jobs_to_execute(jobs, executed_jobs, now, algorithm):
-    if algorithm == "fcfs":
-        return fcfs_scheduler(jobs, executed_jobs, now)
-    elif algorithm == "sjf":
-        return sjf_scheduler(jobs, executed_jobs, now)
-    elif algorithm == "random":
-        return random_scheduler(jobs, executed_jobs, now)
-    elif algorithm == "easy_bf":
-        return easy_bf_scheduler(jobs, executed_jobs, now)
-    elif algorithm == "filler":
-        return filler_scheduler(jobs, executed_jobs, now)
-    else:
-        raise ValueError(f"Unknown algorithm: {algorithm}")
+    batcher = RegistrationBatcher(jobs, chunk_size)
+    queue = PolicyQueue(algorithm)
+    registered_profiles = set()
+    started = False
+    registration_finished_sent = False
+    free_hosts = []
+    nb_hosts = 0
+    # job id -> (hosts, expected end), the end (start + walltime) being used for backfilling
+    running = {}
+
+    def decide(now, events):
+        nonlocal started, registration_finished_sent, nb_hosts
+        response_events = []
+
+        for event in events:
+            kind, data = event["type"], event.get("data", {})
+            if kind == "SIMULATION_BEGINS":
+                started = True
+                nb_hosts = data.get("nb_compute_resources", data.get("nb_resources", 1))
+                free_hosts[:] = range(nb_hosts)
+            elif kind in ("JOB_COMPLETED", "JOB_KILLED"):
+                for job_id in data.get("job_ids", [data.get("job_id")]):
+                    if job_id in running:
+                        free_hosts.extend(running.pop(job_id)[0])
+        if not started:
+            return response_events
+        free_hosts.sort()
+
+        if metrics is not None and metrics.converged and not batcher.finished:
+            logger.info("[%s @ %.2f] Metrics converged, no more jobs are submitted.", algorithm, now)
+            batcher.close()
+
+        for job in batcher.due(now):
+            profile_name, profile_data = delay_profile(job)
+            if profile_name not in registered_profiles:
+                logger.info("[%s @ %.2f] Registering profile '%s'.", algorithm, now, profile_name)
+                response_events.append(register_profile_event(now, workload_name, profile_name, profile_data))
+                registered_profiles.add(profile_name)
+            response_events.append(register_job_event(now, job))
+            if job["res"] > nb_hosts:
+                logger.warning("[%s @ %.2f] Rejecting %s: %d hosts requested, %d available.",
+                               algorithm, now, job["id"], job["res"], nb_hosts)
+                response_events.append({"timestamp": now, "type": "REJECT_JOB", "data": {"job_id": job["id"]}})
+                continue
+            queue.push(job["id"], job["subtime"], job["walltime"], job["res"])
+
+        if queue and free_hosts:
+            ends = [(end, len(hosts)) for hosts, end in running.values()]
+            for job_id, res, walltime in queue.select(now, len(free_hosts), ends):
+                hosts = free_hosts[:res]
+                del free_hosts[:res]
+                running[job_id] = (hosts, now + walltime)
+                response_events.append(execute_job_event(now, job_id, interval_set(hosts)))
+
+        if batcher.finished:
+            if not registration_finished_sent:
+                response_events.append(notify_event(now, "registration_finished"))
+                registration_finished_sent = True
+        else:
+            wakeup = batcher.wakeup_event(now)
+            if wakeup is not None:
+                response_events.append(wakeup)
+
+        return response_events
+
+    return decide
+
+def run_scheduler(algorithm, jobs, endpoint="tcp://*:28000", chunk_size=DEFAULT_CHUNK_SIZE, record_path=None,
+                  metrics_options=None, priority_config=None, preemption_options=None, energy_options=None):
+    """
+    `metrics_options` are OnlineMetrics keyword arguments (path, interval, tolerance, ...),
+    `preemption_options` QosPreemption ones (preemptable, path) for "qos_preempt" and
+    `energy_options` PowerManager ones (platform, path) for "energy".
+    """
+    # Imported here so the policies above can be used without pyzmq (fake_batsim.py, des_sim.py)
+    import zmq
 
-def run_scheduler(algorithm, jobs):
     context = zmq.Context()
     socket = context.socket(zmq.REP)
-    socket.bind("tcp://*:28000")
+    socket.bind(endpoint)
+    recorder = MessageRecorder(record_path) if record_path else None
+    metrics = OnlineMetrics(**metrics_options) if metrics_options is not None else None
+    preemption = QosPreemption(**(preemption_options or {})) if algorithm == "qos_preempt" else None
+    power = PowerManager(**energy_options) if algorithm == "energy" else None
+    try:
+        return serve(socket, make_decider(algorithm, jobs, chunk_size, metrics, priority_config, preemption, power),
+                     label=algorithm, recorder=recorder, observer=metrics)
+    finally:
+        if power is not None:
+            power.close()
+        if preemption is not None:
+            preemption.close()
+        if recorder is not None:
+            recorder.close()
+        if metrics is not None:
+            metrics.close()
+        socket.close(linger=0)
+        context.term()
 
-    workload_name = "dyn"
-    profile_name = "delay_15s"
-    profile_data = {"type": "delay", "delay": 15.0}
+def generate_jobs(num_jobs, min_walltime, max_walltime, seed=None, args=None):
+    """Materializes `num_jobs` jobs: one per second, 1 host, 15s run time unless `args` carries generator options."""
+    if args is None:
+        rng = random.Random(seed)
+        jobs = dynamic_jobs(
+            fixed_arrivals(1.0),
+            make_res_distribution("fixed", 1),
+            make_walltime_distribution("uniform", min_walltime, max_walltime),
+            make_runtime_distribution("fixed", 15.0),
+            rng,
+            num_jobs=num_jobs
+        )
+    else:
+        jobs = jobs_from_arguments(args, num_jobs, seed=seed)
+    return list(jobs)
 
-    registered_profile = False
-    registered_jobs = set()
-    executed_jobs = set()
-    registration_finished_sent = False
+def scheduler_process(algorithm, jobs, endpoint, chunk_size, log_path, log_level, record_path=None,
+                      metrics_options=None, priority_config=None, preemption_options=None, energy_options=None):
+    logging.basicConfig(filename=log_path, level=log_level, format="%(message)s")
+    run_scheduler(algorithm, jobs, endpoint, chunk_size, record_path, metrics_options, priority_config,
+                  preemption_options, energy_options)
 
-    while True:
-        msg = socket.recv()
-        message = json.loads(msg)
+def run_simulation(algorithm, seed, jobs, run_dir, bind_endpoint, connect_endpoint,
+                   platform, chunk_size, timeout, log_level="INFO", record=False, metrics_options=None,
+                   priority_config=None, preemption_options=None):
+    """
+    Runs one scheduler/Batsim pair and supervises both processes.
 
-        now = message["now"]
-        events = message["events"]
-        response = {"now": now, "events": []}
+    Batsim exports straight into `run_dir` (prefix `out`), so concurrent runs never
+    share output files. If the scheduler dies, Batsim is stopped instead of waiting
+    for the timeout. With `metrics_options`, online metrics go to `run_dir/metrics.jsonl`,
+    "qos_preempt" logs its preemptions to `run_dir/preemptions.csv`, and "energy" runs
+    Batsim with its energy plugin and writes the scheduler's estimate to `run_dir/energy.json`.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    started = time.perf_counter()
+    # Partition keys picked up by result_store.discover_runs
+    with open(os.path.join(run_dir, "run.json"), "w") as f:
+        json.dump({"scheduler": algorithm, "seed": seed, "workload": "dynamic"}, f)
 
-        for event in events:
-            etype = event["type"]
-            print(f"[{algorithm} @ {now:.2f}] Event received: {etype}")
-
-            if etype == "SIMULATION_BEGINS":
-                if not registered_profile:
-                    print(f"[{now:.2f}] Registering profile '{profile_name}' once.")
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "REGISTER_PROFILE",
-                        "data": {
-                            "workload_name": workload_name,
-                            "profile_name": profile_name,
-                            "profile": profile_data
-                        }
-                    })
-                    registered_profile = True
-
-            elif etype == "SIMULATION_ENDS":
-                print(f"[{algorithm} @ {now:.2f}] Simulation ended.")
-                response["events"] = []
-                socket.send_json(response)
-                break 
-
-        if registered_profile:
-            for job in jobs:
-                job_id = job["id"]
-                if job_id not in registered_jobs:
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "REGISTER_JOB",
-                        "data": {
-                            "job_id": job_id,
-                            "job": {
-                                "id": job_id,
-                                "profile": job["profile"],
-                                "res": job["res"],
-                                "walltime": job["walltime"],
-                                "subtime": job["subtime"]
-                            }
-                        }
-                    })
-                    registered_jobs.add(job_id)
-
-            to_execute = select_jobs_to_execute(jobs, executed_jobs, now, algorithm)
-            for job in to_execute:
-                job_id = job["id"]
-                if job_id in registered_jobs and job_id not in executed_jobs:
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "EXECUTE_JOB",
-                        "data": {
-                            "job_id": job_id,
-                            "alloc": "0"
-                        }
-                    })
-                    executed_jobs.add(job_id)
-
-            if len(registered_jobs) == len(jobs) and not registration_finished_sent:
-                response["events"].append({
-                    "timestamp": now,
-                    "type": "NOTIFY",
-                    "data": {
-                        "type": "registration_finished"
-                    }
-                })
-                registration_finished_sent = True
+    scheduler = multiprocessing.get_context("spawn").Process(
+        target=scheduler_process,
+        args=(algorithm, jobs, bind_endpoint, chunk_size, os.path.join(run_dir, "scheduler.log"), log_level,
+              os.path.join(run_dir, "messages.jsonl") if record else None,
+              None if metrics_options is None else dict(metrics_options, path=os.path.join(run_dir, "metrics.jsonl")),
+              priority_config, dict(preemption_options or {}, path=os.path.join(run_dir, "preemptions.csv")),
+              {"platform": platform, "path": os.path.join(run_dir, "energy.json")}),
+        name=f"{algorithm}-seed{seed}"
+    )
+    scheduler.start()
 
-        socket.send_json(response)
-
-def generate_jobs(num_jobs, min_walltime, max_walltime):
-    jobs = []
-    for i in range(num_jobs):
-        walltime = random.uniform(min_walltime, max_walltime)
-        jobs.append({
-            "id": f"dyn!job{i+1}",
-            "profile": "delay_15s",
-            "res": 1,
-            "walltime": walltime,
-            "subtime": i
-        })
-    return jobs
-
-def move_output_files(algorithm):
-    output_dir = f"{algorithm}_dynamic_results"
-    os.makedirs(output_dir, exist_ok=True)
-    for file in os.listdir("."):
-        if file.startswith("out"):
-            shutil.move(file, os.path.join(output_dir, file))
+    command = [
+        "batsim", "-p", platform,
+        "--enable-dynamic-jobs", "--acknowledge-dynamic-jobs",
+        "-s", connect_endpoint,
+        "--enable-compute-sharing",
+        "-e", os.path.join(run_dir, "out")
+    ]
+    if algorithm == "energy":
+        command.append("--energy")
+    status = "ok"
+    with open(os.path.join(run_dir, "batsim.log"), "w") as log:
+        batsim = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+        deadline = started + timeout
+        while True:
+            try:
+                batsim.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if not scheduler.is_alive() and scheduler.exitcode != 0:
+                status = f"scheduler exited with code {scheduler.exitcode}"
+                batsim.terminate()
+            elif time.perf_counter() > deadline:
+                status = f"timed out after {timeout:.0f}s"
+                batsim.kill()
+
+    scheduler.join(timeout=5)
+    if scheduler.is_alive():
+        scheduler.terminate()
+        scheduler.join()
+    if status == "ok" and batsim.returncode != 0:
+        status = f"batsim exited with code {batsim.returncode}"
+    if status == "ok" and scheduler.exitcode != 0:
+        status = f"scheduler exited with code {scheduler.exitcode}"
+
+    return {
+        "algorithm": algorithm,
+        "seed": seed,
+        "run_dir": run_dir,
+        "status": status,
+        "wall_time": time.perf_counter() - started
+    }
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--num-jobs", type=int, default=10)
     parser.add_argument("--min-walltime", type=float, default=10.0)
     parser.add_argument("--max-walltime", type=float, default=15.0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Maximum number of REGISTER_JOB events per reply")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (DEBUG prints every event)")
+    parser.add_argument("--algorithms", nargs="+",
+                        default=["fcfs", "sjf", "random", "easy_bf", "filler"])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0],
+                        help="Workload seeds; every algorithm is run once per seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of simulations running concurrently")
+    parser.add_argument("--transport", choices=["tcp", "ipc"], default="tcp",
+                        help="ZMQ transport used between Batsim and the scheduler")
+    parser.add_argument("--base-port", type=int, default=28000,
+                        help="First TCP port; run i listens on base-port + i")
+    parser.add_argument("--platform", default="sample_xml.xml")
+    parser.add_argument("--results-dir", default=".")
+    parser.add_argument("--timeout", type=float, default=3600.0,
+                        help="Seconds before a single simulation is killed")
+    parser.add_argument("--record", action="store_true",
+                        help="Record the protocol message stream of each run to messages.jsonl")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Write online metric snapshots of each run to metrics.jsonl")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Simulated seconds between metric snapshots")
+    parser.add_argument("--stop-on-convergence", type=float, metavar="TOL", default=None,
+                        help="Stop submitting jobs once mean waiting time and stretch change by less than TOL "
+                             "(relative) over --convergence-windows snapshots")
+    parser.add_argument("--convergence-windows", type=int, default=3)
+    parser.add_argument("--priority-config", metavar="SLURM_CONF",
+                        help="slurm.conf whose PriorityWeight*/PriorityMaxAge/PriorityDecayHalfLife/... settings "
+                             "and partition PriorityJobFactor drive the multifactor policy")
+    parser.add_argument("--preempt", nargs="+", metavar="QOS:VICTIMS", default=None,
+                        help="QOS allowed to preempt others with qos_preempt, e.g. high:normal (the default)")
+    parser.add_argument("--cache", help="Result cache directory; runs with unchanged inputs are not simulated again")
+    parser.add_argument("--cache-size", type=float, default=20.0, help="Cache size limit in GB (LRU eviction)")
+    add_generator_arguments(parser, dependencies=False, seed=False)
     args = parser.parse_args()
 
-    algorithms = ["fcfs", "sjf", "random", "easy_bf", "filler", "conservative_bf"]
-    original_jobs = generate_jobs(args.num_jobs, args.min_walltime, args.max_walltime)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
 
-    for algorithm in algorithms:
-        print(f"\n=== Running algorithm: {algorithm} ===")
+    metrics_options = None
+    if args.metrics or args.stop_on_convergence is not None:
+        metrics_options = {"interval": args.metrics_interval, "tolerance": args.stop_on_convergence,
+                           "windows": args.convergence_windows}
+    priority_config = PriorityConfig.from_slurm_conf(args.priority_config) if args.priority_config else None
+    preemption_options = {"preemptable": parse_preemptable(args.preempt)} if args.preempt else None
 
-        pid = os.fork()
-        if pid == 0:
-            run_scheduler(algorithm, original_jobs.copy())
-            os._exit(0)
-        else:
+    cache = None
+    if args.cache:
+        cache = ResultCache(args.cache, max_bytes=int(args.cache_size * 1024 ** 3))
+        # The policies live in these sources: editing them invalidates cached runs
+        sources = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                   for name in ("multiple_dynamic.py", "batsim_protocol.py", "policy_queue.py", "multifactor.py",
+                                "preemption.py", "energy_policy.py", "machine_metrics.py", "online_metrics.py",
+                                "job_generators.py")]
+        batsim_version = tool_version("batsim")
 
-            os.system("batsim -p sample_xml.xml --enable-dynamic-jobs --acknowledge-dynamic-jobs -s tcp://localhost:28000 --enable-compute-sharing")
-            os.waitpid(pid, 0)
+    runs, keys = [], {}
+    for seed in args.seeds:
+        original_jobs = generate_jobs(args.num_jobs, args.min_walltime, args.max_walltime, seed, args)
+        for algorithm in args.algorithms:
+            run_dir = os.path.join(args.results_dir, f"{algorithm}_dynamic_results", f"seed_{seed}")
+            if cache is not None:
+                key = cache_key([args.platform, *sources], algorithm=algorithm, jobs=original_jobs,
+                                batsim=batsim_version, chunk_size=args.chunk_size,
+                                priority=vars(priority_config) if priority_config else None,
+                                preempt=args.preempt, metrics=metrics_options)
+                # Outputs of an earlier run must not mix with the restored ones
+                shutil.rmtree(run_dir, ignore_errors=True)
+                if cache.restore(key, run_dir):
+                    with open(os.path.join(run_dir, "run.json"), "w") as f:
+                        json.dump({"scheduler": algorithm, "seed": seed, "workload": "dynamic"}, f)
+                    print(f"[{algorithm} seed={seed}] cached -> {run_dir}")
+                    continue
+                keys[run_dir] = key
+            index = len(runs)
+            bind_endpoint, connect_endpoint = allocate_endpoints(index, args.transport, args.base_port)
+            runs.append((algorithm, seed, original_jobs, run_dir, bind_endpoint, connect_endpoint))
 
-            move_output_files(algorithm)
+    print(f"\n=== Running {len(runs)} simulations on {args.workers} workers ===")
+    results = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(run_simulation, algorithm, seed, list(jobs), run_dir, bind_endpoint,
+                        connect_endpoint, args.platform, args.chunk_size, args.timeout,
+                        args.log_level.upper(), args.record, metrics_options, priority_config,
+                        preemption_options)
+            for algorithm, seed, jobs, run_dir, bind_endpoint, connect_endpoint in runs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["run_dir"] in keys and result["status"] == "ok":
+                cache.store(keys[result["run_dir"]], result["run_dir"],
+                            {"scheduler": result["algorithm"], "seed": result["seed"], "workload": "dynamic"})
+            print(f"[{result['algorithm']} seed={result['seed']}] {result['status']} "
+                  f"in {result['wall_time']:.1f}s -> {result['run_dir']}")
 
-    print("\n All algorithms finished. Results stored in *_dynamic_results folders.")
+    failed = [result for result in results if result["status"] != "ok"]
+    print(f"\n All algorithms finished ({len(results) - len(failed)} ok, {len(failed)} failed). "
+          "Results stored in *_dynamic_results/seed_* folders.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+_DIGIT_0 = ord("0")
+_DASH = ord("-")
+_NEWLINE = ord("\n")
+
+
+def parse_allocations(allocated_resources):
+    """
+    Parses Batsim interval sets ("0-3 7") of many jobs at once.
+
+    Returns (job, first, last) arrays with one inclusive host range per entry,
+    `job` being the position in `allocated_resources`. All strings are joined into
+    one byte buffer and the numbers are decoded with array operations on the
+    digit runs, so no Python code runs per job. Missing values give no range.
+    """
+    text = "\n".join(pd.Series(allocated_resources).fillna("").astype(str).tolist()) + "\n"
+    buffer = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    if len(buffer) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    digits = (buffer >= _DIGIT_0) & (buffer <= _DIGIT_0 + 9)
+    edges = np.diff(np.concatenate(([0], digits.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+
+    # Value of each digit run: digits weighted by powers of ten counted from the run's end
+    lengths = stops - starts
+    run = np.repeat(np.arange(len(starts)), lengths)
+    positions = np.flatnonzero(digits)
+    power = stops[run] - 1 - positions
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    values = np.add.reduceat((buffer[positions] - _DIGIT_0).astype(np.int64) * 10 ** power, offsets) \
+        if len(starts) else np.empty(0, dtype=np.int64)
+
+    # A number directly followed by "-" opens a range closed by the next number
+    opens = buffer[np.minimum(stops, len(buffer) - 1)] == _DASH
+    closes = np.concatenate(([False], opens[:-1]))
+    job = np.cumsum(buffer == _NEWLINE)[starts]
+    keep = ~closes
+    first = values[keep]
+    last = np.where(opens[keep], np.roll(values, -1)[keep], first)
+    return job[keep], first, last
+
+
+def contiguous_blocks(job, first, last):
+    """Number of contiguous host blocks per job, merging adjacent ranges such as "0-3 4-5"."""
+    order = np.lexsort((first, job))
+    job, first, last = job[order], first[order], last[order]
+    new_block = np.ones(len(job), dtype=bool)
+    new_block[1:] = (job[1:] != job[:-1]) | (first[1:] > last[:-1] + 1)
+    return np.bincount(job[new_block], minlength=job.max() + 1 if len(job) else 0)
+
+
+class OccupancyIndex:
+    """
+    Per-host busy intervals of a schedule, stored as CSR arrays sorted by (host, start).
+
+    Built from out_jobs.csv columns (`starting_time`, `finish_time`,
+    `allocated_resources`). Intervals on one host may overlap (compute sharing);
+    a running maximum of end times per host keeps point queries and busy-time
+    sums correct in that case.
+    """
+
+    def __init__(self, jobs_df, nb_hosts=None):
+        started = jobs_df["starting_time"].notna().to_numpy() & jobs_df["allocated_resources"].notna().to_numpy()
+        rows = np.flatnonzero(started)
+        job, first, last = parse_allocations(jobs_df["allocated_resources"].to_numpy()[rows])
+        job = rows[job]
+        self.job_ids = jobs_df["job_id"].to_numpy() if "job_id" in jobs_df else np.arange(len(jobs_df))
+        self.nb_hosts = int(nb_hosts if nb_hosts is not None else (last.max() + 1 if len(last) else 0))
+        self.blocks = np.zeros(len(jobs_df), dtype=np.int64)
+        counts = contiguous_blocks(job, first, last)
+        self.blocks[:len(counts)] = counts
+
+        # Expand ranges into one entry per (host, job)
+        sizes = last - first + 1
+        entry_job = np.repeat(job, sizes)
+        host = np.repeat(first, sizes) + np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        start = jobs_df["starting_time"].to_numpy(dtype=float)[entry_job]
+        end = jobs_df["finish_time"].to_numpy(dtype=float)[entry_job]
+
+        # Composite keys host * span + (time - t_min) order entries by (host, start) with
+        # one argsort, and let one searchsorted answer a query for every host at once
+        self.t_min = float(start.min()) if len(start) else 0.0
+        self.span = float(end.max() - self.t_min) + 1.0 if len(end) else 1.0
+        offset = host * self.span - self.t_min
+        order = np.argsort(start + offset, kind="stable")
+        self.host = host[order]
+        self.start = start[order]
+        self.end = end[order]
+        self.job = entry_job[order]
+        self.start_key = (start + offset)[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.host, minlength=self.nb_hosts))))
+        # Latest end time seen so far on the same host (keys never decrease across hosts)
+        offset = offset[order]
+        self.reach = np.maximum.accumulate(self.end + offset) - offset if len(offset) else self.end
+
+    def host_intervals(self, host):
+        """Busy intervals of one host, ordered by start time."""
+        lo, hi = self.indptr[host], self.indptr[host + 1]
+        return pd.DataFrame({"job_id": self.job_ids[self.job[lo:hi]], "start": self.start[lo:hi],
+                             "end": self.end[lo:hi]})
+
+    def busy_time(self):
+        """Seconds each host spent running at least one job (overlaps counted once)."""
+        previous = np.full(len(self.end), -np.inf)
+        previous[1:] = self.reach[:-1]
+        first_of_host = np.zeros(len(self.end), dtype=bool)
+        first_of_host[self.indptr[:-1][np.diff(self.indptr) > 0]] = True
+        previous[first_of_host] = -np.inf
+        covered = np.clip(self.end - np.maximum(self.start, previous), 0, None)
+        return np.bincount(self.host, weights=covered, minlength=self.nb_hosts)
+
+    def host_utilization(self, t_min=None, t_max=None):
+        """Per-host busy fraction over [t_min, t_max] (default: first start to last end)."""
+        t_min = self.t_min if t_min is None else t_min
+        t_max = self.t_min + self.span - 1.0 if t_max is None else t_max
+        return self.busy_time() / max(t_max - t_min, 1e-12)
+
+    def busy_hosts_at(self, t):
+        """Boolean mask of the hosts running a job at time t."""
+        hosts = np.arange(self.nb_hosts)
+        idx = np.searchsorted(self.start_key, hosts * self.span - self.t_min + t, side="right") - 1
+        has_interval = idx >= self.indptr[:-1]
+        busy = np.zeros(self.nb_hosts, dtype=bool)
+        busy[has_interval] = self.reach[idx[has_interval]] > t
+        return busy
+
+    def free_hosts_at(self, t):
+        """Ids of the hosts idle at time t."""
+        return np.flatnonzero(~self.busy_hosts_at(t))
+
+
+def occupancy_summary(jobs_df, group_col="scheduler"):
+    """Per-group spread of per-host utilization and allocation fragmentation."""
+    rows = []
+    for name, group in jobs_df.groupby(group_col, observed=True, sort=True):
+        index = OccupancyIndex(group)
+        utilization = index.host_utilization()
+        blocks = index.blocks[index.blocks > 0]
+        rows.append({
+            group_col: name,
+            "hosts": index.nb_hosts,
+            "host_util_mean": utilization.mean() if len(utilization) else np.nan,
+            "host_util_min": utilization.min() if len(utilization) else np.nan,
+            "host_util_max": utilization.max() if len(utilization) else np.nan,
+            "mean_blocks_per_job": blocks.mean() if len(blocks) else np.nan,
+            "fragmented_jobs": float(np.mean(blocks > 1)) if len(blocks) else np.nan
+        })
+    return pd.DataFrame(rows).set_index(group_col)
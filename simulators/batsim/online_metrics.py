@@ -0,0 +1,255 @@
+import json
+import math
+import time
+
+from batsim_protocol import parse_interval_set
+
+DEFAULT_INTERVAL = 3600.0
+DEFAULT_ACCURACY = 0.01
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS = ("waiting_time", "turnaround_time", "stretch")
+
+
+class QuantileSketch:
+    """
+    Streaming mean and quantiles with a bounded relative error (DDSketch-style).
+
+    Values are counted in logarithmic buckets of ratio (1 + a) / (1 - a), so any
+    quantile is returned within `relative_accuracy` of the exact one while memory
+    grows with the number of decades spanned, not with the number of values.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.mean = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(k-1), gamma^k] in relative terms
+                return min(max(2 * self.gamma ** key / (self.gamma + 1), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+        summary = {"count": self.count, "mean": self.mean, "min": self.min, "max": self.max}
+        summary.update({f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES})
+        return summary
+
+
+class OnlineMetrics:
+    """
+    Job and machine metrics maintained from the protocol stream, inside the scheduler.
+
+    Submissions come from REGISTER_JOB replies or JOB_SUBMITTED events, starts from
+    EXECUTE_JOB replies and ends from JOB_COMPLETED events, so waiting time,
+    turnaround and stretch (turnaround / execution time) are known as soon as a job
+    finishes, without reading Batsim's CSVs. Utilization and queue length are
+    time-weighted. Only jobs still queued or running are kept in memory.
+
+    REJECT_JOB replies drop a job from the queue and JOB_KILLED events free its hosts;
+    both are counted apart from completions. A requeued copy of a killed job (a
+    REGISTER_JOB with `requeued_from`, see preemption.py) is not a new submission:
+    it keeps the original submission time, so the job gets one waiting time (to its
+    first start) and one turnaround and stretch (at its final completion).
+
+    Every `interval` simulated seconds (and at SIMULATION_ENDS) a snapshot is
+    appended to the JSONL file at `path`. Pass as `observer` to batsim_protocol.serve.
+    """
+
+    def __init__(self, path=None, interval=DEFAULT_INTERVAL, nb_resources=None,
+                 tolerance=None, windows=3, relative_accuracy=DEFAULT_ACCURACY):
+        self.file = open(path, "w") if path else None
+        self.interval = interval
+        self.nb_resources = nb_resources
+        self.tolerance = tolerance
+        self.windows = windows
+        self.sketches = {metric: QuantileSketch(relative_accuracy) for metric in METRICS}
+        # job id -> (subtime, res, requeued_from) while queued, (subtime, start, alloc, requeued_from) while running
+        self.submitted = {}
+        self.running = {}
+        # Original job id -> submission time of killed jobs awaiting a requeued copy
+        self.killed = {}
+        # Jobs per busy host: with compute sharing several jobs may share a host
+        self.host_jobs = {}
+        self.nb_submitted = 0
+        self.nb_completed = 0
+        self.nb_rejected = 0
+        self.nb_killed = 0
+        self.nb_requeued = 0
+        self.last_time = None
+        self.first_time = None
+        self.busy_area = 0.0
+        self.queue_area = 0.0
+        self.next_snapshot = None
+        self.history = []
+        self.converged = False
+        self.started = time.perf_counter()
+
+    def _advance(self, now):
+        if self.last_time is None:
+            self.first_time = self.last_time = now
+            self.next_snapshot = now + self.interval
+        elapsed = now - self.last_time
+        if elapsed > 0:
+            self.busy_area += len(self.host_jobs) * elapsed
+            self.queue_area += len(self.submitted) * elapsed
+            self.last_time = now
+
+    def submit(self, job_id, subtime, res=None, requeued_from=None):
+        if job_id in self.submitted or job_id in self.running:
+            return
+        if requeued_from is not None and requeued_from in self.killed:
+            self.submitted[job_id] = (self.killed.pop(requeued_from), res, requeued_from)
+            self.nb_requeued += 1
+            return
+        self.submitted[job_id] = (subtime, res, None)
+        self.nb_submitted += 1
+
+    def reject(self, job_id):
+        if self.submitted.pop(job_id, None) is not None:
+            self.nb_rejected += 1
+
+    def start(self, job_id, now, alloc):
+        subtime, _, requeued_from = self.submitted.pop(job_id, (now, None, None))
+        self.running[job_id] = (subtime, now, alloc, requeued_from)
+        for host in parse_interval_set(alloc):
+            self.host_jobs[host] = self.host_jobs.get(host, 0) + 1
+        if requeued_from is None:
+            self.sketches["waiting_time"].add(now - subtime)
+
+    def _release(self, job_id):
+        subtime, start, alloc, requeued_from = self.running.pop(job_id)
+        for host in parse_interval_set(alloc):
+            if self.host_jobs[host] == 1:
+                del self.host_jobs[host]
+            else:
+                self.host_jobs[host] -= 1
+        return subtime, start, requeued_from
+
+    def kill(self, job_id):
+        if job_id not in self.running:
+            return
+        subtime, _, requeued_from = self._release(job_id)
+        self.killed[requeued_from or job_id] = subtime
+        self.nb_killed += 1
+
+    def complete(self, job_id, now):
+        if job_id not in self.running:
+            return
+        subtime, start, _ = self._release(job_id)
+        self.nb_completed += 1
+        turnaround = now - subtime
+        self.sketches["turnaround_time"].add(turnaround)
+        if now > start:
+            self.sketches["stretch"].add(turnaround / (now - start))
+
+    def observe(self, now, events, reply_events):
+        """Updates the metrics with one request/reply exchange."""
+        self._advance(now)
+        ended = False
+        for event in events:
+            kind, data = event["type"], event.get("data", {})
+            if kind == "SIMULATION_BEGINS" and self.nb_resources is None:
+                self.nb_resources = data.get("nb_compute_resources", data.get("nb_resources"))
+            elif kind == "JOB_SUBMITTED":
+                job = data.get("job", {})
+                self.submit(data["job_id"], job.get("subtime", now), job.get("res"))
+            elif kind == "JOB_COMPLETED":
+                self.complete(data["job_id"], now)
+            elif kind == "JOB_KILLED":
+                for job_id in data.get("job_ids", [data.get("job_id")]):
+                    self.kill(job_id)
+            elif kind == "SIMULATION_ENDS":
+                ended = True
+        for event in reply_events:
+            kind, data = event["type"], event.get("data", {})
+            if kind == "REGISTER_JOB":
+                job = data["job"]
+                self.submit(data["job_id"], job.get("subtime", now), job.get("res"), job.get("requeued_from"))
+            elif kind == "REJECT_JOB":
+                self.reject(data["job_id"])
+            elif kind == "EXECUTE_JOB":
+                self.start(data["job_id"], now, data["alloc"])
+
+        if ended or (self.next_snapshot is not None and now >= self.next_snapshot):
+            self.emit(now, final=ended)
+            while self.next_snapshot <= now:
+                self.next_snapshot += self.interval
+        if ended:
+            self.close()
+
+    def snapshot(self, now):
+        elapsed = now - self.first_time if self.first_time is not None else 0.0
+        capacity = (self.nb_resources or 0) * elapsed
+        return {
+            "now": now,
+            "wall_time": time.perf_counter() - self.started,
+            "submitted": self.nb_submitted,
+            "completed": self.nb_completed,
+            "rejected": self.nb_rejected,
+            "killed": self.nb_killed,
+            "requeued": self.nb_requeued,
+            "queue_length": len(self.submitted),
+            "running": len(self.running),
+            "busy_hosts": len(self.host_jobs),
+            "mean_queue_length": self.queue_area / elapsed if elapsed > 0 else 0.0,
+            "utilization": self.busy_area / capacity if capacity > 0 else None,
+            **{metric: sketch.summary() for metric, sketch in self.sketches.items()}
+        }
+
+    def _check_convergence(self):
+        """True once mean waiting time and stretch moved less than `tolerance` (relative) over `windows` snapshots."""
+        if self.tolerance is None or len(self.history) <= self.windows:
+            return False
+        for metric in ("waiting_time", "stretch"):
+            means = [snapshot[metric].get("mean") for snapshot in self.history[-self.windows - 1:]]
+            if any(mean is None for mean in means):
+                return False
+            reference = max(abs(means[-1]), 1e-12)
+            if max(means) - min(means) > self.tolerance * reference:
+                return False
+        return True
+
+    def emit(self, now, final=False):
+        snapshot = self.snapshot(now)
+        self.history.append(snapshot)
+        # Only the recent window is needed for the convergence test
+        del self.history[:-self.windows - 1]
+        self.converged = self.converged or self._check_convergence()
+        snapshot["converged"] = self.converged
+        snapshot["final"] = final
+        if self.file is not None:
+            self.file.write(json.dumps(snapshot) + "\n")
+            self.file.flush()
+        return snapshot
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,216 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_LINES = 1_000_000
+NUMERIC_TYPES = {"date", "double", "int"}
+
+STATE_COLUMNS = ["container", "machine_id", "host", "start", "end", "state"]
+
+
+def read_event_definitions(path):
+    """
+    Parses the `%EventDef` header of a Paje trace.
+
+    Returns ({event_id: (event_name, [(field, type), ...])}, header_line_count).
+    """
+    definitions = {}
+    current = None
+    header_lines = 0
+    with open(path) as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("%"):
+                break
+            header_lines += 1
+            if stripped.startswith("%EventDef"):
+                _, name, event_id = stripped.split()[:3]
+                current = (name, [])
+                definitions[event_id] = current
+            elif stripped.startswith("%EndEventDef"):
+                current = None
+            elif current is not None and stripped.startswith("%"):
+                field, field_type = stripped[1:].split()[:2]
+                current[1].append((field, field_type))
+    return definitions, header_lines
+
+
+def iter_events(path, chunk_lines=DEFAULT_CHUNK_LINES):
+    """
+    Streams the events of a Paje trace as typed DataFrames.
+
+    Yields one {event_name: DataFrame} dict per chunk of `chunk_lines` lines. Columns
+    are named after the `%EventDef` fields and `date`/`double` fields are floats.
+    The body is read with pandas' C parser (quoted strings included), so memory is
+    bounded by the chunk size, not by the trace size.
+    """
+    definitions, header_lines = read_event_definitions(path)
+    width = max(len(fields) for _, fields in definitions.values()) + 2
+    reader = pd.read_csv(path, sep=" ", header=None, names=range(width), skiprows=header_lines, comment="#",
+                         quotechar='"', dtype=str, chunksize=chunk_lines, skip_blank_lines=True,
+                         keep_default_na=False, engine="c")
+    for chunk in reader:
+        events = {}
+        for event_id, rows in chunk.groupby(0, sort=False):
+            if event_id not in definitions:
+                continue
+            name, fields = definitions[event_id]
+            df = rows.iloc[:, 1:len(fields) + 1].copy()
+            df.columns = [field for field, _ in fields]
+            for field, field_type in fields:
+                if field_type in NUMERIC_TYPES:
+                    df[field] = df[field].astype(float)
+            events[name] = df.reset_index(drop=True)
+        yield events
+
+
+class StateTimelines:
+    """
+    Turns SetState/PushState/PopState events into per-container state intervals.
+
+    Only the open state of each container is kept between chunks (plus the state
+    stack for Push/Pop), so memory is bounded by the number of containers. SetState
+    events, the bulk of Batsim traces, are converted with array operations per chunk.
+    `machine_id` is the creation rank of a container among those of its type, which
+    for Batsim machines is the resource id used in `allocated_resources`.
+    """
+
+    def __init__(self):
+        self.entity_names = {}
+        self.machine_ids = {}
+        self.host_names = {}
+        self.type_counts = {}
+        self.open = {}
+        self.stacks = {}
+        self.last_time = 0.0
+
+    def _intervals(self, container, start, end, state):
+        container = pd.Series(container, dtype=object)
+        state = pd.Series(state, dtype=object)
+        return pd.DataFrame({
+            "container": container,
+            "machine_id": container.map(self.machine_ids).fillna(-1).astype(np.int64),
+            "host": container.map(self.host_names).fillna(container),
+            "start": np.asarray(start, dtype=float),
+            "end": np.asarray(end, dtype=float),
+            "state": state.map(self.entity_names).fillna(state)
+        }, columns=STATE_COLUMNS)
+
+    def _close(self, container, time):
+        if container in self.open:
+            start, state = self.open.pop(container)
+            return [(container, start, time, state)]
+        return []
+
+    def _set_states(self, df):
+        """Vectorized SetState handling: each event ends the previous state of its container."""
+        codes, names = pd.factorize(df["Container"], sort=False)
+        order = np.argsort(codes, kind="stable")
+        codes, times, values = codes[order], df["Time"].to_numpy()[order], df["Value"].to_numpy()[order]
+        boundary = codes[1:] != codes[:-1]
+        first = np.concatenate(([True], boundary))
+        last = np.concatenate((boundary, [True]))
+
+        # States opened in an earlier chunk end at the container's first event here
+        carried = [interval for i in np.flatnonzero(first) for interval in self._close(names[codes[i]], times[i])]
+        inner = np.flatnonzero(~last)
+        frame = self._intervals(names[codes[inner]], times[inner], times[inner + 1], values[inner])
+        for i in np.flatnonzero(last):
+            self.open[names[codes[i]]] = (times[i], values[i])
+        self.last_time = max(self.last_time, float(times.max()))
+        return carried, frame
+
+    def feed(self, events):
+        """Consumes one chunk from iter_events and returns the intervals it closed."""
+        if "PajeDefineEntityValue" in events:
+            df = events["PajeDefineEntityValue"]
+            self.entity_names.update(zip(df["Alias"], df["Name"]))
+        if "PajeCreateContainer" in events:
+            df = events["PajeCreateContainer"]
+            for alias, name, container_type in zip(df["Alias"], df["Name"], df["Type"]):
+                self.machine_ids[alias] = self.type_counts.get(container_type, 0)
+                self.type_counts[container_type] = self.machine_ids[alias] + 1
+                self.host_names[alias] = name
+
+        closed, frames = [], []
+        if "PajeSetState" in events:
+            carried, frame = self._set_states(events["PajeSetState"])
+            closed += carried
+            frames.append(frame)
+
+        for kind in ("PajePushState", "PajePopState"):
+            if kind not in events:
+                continue
+            df = events[kind]
+            values = df["Value"] if "Value" in df else [None] * len(df)
+            for time, container, value in zip(df["Time"], df["Container"], values):
+                closed += self._close(container, time)
+                stack = self.stacks.setdefault(container, [])
+                if kind == "PajePushState":
+                    if container in self.open:
+                        stack.append(self.open[container][1])
+                    self.open[container] = (time, value)
+                elif stack:
+                    self.open[container] = (time, stack.pop())
+
+        if "PajeDestroyContainer" in events:
+            df = events["PajeDestroyContainer"]
+            for time, container in zip(df["Time"], df["Name"]):
+                closed += self._close(container, time)
+                self.last_time = max(self.last_time, time)
+
+        if closed:
+            frames.append(self._intervals(*zip(*closed)))
+        return pd.concat(frames, ignore_index=True) if frames else self._intervals([], [], [], [])
+
+    def finish(self):
+        """Closes the states still open at the end of the trace."""
+        closed = [interval for container in list(self.open) for interval in self._close(container, self.last_time)]
+        return self._intervals(*zip(*closed)) if closed else self._intervals([], [], [], [])
+
+
+def iter_host_states(path, chunk_lines=DEFAULT_CHUNK_LINES):
+    """Yields DataFrames of closed per-host state intervals (STATE_COLUMNS) while streaming a trace."""
+    timelines = StateTimelines()
+    for events in iter_events(path, chunk_lines):
+        intervals = timelines.feed(events)
+        if len(intervals):
+            yield intervals
+    intervals = timelines.finish()
+    if len(intervals):
+        yield intervals
+
+
+def write_host_states(path, target, chunk_lines=DEFAULT_CHUNK_LINES):
+    """Streams a trace into a Parquet file of host state intervals, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("container", pa.string()), ("machine_id", pa.int64()), ("host", pa.string()),
+                        ("start", pa.float64()), ("end", pa.float64()), ("state", pa.dictionary(pa.int32(), pa.string()))])
+    rows = 0
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with pq.ParquetWriter(target, schema) as writer:
+        for intervals in iter_host_states(path, chunk_lines):
+            intervals["state"] = intervals["state"].astype("category")
+            writer.write_table(pa.Table.from_pandas(intervals, schema=schema, preserve_index=False))
+            rows += len(intervals)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract per-host state intervals from a Batsim Paje trace")
+    parser.add_argument("trace", help="out_schedule.trace file")
+    parser.add_argument("-o", "--output", required=True, help="Output Parquet file")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES, help="Trace lines parsed per chunk")
+    args = parser.parse_args()
+
+    rows = write_host_states(args.trace, args.output, args.chunk_lines)
+    print(f"{rows} host state intervals written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import math
+import sys
+import time
+from xml.sax.saxutils import quoteattr
+
+# Defaults mirror the energy-enabled hosts of sample_xml.xml: pstates 0-2 compute,
+# 3 sleeps, 4 and 5 are the virtual switch-off/switch-on pstates
+DEFAULT_SPEEDS = "100.0Mf, 50.0Mf, 20.0Mf, 1e-9Mf, 0.006666667f, 0.1429f"
+DEFAULT_WATTAGE = "100.0:200.0, 93.0:170.0, 90.0:150.0, 10:10, 120:120, 110:110"
+DEFAULT_SLEEP_PSTATES = "3:4:5"
+DEFAULT_WATTAGE_OFF = "10"
+TOPOLOGIES = ["fat_tree", "dragonfly", "flat"]
+MASTER_HOST = "master_host"
+
+
+def fat_tree_parameters(nb_nodes, radix=32):
+    """
+    SimGrid FAT_TREE topo_parameters for at least `nb_nodes` hosts with `radix`-port switches.
+
+    Every switch below the top has radix/2 children and radix/2 parents; levels are
+    added until the top level needs at most `radix` children. Returns (parameters,
+    nb_hosts): SimGrid requires exactly the product of the down-link counts, so the
+    host count is rounded up.
+    """
+    half = max(radix // 2, 1)
+    nb_levels = 2
+    while math.ceil(nb_nodes / half ** (nb_levels - 1)) > radix and half > 1:
+        nb_levels += 1
+    downs = [half] * (nb_levels - 1) + [math.ceil(nb_nodes / half ** (nb_levels - 1))]
+    ups = [1] + [half] * (nb_levels - 1)
+    parameters = ";".join([str(len(downs)), ",".join(map(str, downs)), ",".join(map(str, ups)),
+                           ",".join("1" for _ in downs)])
+    return parameters, math.prod(downs)
+
+
+def dragonfly_parameters(nb_nodes, nodes_per_router=4, routers_per_chassis=16, chassis_per_group=6):
+    """
+    SimGrid DRAGONFLY topo_parameters ("groups,links;chassis,links;routers,links;nodes")
+    for at least `nb_nodes` hosts; the number of groups is rounded up. Returns (parameters, nb_hosts).
+    """
+    per_group = nodes_per_router * routers_per_chassis * chassis_per_group
+    nb_groups = max(math.ceil(nb_nodes / per_group), 1)
+    parameters = f"{nb_groups},1;{chassis_per_group},1;{routers_per_chassis},1;{nodes_per_router}"
+    return parameters, nb_groups * per_group
+
+
+def parse_partition(value):
+    """Parses NAME:NODES[:TOPOLOGY] (e.g. "cpu:10000:fat_tree")."""
+    name, nodes, *rest = value.split(":")
+    topology = rest[0] if rest else "fat_tree"
+    if topology not in TOPOLOGIES:
+        raise argparse.ArgumentTypeError(f"unknown topology {topology!r} (expected one of {', '.join(TOPOLOGIES)})")
+    return name, int(nodes), topology
+
+
+def _properties(args, indent):
+    if not args.energy:
+        return
+    yield f'{indent}<prop id="wattage_per_state" value={quoteattr(args.wattage)}/>\n'
+    yield f'{indent}<prop id="wattage_off" value={quoteattr(args.wattage_off)}/>\n'
+    if args.sleep_pstates:
+        yield f'{indent}<prop id="sleep_pstates" value={quoteattr(args.sleep_pstates)}/>\n'
+
+
+def _cluster(name, nb_nodes, topology, args):
+    """One <cluster> element: its size in the file does not depend on the number of hosts."""
+    if topology == "fat_tree":
+        parameters, nb_hosts = fat_tree_parameters(nb_nodes, args.radix)
+        kind = "FAT_TREE"
+    else:
+        parameters, nb_hosts = dragonfly_parameters(nb_nodes, args.nodes_per_router, args.routers_per_chassis,
+                                                    args.chassis_per_group)
+        kind = "DRAGONFLY"
+    yield (f'  <cluster id="{name}" prefix="{name}-" suffix="" radical="0-{nb_hosts - 1}" '
+           f'speed={quoteattr(args.speeds)} bw="{args.bandwidth}" lat="{args.latency}" '
+           f'topology="{kind}" topo_parameters="{parameters}" router_id="{name}_router">\n')
+    yield from _properties(args, "    ")
+    yield "  </cluster>\n"
+    return nb_hosts
+
+
+def _flat_zone(name, nb_nodes, args):
+    """Explicit hosts with private links on one backbone (what a <cluster> expands to), written host by host."""
+    yield f'  <zone id="{name}" routing="Cluster">\n'
+    properties = "".join(_properties(args, "      "))
+    speed = quoteattr(args.speeds)
+    for i in range(nb_nodes):
+        host = f"{name}-{i}"
+        if properties:
+            yield f'    <host id="{host}" speed={speed} pstate="0">\n{properties}    </host>\n'
+        else:
+            yield f'    <host id="{host}" speed={speed} pstate="0"/>\n'
+        yield (f'    <link id="{host}_link" bandwidth="{args.bandwidth}" latency="{args.latency}" '
+               f'sharing_policy="SPLITDUPLEX"/>\n')
+        yield f'    <host_link id="{host}" up="{host}_link_UP" down="{host}_link_DOWN"/>\n'
+    yield f'    <router id="{name}_router"/>\n'
+    yield f'    <backbone id="{name}_backbone" bandwidth="{args.backbone_bandwidth}" latency="{args.latency}"/>\n'
+    yield "  </zone>\n"
+    return nb_nodes
+
+
+def generate_platform(partitions, args):
+    """
+    Yields a SimGrid 4.1 platform as text chunks, with a master zone for Batsim.
+
+    Every partition becomes one zone (a compact <cluster> for fat-tree and dragonfly,
+    explicit hosts for "flat") connected to the master host and to the other
+    partitions through their router and an uplink. Sets
+    `args.nb_hosts` to the number of compute hosts written.
+    """
+    yield "<?xml version='1.0'?>\n"
+    yield '<!DOCTYPE platform SYSTEM "https://simgrid.org/simgrid.dtd">\n'
+    yield '<platform version="4.1">\n'
+    yield '<zone id="main" routing="Full">\n'
+    args.nb_hosts = 0
+    for name, nb_nodes, topology in partitions:
+        zone = _flat_zone(name, nb_nodes, args) if topology == "flat" else _cluster(name, nb_nodes, topology, args)
+        args.nb_hosts += yield from zone
+
+    yield '  <zone id="master" routing="Full">\n'
+    yield f'    <host id="{MASTER_HOST}" speed="100Mf">\n'
+    yield '      <prop id="role" value="master"/>\n'
+    if args.energy:
+        yield '      <prop id="wattage_per_state" value="100:200"/>\n'
+        yield f'      <prop id="wattage_off" value={quoteattr(args.wattage_off)}/>\n'
+    yield "    </host>\n"
+    yield "  </zone>\n"
+
+    names = [name for name, _, _ in partitions]
+    for name in names:
+        yield (f'  <link id="{name}_uplink" bandwidth="{args.backbone_bandwidth}" '
+               f'latency="{args.latency}"/>\n')
+    gateways = [(name, f"{name}_router", [f"{name}_uplink"]) for name in names]
+    gateways.append(("master", MASTER_HOST, []))
+    for i, (src, src_gw, src_links) in enumerate(gateways):
+        for dst, dst_gw, dst_links in gateways[i + 1:]:
+            yield f'  <zoneRoute src="{src}" dst="{dst}" gw_src="{src_gw}" gw_dst="{dst_gw}">\n'
+            for link in src_links + dst_links:
+                yield f'    <link_ctn id="{link}"/>\n'
+            yield "  </zoneRoute>\n"
+    yield "</zone>\n"
+    yield "</platform>\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a SimGrid 4.1 platform for Batsim")
+    parser.add_argument("-o", "--output", default="-", help="Output XML file (default: stdout)")
+    parser.add_argument("--partition", dest="partitions", action="append", type=parse_partition, default=None,
+                        metavar="NAME:NODES[:TOPOLOGY]",
+                        help="Compute partition; TOPOLOGY is fat_tree (default), dragonfly or flat. Repeatable")
+    parser.add_argument("--radix", type=int, default=32, help="Switch radix of fat-tree partitions")
+    parser.add_argument("--nodes-per-router", type=int, default=4, help="Dragonfly hosts per router")
+    parser.add_argument("--routers-per-chassis", type=int, default=16, help="Dragonfly routers per chassis")
+    parser.add_argument("--chassis-per-group", type=int, default=6, help="Dragonfly chassis per group")
+    parser.add_argument("--speeds", default=DEFAULT_SPEEDS, help="Comma-separated host speed per pstate")
+    parser.add_argument("--wattage", default=DEFAULT_WATTAGE, help="wattage_per_state property (idle:full per pstate)")
+    parser.add_argument("--wattage-off", default=DEFAULT_WATTAGE_OFF, help="wattage_off property")
+    parser.add_argument("--sleep-pstates", default=DEFAULT_SLEEP_PSTATES, help="sleep_pstates property ('' for none)")
+    parser.add_argument("--no-energy", dest="energy", action="store_false", help="Omit the wattage properties")
+    parser.add_argument("--bandwidth", default="10GBps", help="Host link bandwidth")
+    parser.add_argument("--backbone-bandwidth", default="100GBps", help="Backbone and uplink bandwidth")
+    parser.add_argument("--latency", default="1us", help="Link latency")
+    args = parser.parse_args()
+    partitions = args.partitions or [("node", 1024, "fat_tree")]
+
+    started = time.perf_counter()
+    out = sys.stdout if args.output == "-" else open(args.output, "w", buffering=1 << 20)
+    try:
+        out.writelines(generate_platform(partitions, args))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{args.nb_hosts} compute hosts in {len(partitions)} partitions written in "
+          f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 
+from aggregate import density_grid, grouped_histogram, histogram_edges
+from downsample import downsample_frame, downsample_series
+from gantt_raster import render_gantt
+from queue_metrics import queue_state_at
+
 # Evalys imports
 from evalys.jobset import JobSet
 from evalys import visu
@@ -15,40 +20,31 @@ machines_df = pd.read_csv("./easy_bf_results/out_machine_states.csv")
 out_dir = Path(".")
 
 # 1. Stretch vs Requested Resources
+# Per-job figures are drawn from pre-aggregated grid cells and bins (see aggregate.py)
 fig1 = px.scatter(
-    jobs_df,
+    density_grid(jobs_df, "requested_number_of_resources", "stretch", "profile", log_y=True),
     x="requested_number_of_resources",
     y="stretch",
     color="profile",
+    size="count",
+    log_y=True,
     title="Stretch vs Requested Resources",
-    hover_data=["job_id", "submission_time", "execution_time"]
+    labels={"count": "Jobs"}
 )
 fig1.write_image(out_dir / "stretch_vs_requested_resources.png")
 
-# 2. Gantt-style Timeline Plot
-jobs_df["start"] = jobs_df["starting_time"]
-jobs_df["end"] = jobs_df["finish_time"]
-jobs_df["duration"] = jobs_df["execution_time"]
-
-fig2 = px.timeline(
-    jobs_df,
-    x_start="start",
-    x_end="end",
-    y="job_id",
-    color="profile",
-    hover_data=["requested_number_of_resources", "stretch"],
-    title="Job Execution Timeline"
-)
-fig2.update_yaxes(autorange="reversed")
-fig2.write_image(out_dir / "job_execution_timeline.png")
+# 2. Gantt-style Timeline Plot (hosts x time, rasterized from allocated_resources)
+render_gantt(out_dir / "job_execution_timeline.png", jobs_df, color="profile", title="Job Execution Timeline")
 
 # 3. Machine State Over Time
+# Each trace keeps the min/max of every pixel column instead of every state change
+MAX_POINTS = 2000
+machines_df = machines_df.sort_values("time", kind="stable")
 fig3 = go.Figure()
-fig3.add_trace(go.Scatter(x=machines_df["time"], y=machines_df["nb_computing"], name="Computing"))
-fig3.add_trace(go.Scatter(x=machines_df["time"], y=machines_df["nb_idle"], name="Idle"))
-fig3.add_trace(go.Scatter(x=machines_df["time"], y=machines_df["nb_sleeping"], name="Sleeping"))
-fig3.add_trace(go.Scatter(x=machines_df["time"], y=machines_df["nb_switching_on"], name="Switching On"))
-fig3.add_trace(go.Scatter(x=machines_df["time"], y=machines_df["nb_switching_off"], name="Switching Off"))
+for column, label in [("nb_computing", "Computing"), ("nb_idle", "Idle"), ("nb_sleeping", "Sleeping"),
+                      ("nb_switching_on", "Switching On"), ("nb_switching_off", "Switching Off")]:
+    x, y = downsample_series(machines_df["time"].to_numpy(), machines_df[column].to_numpy(), MAX_POINTS)
+    fig3.add_trace(go.Scatter(x=x, y=y, line_shape="hv", name=label))
 
 fig3.update_layout(
     title="Machine States Over Time",
@@ -59,14 +55,16 @@ fig3.update_layout(
 fig3.write_image(out_dir / "machine_states_over_time.png")
 
 # 4. Histogram of Job Waiting Times
-fig4 = px.histogram(
-    jobs_df,
-    x="waiting_time",
-    nbins=50,
+waiting_hist = grouped_histogram(jobs_df, "waiting_time", max_bins=50)
+fig4 = px.bar(
+    waiting_hist,
+    x="center",
+    y="count",
     title="Histogram of Job Waiting Times",
-    labels={"waiting_time": "Waiting Time (seconds)"},
+    labels={"center": "Waiting Time (seconds)"},
     color_discrete_sequence=["indianred"]
 )
+fig4.update_traces(width=float((waiting_hist["right"] - waiting_hist["left"]).max()))
 fig4.update_layout(
     xaxis_title="Waiting Time (seconds)",
     yaxis_title="Number of Jobs",
@@ -75,20 +73,22 @@ fig4.update_layout(
 fig4.write_image(out_dir / "histogram_waiting_times.png")
 
 # 5. Waiting Time vs Submission Time
+# Cells are colored by the mean request size of their jobs
 fig5 = px.scatter(
-    jobs_df,
+    density_grid(jobs_df, "submission_time", "waiting_time", value="requested_number_of_resources"),
     x="submission_time",
     y="waiting_time",
     color="requested_number_of_resources",
+    size="count",
     title="Waiting Time vs Submission Time",
     labels={
         "submission_time": "Submission Time (seconds)",
         "waiting_time": "Waiting Time (seconds)",
-        "requested_number_of_resources": "Requested Resources"
-    },
-    hover_data=["job_id", "profile"]
+        "requested_number_of_resources": "Requested Resources",
+        "count": "Jobs"
+    }
 )
-fig5.update_traces(marker=dict(size=6, opacity=0.7))
+fig5.update_traces(marker=dict(opacity=0.7))
 fig5.update_layout(
     xaxis_title="Submission Time",
     yaxis_title="Waiting Time",
@@ -97,11 +97,9 @@ fig5.update_layout(
 fig5.write_image(out_dir / "waiting_vs_submission_time.png")
 
 # 6. Distribution of Failures Over Time
-failures_df = jobs_df[jobs_df["success"] == 0]
-bins = np.arange(jobs_df["submission_time"].min(), jobs_df["submission_time"].max() + 1, 1)
-failures_df["submission_bin"] = pd.cut(failures_df["submission_time"], bins)
-failures_count = failures_df.groupby("submission_bin").size().reset_index(name="failures")
-failures_count["bin_start"] = failures_count["submission_bin"].apply(lambda x: x.left)
+failures_count = grouped_histogram(jobs_df[jobs_df["success"] == 0], "submission_time",
+                                   edges=histogram_edges(jobs_df["submission_time"]))
+failures_count = failures_count.rename(columns={"left": "bin_start", "count": "failures"})
 
 fig6 = px.bar(
     failures_count,
@@ -113,19 +111,12 @@ fig6 = px.bar(
 fig6.write_image(out_dir / "failures_over_time.png")
 
 # 7. Queue Length Over Time
-queue_lengths = []
-times = machines_df["time"].values
-
-for t in times:
-    submitted = jobs_df[jobs_df["submission_time"] <= t]
-    started = jobs_df[jobs_df["starting_time"] <= t]
-    queue_length = len(submitted) - len(started)
-    queue_lengths.append(queue_length)
-
-queue_df = pd.DataFrame({"time": times, "queue_length": queue_lengths})
+queue_df = downsample_frame(queue_state_at(jobs_df, machines_df["time"].values), "time", "queue_length",
+                            max_points=MAX_POINTS)
 
 fig7 = px.line(
     queue_df,
+    line_shape="hv",
     x="time",
     y="queue_length",
     title="Queue Length Over Time",
@@ -134,19 +125,7 @@ fig7 = px.line(
 fig7.write_image(out_dir / "queue_length_over_time.png")
 
 # 8. Gantt Chart of Jobs (Success Colored)
-jobs_sorted = jobs_df.sort_values("submission_time")
-
-fig8 = px.timeline(
-    jobs_sorted,
-    x_start="starting_time",
-    x_end="finish_time",
-    y="job_id",
-    color="success",
-    title="Gantt Chart of Jobs (Success Colored)",
-    hover_data=["profile", "requested_number_of_resources", "waiting_time", "execution_time"]
-)
-fig8.update_yaxes(autorange="reversed")
-fig8.write_image(out_dir / "gantt_chart_jobs.png")
+render_gantt(out_dir / "gantt_chart_jobs.png", jobs_df, color="success", title="Gantt Chart of Jobs (Success Colored)")
 
 # 9. Evalys Gantt Chart (with Matplotlib)
 js = JobSet.from_csv("./easy_bf_results/out_jobs.csv")
@@ -0,0 +1,144 @@
+import heapq
+import math
+import random
+from bisect import insort
+
+# How each policy starts jobs from its queue order: "strict" stops at the first job
+# that does not fit, "greedy" skips it and starts any later job that fits, and
+# "easy" reserves hosts for the blocked head job and only backfills jobs that do
+# not delay that reservation (EASY backfilling).
+POLICIES = {
+    "fcfs": "strict",
+    "sjf": "strict",
+    "random": "greedy",
+    "filler": "greedy",
+    "easy_bf": "easy",
+}
+
+
+def _order_key(algorithm, subtime, walltime, res, rng):
+    if algorithm == "sjf":
+        return (walltime,)
+    if algorithm == "filler":
+        return (walltime, res)
+    if algorithm == "random":
+        return (rng.random(),)
+    return (subtime,)
+
+
+class PolicyQueue:
+    """
+    Waiting jobs of one policy, kept in the policy's order between decisions.
+
+    Jobs are bucketed by requested host count, each bucket sorted by (policy key,
+    arrival number), so a decision only looks at bucket heads instead of sorting
+    the whole queue: the next job in policy order is the smallest head, and the
+    next job that fits on `nb_free` hosts the smallest head of the buckets up to
+    `nb_free`. For EASY backfilling, each bucket also has a heap of walltimes to
+    tell in O(1) whether any of its jobs is short enough to end before the
+    reservation. Jobs without a walltime (<= 0) count as never ending.
+    """
+
+    def __init__(self, algorithm, seed=None):
+        if algorithm not in POLICIES:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.mode = POLICIES[algorithm]
+        self.rng = random.Random(seed)
+        self.buckets = {}
+        self.walltimes = {}
+        self.queued = set()
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.queued)
+
+    def push(self, job, subtime, walltime, res):
+        """Queues `job` (any id) requesting `res` hosts for at most `walltime` seconds."""
+        walltime = walltime if walltime > 0 else math.inf
+        self.seq += 1
+        insort(self.buckets.setdefault(res, []),
+               (_order_key(self.algorithm, subtime, walltime, res, self.rng), self.seq, job, walltime))
+        if self.mode == "easy":
+            heapq.heappush(self.walltimes.setdefault(res, []), (walltime, self.seq))
+        self.queued.add(self.seq)
+
+    def _take(self, res, index=0):
+        bucket = self.buckets[res]
+        _, seq, job, walltime = bucket.pop(index)
+        self.queued.discard(seq)
+        if not bucket:
+            del self.buckets[res]
+            self.walltimes.pop(res, None)
+        return job, walltime
+
+    def _head(self, max_res=None):
+        """Bucket of the first job in policy order, among jobs of at most `max_res` hosts."""
+        best = None
+        for res, bucket in self.buckets.items():
+            if (max_res is None or res <= max_res) and (best is None or bucket[0] < self.buckets[best][0]):
+                best = res
+        return best
+
+    def _shortest(self, res):
+        heap = self.walltimes[res]
+        while heap[0][1] not in self.queued:
+            heapq.heappop(heap)
+        return heap[0][0]
+
+    def select(self, now, nb_free, running=()):
+        """
+        Removes and returns the (job, res, walltime) to start now on `nb_free` hosts.
+
+        `running` holds the (expected end, res) of the running jobs; only EASY
+        backfilling uses it, to find when the blocked head job can start (the
+        shadow time) and how many hosts it leaves over then.
+        """
+        started = []
+        while self.buckets:
+            if self.mode == "greedy":
+                res = self._head(nb_free)
+                if res is None:
+                    return started
+            else:
+                res = self._head()
+                if res > nb_free:
+                    break
+            job, walltime = self._take(res)
+            started.append((job, res, walltime))
+            nb_free -= res
+        if self.mode != "easy" or not self.buckets:
+            return started
+
+        # Reservation of the head job: the earliest time enough running jobs end
+        # (including the ones just started, which the caller has not seen yet)
+        head_res = res
+        shadow, extra, available = math.inf, 0, nb_free
+        ends = list(running) + [(now + walltime, nb_hosts) for _, nb_hosts, walltime in started]
+        for end, nb_hosts in sorted(ends):
+            available += nb_hosts
+            if available >= head_res:
+                shadow, extra = end, available - head_res
+                break
+
+        while nb_free > 0:
+            best = best_index = None
+            for res, bucket in self.buckets.items():
+                if res > nb_free:
+                    continue
+                if res <= extra:
+                    index = 0
+                elif now + self._shortest(res) <= shadow:
+                    index = next(index for index, entry in enumerate(bucket) if now + entry[3] <= shadow)
+                else:
+                    continue
+                if best is None or bucket[index] < self.buckets[best][best_index]:
+                    best, best_index = res, index
+            if best is None:
+                break
+            job, walltime = self._take(best, best_index)
+            started.append((job, best, walltime))
+            nb_free -= best
+            if now + walltime > shadow:
+                extra -= best
+        return started
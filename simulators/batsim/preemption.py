@@ -0,0 +1,139 @@
+import csv
+import logging
+from bisect import bisect_left, insort
+
+logger = logging.getLogger("preemption")
+
+# Slurm's PreemptType=preempt/qos: each QOS lists the QOS it may preempt (as in genjobs.sh runs)
+DEFAULT_PREEMPTABLE = {"high": ("normal",)}
+LOG_COLUMNS = ["time", "job_id", "qos", "preempted_by", "nb_hosts", "start", "wasted_node_seconds"]
+
+
+def parse_preemptable(values):
+    """Parses ["high:normal,low", ...] into {"high": ("normal", "low"), ...}."""
+    preemptable = {}
+    for value in values:
+        qos, _, victims = value.partition(":")
+        preemptable[qos] = tuple(victim for victim in victims.split(",") if victim)
+    return preemptable
+
+
+class VictimIndex:
+    """
+    Running jobs indexed by QOS, each QOS holding (start, job_id) sorted by start time.
+
+    Preempting a job wastes nb_hosts × (now - start) node-seconds, i.e. its elapsed
+    time per freed host, so within a QOS the most recently started jobs are the
+    cheapest victims and are read from the end of the sorted list.
+    """
+
+    def __init__(self):
+        self.by_qos = {}
+        self.jobs = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job_id, qos, start, nb_hosts):
+        self.jobs[job_id] = (qos, start, nb_hosts)
+        insort(self.by_qos.setdefault(qos, []), (start, job_id))
+
+    def remove(self, job_id):
+        if job_id not in self.jobs:
+            return
+        qos, start, _ = self.jobs.pop(job_id)
+        entries = self.by_qos[qos]
+        del entries[bisect_left(entries, (start, job_id))]
+
+    def select(self, nb_needed, qos_levels, now):
+        """
+        Minimum-waste set of jobs of `qos_levels` (lowest QOS first) freeing at least
+        `nb_needed` hosts, or None if they cannot free that many.
+
+        Victims are taken youngest first (lowest waste per freed host) until enough
+        hosts are freed; victims that turned out unnecessary because a larger one was
+        added later are then dropped, most expensive first.
+        """
+        victims, freed = [], 0
+        for qos in qos_levels:
+            for start, job_id in reversed(self.by_qos.get(qos, [])):
+                if freed >= nb_needed:
+                    break
+                nb_hosts = self.jobs[job_id][2]
+                victims.append((nb_hosts * (now - start), nb_hosts, job_id))
+                freed += nb_hosts
+        if freed < nb_needed:
+            return None
+        selected = []
+        for cost, nb_hosts, job_id in sorted(victims, reverse=True):
+            if freed - nb_hosts >= nb_needed:
+                freed -= nb_hosts
+            else:
+                selected.append(job_id)
+        return selected
+
+
+class QosPreemption:
+    """
+    QOS preemption with requeue (PreemptMode=REQUEUE) for the multifactor decider.
+
+    When the highest-priority job does not fit, running jobs of the QOS it may
+    preempt are killed; once their JOB_KILLED arrives they are resubmitted as new
+    dynamic jobs with the same profile, restarting from scratch. Every preemption is
+    written to the CSV at `path` and the wasted node-seconds are summed per QOS,
+    like waste_waittime.py does for the real experiments.
+    """
+
+    def __init__(self, preemptable=None, path=None):
+        self.preemptable = dict(preemptable if preemptable is not None else DEFAULT_PREEMPTABLE)
+        self.index = VictimIndex()
+        self.requeued = {}
+        self.wasted = {}
+        self.nb_preempted = {}
+        self.file = open(path, "w", newline="") if path else None
+        self.writer = csv.writer(self.file) if self.file else None
+        if self.writer:
+            self.writer.writerow(LOG_COLUMNS)
+
+    def started(self, job, qos, nb_hosts, now):
+        self.index.add(job["id"], qos, now, nb_hosts)
+
+    def finished(self, job_id):
+        self.index.remove(job_id)
+
+    def victims(self, job, qos, nb_needed, now):
+        """Job ids to kill so that `job` can start, or None if its QOS cannot free enough hosts."""
+        levels = self.preemptable.get(qos)
+        if not levels or nb_needed <= 0:
+            return None
+        selected = self.index.select(nb_needed, levels, now)
+        if not selected:
+            return None
+        for job_id in selected:
+            victim_qos, start, nb_hosts = self.index.jobs[job_id]
+            wasted = nb_hosts * (now - start)
+            self.wasted[victim_qos] = self.wasted.get(victim_qos, 0.0) + wasted
+            self.nb_preempted[victim_qos] = self.nb_preempted.get(victim_qos, 0) + 1
+            if self.writer:
+                self.writer.writerow([now, job_id, victim_qos, job["id"], nb_hosts, start, wasted])
+            self.index.remove(job_id)
+        return selected
+
+    def requeue(self, job, now):
+        """Copy of a preempted job to register again, with a new id and subtime `now`."""
+        original = job.get("requeued_from", job["id"])
+        count = self.requeued[original] = self.requeued.get(original, 0) + 1
+        return dict(job, id=f"{original}_r{count}", subtime=now, requeued_from=original, parents=[])
+
+    def summary(self):
+        return {qos: {"preempted": self.nb_preempted[qos], "wasted_node_seconds": self.wasted[qos]}
+                for qos in self.nb_preempted}
+
+    def close(self):
+        if self.nb_preempted:
+            logger.info("[preemption] %s", ", ".join(
+                f"{qos}: {entry['preempted']} jobs preempted, {entry['wasted_node_seconds']:.0f} node-seconds wasted"
+                for qos, entry in self.summary().items()))
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,177 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+# Every file a run leaves in its directory is an output: Batsim's out_*, and the
+# policies' side files (energy.json, preemptions.csv, metrics.jsonl, scheduler.log).
+# run.json holds the run's partition keys and is written by the caller on restore.
+EXCLUDED_FILES = {"run.json"}
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """blake2b of a file's contents, read in 1 MB blocks and remembered while the file is unchanged."""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=256)
+def _file_digest(path, mtime_ns, size):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(files=(), **params):
+    """
+    Content address of a simulation: the contents of its input `files` (platform,
+    workload, scheduler sources) plus JSON-serializable `params` (scheduler name and
+    version, simulator flags). Renaming or touching an input does not change the key.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for path in files:
+        h.update(file_digest(path).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def tool_version(executable):
+    """`<executable> --version` output, so upgrading Batsim or batsched invalidates cached runs."""
+    try:
+        result = subprocess.run([executable, "--version"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return (result.stdout or result.stderr).strip() or None
+
+
+class ResultCache:
+    """
+    Content-addressed store of the output files of runs, one directory per key.
+
+    `manifest.json` maps every key to its metadata (scheduler, workload, ...), size
+    and last use, so analysis tools can look runs up without re-running them.
+    When the cache grows over `max_bytes`, least recently used runs are evicted.
+    Safe to share between the threads of one campaign.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            with open(path) as f:
+                return json.load(f)
+        return {}
+
+    def _save(self):
+        # Write then rename, so a crash never leaves a truncated manifest
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    def path(self, key):
+        return self.root / key[:2] / key
+
+    def lookup(self, key):
+        """Directory holding the outputs of `key`, or None. A hit counts as a use for LRU eviction."""
+        with self._lock:
+            if key not in self.entries or not self.path(key).is_dir():
+                return None
+            self.entries[key]["last_used"] = time.time()
+            self._save()
+            return self.path(key)
+
+    def restore(self, key, run_dir):
+        """Copies the cached outputs of `key` into `run_dir`; returns False on a miss."""
+        cached = self.lookup(key)
+        if cached is None:
+            return False
+        os.makedirs(run_dir, exist_ok=True)
+        for source in cached.iterdir():
+            shutil.copy2(source, Path(run_dir, source.name))
+        return True
+
+    def store(self, key, run_dir, metadata=None):
+        """Adds the output files of a finished run under `key`, then evicts down to `max_bytes`."""
+        staging = Path(tempfile.mkdtemp(dir=self.root))
+        for source in Path(run_dir).iterdir():
+            if source.is_file() and source.name not in EXCLUDED_FILES:
+                shutil.copy2(source, staging / source.name)
+        size = sum(path.stat().st_size for path in staging.iterdir())
+        with self._lock:
+            target = self.path(key)
+            shutil.rmtree(target, ignore_errors=True)
+            target.parent.mkdir(exist_ok=True)
+            os.replace(staging, target)
+            now = time.time()
+            self.entries[key] = {"metadata": metadata or {}, "size": size, "created": now, "last_used": now}
+            self._evict(keep=key)
+            self._save()
+        return self.path(key)
+
+    def _evict(self, keep=None):
+        total = sum(entry["size"] for entry in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_used"]):
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.entries.pop(key)["size"]
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            try:
+                self.path(key).parent.rmdir()
+            except OSError:
+                pass
+
+    def evict(self, max_bytes=None):
+        """Drops least recently used runs until the cache fits in `max_bytes` (default: its limit)."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+            self._save()
+
+    def find(self, **metadata):
+        """{key: directory} of the cached runs whose metadata matches every given field."""
+        return {key: self.path(key) for key, entry in self.entries.items()
+                if all(entry["metadata"].get(field) == value for field, value in metadata.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or shrink a simulation result cache")
+    parser.add_argument("cache", help="Cache directory")
+    parser.add_argument("--evict", type=float, metavar="GB", help="Evict least recently used runs down to this size")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache, max_bytes=None)
+    if args.evict is not None:
+        cache.evict(int(args.evict * 1024 ** 3))
+    for key, entry in sorted(cache.entries.items(), key=lambda item: -item[1]["last_used"]):
+        print(f"{key[:12]}  {entry['size'] / 1024 ** 2:8.1f} MB  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))}  "
+              + " ".join(f"{field}={value}" for field, value in sorted(entry["metadata"].items())))
+    total = sum(entry["size"] for entry in cache.entries.values())
+    print(f"{len(cache.entries)} runs, {total / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import paje_trace
+from job_results import (machine_states_from_allocations, read_accasim_sched, read_batsim_jobs,
+                         read_batsim_machine_states, read_batsim_schedule)
+
+PARTITION_KEYS = ["scheduler", "seed", "workload"]
+TABLES = {"jobs": "out_jobs.csv", "machine_states": "out_machine_states.csv", "schedule": "out_schedule.csv"}
+READERS = {"jobs": read_batsim_jobs, "machine_states": read_batsim_machine_states, "schedule": read_batsim_schedule}
+# AccaSim has no run summary; its machine states are rebuilt from the job allocations
+ACCASIM_TABLES = ["jobs", "machine_states"]
+TRACE_TABLE, TRACE_FILE = "host_states", "out_schedule.trace"
+# AccaSim writes results/<experiment>/<dispatcher>/sched-<workload>.swf
+ACCASIM_PATTERN, ACCASIM_PREFIX = "sched-*.swf", "sched-"
+
+
+def run_keys(run_dir, root):
+    """
+    Partition keys of a run directory.
+
+    A `run.json` next to the outputs wins; otherwise the keys come from the path,
+    e.g. `fcfs_results` -> (fcfs, 0), `fcfs_dynamic_results/seed_3` -> (fcfs_dynamic, 3).
+    """
+    keys = {"scheduler": None, "seed": 0, "workload": "default"}
+    metadata = run_dir / "run.json"
+    if metadata.exists():
+        with open(metadata) as f:
+            keys.update({key: value for key, value in json.load(f).items() if key in PARTITION_KEYS})
+    if keys["scheduler"] is None:
+        parts = run_dir.relative_to(root).parts or (run_dir.name,)
+        names = list(parts)
+        seed_match = re.fullmatch(r"seed_(\d+)", names[-1])
+        if seed_match:
+            keys["seed"] = int(seed_match.group(1))
+            names.pop()
+        keys["scheduler"] = re.sub(r"_results$", "", names[-1]) if names else run_dir.name
+    keys["seed"] = int(keys["seed"])
+    return keys
+
+
+def discover_runs(root):
+    """
+    All runs under `root` with their partition keys: directories holding a Batsim
+    out_jobs.csv, and AccaSim sched-<workload>.swf files, whose scheduler is the
+    dispatcher directory (e.g. "EBF#FF") and workload the file name unless a
+    run.json says otherwise.
+    """
+    root = Path(root)
+    runs = []
+    for jobs_csv in sorted(root.rglob(TABLES["jobs"])):
+        run_dir = jobs_csv.parent
+        runs.append(dict(run_keys(run_dir, root), path=run_dir, simulator="batsim"))
+    for sched in sorted(root.rglob(ACCASIM_PATTERN)):
+        keys = run_keys(sched.parent, root)
+        metadata = sched.parent / "run.json"
+        if not metadata.exists() or "workload" not in json.loads(metadata.read_text()):
+            keys["workload"] = sched.stem[len(ACCASIM_PREFIX):]
+        runs.append(dict(keys, path=sched.parent, source=sched, simulator="accasim"))
+    return runs
+
+
+def _partition_dir(store, table, keys):
+    return Path(store, table, *(f"{key}={keys[key]}" for key in PARTITION_KEYS))
+
+
+def _is_current(target, source, force):
+    return not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+
+
+def _ingest_accasim_run(run, store, force):
+    targets = {table: _partition_dir(store, table, run) / "part-0.parquet" for table in ACCASIM_TABLES}
+    if all(_is_current(target, run["source"], force) for target in targets.values()):
+        return {}
+    jobs, allocation_job, allocation_host = read_accasim_sched(run["source"], run["workload"])
+    tables = {"jobs": jobs, "machine_states": machine_states_from_allocations(jobs, allocation_job, allocation_host)}
+    for table, target in targets.items():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(tables[table], target)
+    return {table: tables[table].num_rows for table in tables}
+
+
+def _ingest_run(run, store, force, traces):
+    if run.get("simulator") == "accasim":
+        return _ingest_accasim_run(run, store, force)
+    written = {}
+    for table, filename in TABLES.items():
+        source = run["path"] / filename
+        if not source.exists():
+            continue
+        target = _partition_dir(store, table, run) / "part-0.parquet"
+        if _is_current(target, source, force):
+            continue
+        data = READERS[table](source)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(data, target)
+        written[table] = data.num_rows
+
+    trace = run["path"] / TRACE_FILE
+    if traces and trace.exists():
+        target = _partition_dir(store, TRACE_TABLE, run) / "part-0.parquet"
+        if not _is_current(target, trace, force):
+            written[TRACE_TABLE] = paje_trace.write_host_states(trace, target)
+    return written
+
+
+def ingest(runs, store, workers=None, force=False, traces=False):
+    """
+    Reads the outputs of every run in parallel and writes them to `store` as
+    hive-partitioned Parquet (`<table>/scheduler=.../seed=.../workload=.../`).
+    Jobs and machine states of every simulator share the schemas of job_results.py
+    (AccaSim machine states are rebuilt from the job allocations); Batsim runs also
+    get their out_schedule.csv summary as a `schedule` table.
+
+    Runs whose partition is newer than their outputs are skipped unless `force`;
+    re-ingesting a run replaces its partition. With `traces`, the Paje trace of
+    each run is also streamed into a `host_states` table (see paje_trace.py).
+    Returns the rows written per table for each run.
+    """
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(lambda run: _ingest_run(run, store, force, traces), runs))
+
+
+def load_table(store, table="jobs", schedulers=None, seeds=None, workloads=None, columns=None):
+    """
+    Loads one table from the store, reading only the requested partitions and columns.
+
+    Partition keys come back as categorical columns (seed as an integer).
+    """
+    dataset = ds.dataset(Path(store, table), format="parquet", partitioning="hive")
+    expression = None
+    for key, values in (("scheduler", schedulers), ("seed", seeds), ("workload", workloads)):
+        if values is None:
+            continue
+        condition = ds.field(key).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + PARTITION_KEYS))
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    for key in ("scheduler", "workload"):
+        if key in df:
+            df[key] = df[key].astype(str).astype("category")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Batsim and AccaSim runs into a partitioned Parquet store")
+    parser.add_argument("root", nargs="?", default=".",
+                        help="Directory searched for out_jobs.csv and AccaSim sched-*.swf files")
+    parser.add_argument("--store", default="results_store", help="Output store directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="Re-ingest runs that are already up to date")
+    parser.add_argument("--traces", action="store_true", help="Also ingest out_schedule.trace as host state intervals")
+    args = parser.parse_args()
+
+    runs = discover_runs(args.root)
+    written = ingest(runs, args.store, args.workers, args.force, args.traces)
+
+    print("\n--- Result Ingest Summary ---")
+    for run, tables in zip(runs, written):
+        print(f"{run['scheduler']:>20} seed={run['seed']:<4} workload={run['workload']:<12} "
+              + (", ".join(f"{table}: {rows} rows" for table, rows in tables.items()) or "up to date"))
+    print(f"Runs ingested: {len(runs)}")
+    print(f"Output saved to: {args.store}")
+    print("-----------------------------\n")
+
+
+if __name__ == "__main__":
+    main()
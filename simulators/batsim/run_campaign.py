@@ -0,0 +1,206 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from batsim_protocol import allocate_endpoints
+from result_cache import ResultCache, cache_key, tool_version
+
+DEFAULT_SCHEDULERS = ["easy_bf", "fcfs", "conservative_bf", "filler", "fcfs_fast", "easy_bf_fast"]
+SUMMARY_COLUMNS = ["scheduler", "status", "attempts", "wall_time", "batsim_max_rss_mb", "batsched_max_rss_mb",
+                   "endpoint", "run_dir"]
+
+
+def _reap(process):
+    """
+    Non-blocking wait that also returns the peak RSS (MB) of a finished process.
+
+    os.wait4 gives the resource usage of that one child, which getrusage(RUSAGE_CHILDREN)
+    cannot do while several simulations run concurrently. Returns None while running.
+    """
+    if process.returncode is not None:
+        return process.max_rss
+    pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    if pid == 0:
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux
+    process.max_rss = usage.ru_maxrss / 1024
+    return process.max_rss
+
+
+def _stop(process, grace=5.0):
+    if process.returncode is not None:
+        return
+    process.terminate()
+    deadline = time.monotonic() + grace
+    while _reap(process) is None:
+        if time.monotonic() > deadline:
+            process.kill()
+            deadline = float("inf")
+        time.sleep(0.05)
+
+
+def wait_until_listening(endpoint, process, timeout):
+    """
+    Returns True once something accepts connections on a ZMQ tcp:// or ipc:// endpoint.
+
+    Probes by connecting, with a short exponential backoff, instead of polling a
+    socket file once per second. Returns False if `process` exits or `timeout` passes.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while time.monotonic() < deadline:
+        if _reap(process) is not None:
+            return False
+        try:
+            if endpoint.startswith("ipc://"):
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(endpoint[len("ipc://"):])
+            else:
+                host, port = endpoint[len("tcp://"):].rsplit(":", 1)
+                socket.create_connection((host, int(port)), timeout=1.0).close()
+            return True
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    return False
+
+
+def _attempt(scheduler, run_dir, bind_endpoint, connect_endpoint, args):
+    """One batsched + Batsim pair: start the scheduler, wait until it listens, run Batsim, supervise both."""
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    with open(os.path.join(run_dir, "batsched.log"), "w") as sched_log, \
+            open(os.path.join(run_dir, "batsim.log"), "w") as sim_log:
+        batsched = subprocess.Popen([args.batsched, "-v", scheduler, "-s", bind_endpoint],
+                                    stdout=sched_log, stderr=subprocess.STDOUT)
+        batsched.max_rss = None
+        batsim = None
+        try:
+            if not wait_until_listening(connect_endpoint, batsched, args.ready_timeout):
+                if batsched.returncode is not None:
+                    return f"batsched exited with code {batsched.returncode} before listening", batsched, batsim
+                return f"batsched not listening after {args.ready_timeout:.0f}s", batsched, batsim
+
+            batsim = subprocess.Popen([args.batsim, "-p", args.platform, "-w", args.workload,
+                                       "-s", connect_endpoint, "-e", os.path.join(run_dir, "out")],
+                                      stdout=sim_log, stderr=subprocess.STDOUT)
+            batsim.max_rss = None
+            deadline = time.monotonic() + args.timeout
+            while not all([_reap(batsim) is not None, _reap(batsched) is not None]):
+                if batsched.returncode not in (None, 0) or batsim.returncode not in (None, 0):
+                    break
+                if time.monotonic() > deadline:
+                    return f"timed out after {args.timeout:.0f}s", batsched, batsim
+                time.sleep(0.1)
+            for name, process in (("batsim", batsim), ("batsched", batsched)):
+                if process.returncode not in (None, 0):
+                    return f"{name} exited with code {process.returncode}", batsched, batsim
+            return "ok", batsched, batsim
+        finally:
+            for process in (batsim, batsched):
+                if process is not None:
+                    _stop(process)
+
+
+def run_key(scheduler, args, versions):
+    """Cache key of one run: platform and workload contents, batsched variant and tool versions."""
+    return cache_key([args.platform, args.workload], scheduler=scheduler, batsim=versions["batsim"],
+                     batsched=versions["batsched"])
+
+
+def run_one(index, scheduler, args, nb_runs, cache=None, versions=None):
+    """
+    Runs one scheduler, retrying failed attempts on a fresh endpoint.
+
+    Timeouts are not retried: a simulation that ran out of time would only run out again.
+    With a `cache`, a run whose inputs were already simulated is restored instead.
+    """
+    run_dir = os.path.join(args.results_dir, f"{scheduler}_results")
+    started = time.perf_counter()
+    metadata = {"scheduler": scheduler, "seed": 0, "workload": "default"}
+    key = run_key(scheduler, args, versions) if cache is not None else None
+    if key is not None:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        if cache.restore(key, run_dir):
+            with open(os.path.join(run_dir, "run.json"), "w") as f:
+                json.dump(metadata, f)
+            return dict(dict.fromkeys(SUMMARY_COLUMNS), scheduler=scheduler, status="cached", attempts=0,
+                        wall_time=round(time.perf_counter() - started, 3), run_dir=run_dir)
+    for attempt in range(1, args.retries + 2):
+        # Later attempts move past every endpoint of the first round, in case a port was taken
+        bind_endpoint, connect_endpoint = allocate_endpoints(index + (attempt - 1) * nb_runs,
+                                                             args.transport, args.base_port)
+        status, batsched, batsim = _attempt(scheduler, run_dir, bind_endpoint, connect_endpoint, args)
+        if status == "ok" or status.startswith("timed out"):
+            break
+    with open(os.path.join(run_dir, "run.json"), "w") as f:
+        json.dump(metadata, f)
+    if key is not None and status == "ok":
+        cache.store(key, run_dir, dict(metadata, platform=args.platform, workload_file=args.workload))
+    return {
+        "scheduler": scheduler,
+        "status": status,
+        "attempts": attempt,
+        "wall_time": round(time.perf_counter() - started, 3),
+        "batsim_max_rss_mb": None if batsim is None else round(batsim.max_rss or 0, 1),
+        "batsched_max_rss_mb": round(batsched.max_rss or 0, 1),
+        "endpoint": connect_endpoint,
+        "run_dir": run_dir
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batsched variants against Batsim concurrently")
+    parser.add_argument("--schedulers", nargs="+", default=DEFAULT_SCHEDULERS, help="batsched variants (-v)")
+    parser.add_argument("-p", "--platform", default="/tmp/batsim-src-stable/platforms/cluster512.xml")
+    parser.add_argument("-w", "--workload", default="sample_workload.json")
+    parser.add_argument("--results-dir", default=".", help="Each variant writes to <results-dir>/<variant>_results")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Simulations running concurrently (default: one per core)")
+    parser.add_argument("--transport", choices=["tcp", "ipc"], default="tcp")
+    parser.add_argument("--base-port", type=int, default=28000, help="First TCP port; run i uses base-port + i")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="Seconds before a simulation is killed")
+    parser.add_argument("--ready-timeout", type=float, default=30.0,
+                        help="Seconds to wait for batsched to accept connections")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts for a failed run")
+    parser.add_argument("--batsim", default="batsim", help="Batsim executable")
+    parser.add_argument("--batsched", default="batsched", help="batsched executable")
+    parser.add_argument("--cache", help="Result cache directory; runs with unchanged inputs are not simulated again")
+    parser.add_argument("--cache-size", type=float, default=20.0, help="Cache size limit in GB (LRU eviction)")
+    args = parser.parse_args()
+
+    cache = versions = None
+    if args.cache:
+        cache = ResultCache(args.cache, max_bytes=int(args.cache_size * 1024 ** 3))
+        versions = {"batsim": tool_version(args.batsim), "batsched": tool_version(args.batsched)}
+
+    print(f"\n=== Running {len(args.schedulers)} simulations on {args.workers} workers ===")
+    results = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_one, index, scheduler, args, len(args.schedulers), cache, versions)
+                   for index, scheduler in enumerate(args.schedulers)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{result['scheduler']}] {result['status']} in {result['wall_time']:.1f}s "
+                  f"(attempts: {result['attempts']}, batsim RSS: {result['batsim_max_rss_mb']} MB, "
+                  f"batsched RSS: {result['batsched_max_rss_mb']} MB)")
+
+    summary_path = os.path.join(args.results_dir, "campaign_runs.csv")
+    with open(summary_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda result: args.schedulers.index(result["scheduler"])))
+    failed = [result for result in results if result["status"] not in ("ok", "cached")]
+    print(f"\n{len(results) - len(failed)} ok, {len(failed)} failed. Per-run summary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from generate_workload import RETURN_CODES
+
+SACCT_COLUMNS = ["UID", "JobIDRaw", "TimelimitRaw", "Submit", "Start", "End", "State", "ElapsedRaw", "QOS",
+                 "NNodes", "Restarts"]
+DEFAULT_CHUNK_SIZE = 200_000
+
+# Same status codes as accasim/generate_workload.py
+SWF_STATUS_CODES = {
+    "completed": 1,
+    "failed": 5,
+    "killed": 6,
+    "timeout": 7,
+    "cancelled": 8,
+    "node_failure": 9
+}
+# sacct State (first word, "CANCELLED by 1016" -> CANCELLED) -> (SWF status, Batsim profile return code)
+STATE_CODES = {
+    "COMPLETED": (SWF_STATUS_CODES["completed"], 0),
+    "FAILED": (SWF_STATUS_CODES["failed"], RETURN_CODES["general"]),
+    "BOOT_FAIL": (SWF_STATUS_CODES["failed"], RETURN_CODES["critical"]),
+    "OUT_OF_MEMORY": (SWF_STATUS_CODES["failed"], RETURN_CODES["critical"]),
+    "NODE_FAIL": (SWF_STATUS_CODES["node_failure"], RETURN_CODES["critical"]),
+    "TIMEOUT": (SWF_STATUS_CODES["timeout"], RETURN_CODES["timeout"]),
+    "DEADLINE": (SWF_STATUS_CODES["timeout"], RETURN_CODES["timeout"]),
+    "CANCELLED": (SWF_STATUS_CODES["cancelled"], RETURN_CODES["cancelled"]),
+    "PREEMPTED": (SWF_STATUS_CODES["killed"], RETURN_CODES["cancelled"]),
+}
+UNKNOWN_STATE = (SWF_STATUS_CODES["failed"], RETURN_CODES["general"])
+SWF_HEADER = [
+    "; Workload converted from a sacct export by sacct_workload.py",
+    "; Fields:",
+    "; 1.JobID 2.SubmitTime 3.WaitTime 4.RunTime 5.NumAllocatedProcessors",
+    "; 6.AvgCPUTimeUsed 7.UsedMemory 8.RequestedProcessors 9.RequestedTime",
+    "; 10.RequestedMemory 11.Status 12.UserID 13.GroupID 14.Executable",
+    "; 15.Queue 16.Partition 17.PrecedingJob 18.ThinkTime",
+]
+
+
+def _read_chunks(paths, chunk_size, columns=SACCT_COLUMNS):
+    for path in paths:
+        yield from pd.read_csv(path, usecols=lambda c: c in columns, dtype={"JobIDRaw": str, "QOS": str},
+                               chunksize=chunk_size)
+
+
+def _parse_times(values):
+    # "Unknown" / "None" (never started or still running) become NaT
+    return pd.to_datetime(values, format="%Y-%m-%dT%H:%M:%S", errors="coerce")
+
+
+def first_submit(paths, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Earliest Submit of the exports (one pass over that column only): time 0 of the workload."""
+    earliest = pd.NaT
+    for chunk in _read_chunks(paths, chunk_size, ["Submit", "JobIDRaw"]):
+        submit = _parse_times(chunk["Submit"]).min()
+        earliest = submit if pd.isna(earliest) or submit < earliest else earliest
+    return earliest
+
+
+def _merge_attempts(df):
+    """
+    One row per job from the rows of its requeue chain.
+
+    Requeues show up two ways: sacct --duplicates lists each attempt under the same
+    JobIDRaw, while a plain export has one row whose Restarts counts the requeues.
+    The job keeps the first Submit and the last attempt's start, end, state, elapsed
+    time and size, and its attempts are whichever of the two counts is larger. The
+    node-seconds of earlier attempts are kept as waste, which only duplicate rows
+    record (a plain export only has the last attempt's elapsed time).
+    """
+    df = df.sort_values(["JobIDRaw", "Start"], kind="stable", na_position="first")
+    grouped = df.groupby("JobIDRaw", sort=False)
+    last = grouped.tail(1).set_index("JobIDRaw")
+    node_seconds = df["ElapsedRaw"] * df["NNodes"]
+    total = node_seconds.groupby(df["JobIDRaw"], sort=False).sum()
+    last["Submit"] = grouped["Submit"].min()
+    restarts = pd.to_numeric(last["Restarts"], errors="coerce").fillna(0) if "Restarts" in last else 0
+    last["attempts"] = np.maximum(grouped.size(), restarts + 1)
+    last["wasted_node_seconds"] = total - node_seconds.loc[grouped.tail(1).index].to_numpy()
+    return last.reset_index()
+
+
+def iter_jobs(paths, origin, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields DataFrames of merged, typed jobs in chunks.
+
+    Job steps (JobIDRaw "457.batch") are dropped, times are seconds since `origin`,
+    TimelimitRaw (minutes) becomes seconds and each job gets its SWF status and
+    Batsim return code. A requeue chain split across two chunks is held back until
+    its last row is read, which assumes (as sacct prints them) that the rows of a
+    job are adjacent.
+    """
+    carry = None
+    for chunk in _read_chunks(paths, chunk_size):
+        chunk = chunk[~chunk["JobIDRaw"].str.contains(".", regex=False)]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        held = chunk["JobIDRaw"] == chunk["JobIDRaw"].iloc[-1]
+        carry, chunk = chunk[held], chunk[~held]
+        if not chunk.empty:
+            yield _convert(chunk, origin)
+    if carry is not None and not carry.empty:
+        yield _convert(carry, origin)
+
+
+def _convert(chunk, origin):
+    chunk = chunk.assign(Submit=_parse_times(chunk["Submit"]), Start=_parse_times(chunk["Start"]),
+                         End=_parse_times(chunk["End"]),
+                         ElapsedRaw=pd.to_numeric(chunk["ElapsedRaw"], errors="coerce").fillna(0),
+                         NNodes=pd.to_numeric(chunk["NNodes"], errors="coerce").fillna(0))
+    jobs = _merge_attempts(chunk)
+    state = jobs["State"].str.split(n=1).str[0].fillna("UNKNOWN")
+    codes = state.map(lambda s: STATE_CODES.get(s, UNKNOWN_STATE))
+    timelimit = pd.to_numeric(jobs["TimelimitRaw"], errors="coerce")
+    return pd.DataFrame({
+        "job_id": jobs["JobIDRaw"].astype(np.int64),
+        "user_id": pd.to_numeric(jobs["UID"], errors="coerce").fillna(-1).astype(np.int64),
+        "qos": jobs["QOS"].fillna("normal"),
+        "state": state,
+        "submit": (jobs["Submit"] - origin).dt.total_seconds(),
+        "wait": (jobs["Start"] - jobs["Submit"]).dt.total_seconds(),
+        "run_time": jobs["ElapsedRaw"].astype(np.int64),
+        "nodes": jobs["NNodes"].astype(np.int64),
+        # Unlimited / unknown time limits fall back to the elapsed time
+        "walltime": (timelimit * 60).fillna(jobs["ElapsedRaw"]).astype(np.int64),
+        "swf_status": codes.str[0].astype(np.int64),
+        "return_code": codes.str[1].astype(np.int64),
+        "attempts": jobs["attempts"].astype(np.int64),
+        "wasted_node_seconds": jobs["wasted_node_seconds"],
+        "started": jobs["Start"].notna()
+    })
+
+
+def write_swf(f, jobs, qos_codes, cores_per_node=1):
+    """Appends the started jobs of one chunk as SWF lines; Queue is the QOS number in `qos_codes`."""
+    jobs = jobs[jobs["started"]].sort_values("submit", kind="stable")
+    processors = jobs["nodes"] * cores_per_node
+    for qos in jobs["qos"].unique():
+        qos_codes.setdefault(qos, len(qos_codes) + 1)
+    columns = [
+        jobs["job_id"], jobs["submit"].round().astype(np.int64), jobs["wait"].round().astype(np.int64),
+        jobs["run_time"], processors, pd.Series(-1, index=jobs.index), pd.Series(-1, index=jobs.index),
+        processors, jobs["walltime"], pd.Series(-1, index=jobs.index), jobs["swf_status"], jobs["user_id"],
+        pd.Series(-1, index=jobs.index), pd.Series(-1, index=jobs.index), jobs["qos"].map(qos_codes),
+        pd.Series(1, index=jobs.index), pd.Series(-1, index=jobs.index), pd.Series(-1, index=jobs.index)
+    ]
+    pd.concat(columns, axis=1).to_csv(f, sep=" ", header=False, index=False)
+
+
+def delay_profile_names(jobs):
+    """Delay profile of each job, sized by its ElapsedRaw and carrying its return code."""
+    seconds = jobs["run_time"].clip(lower=1).astype(str)
+    return ("delay_" + seconds + "s").where(jobs["return_code"] == 0,
+                                            "delay_" + seconds + "s_ret" + jobs["return_code"].astype(str))
+
+
+def write_batsim_jobs(f, jobs, profiles, first):
+    """Appends the started jobs of one chunk to an open "jobs" JSON array; returns the largest request."""
+    jobs = jobs[jobs["started"]].sort_values("submit", kind="stable")
+    names = delay_profile_names(jobs)
+    for name, run_time, return_code in zip(names.unique(), *[jobs.loc[~names.duplicated(), column]
+                                                               for column in ("run_time", "return_code")]):
+        if name not in profiles:
+            profiles[name] = {"type": "delay", "delay": float(max(run_time, 1))}
+            if return_code:
+                profiles[name]["ret"] = int(return_code)
+    lines = ('{"id": "' + jobs["job_id"].astype(str) + '", "subtime": ' + jobs["submit"].astype(str)
+             + ', "walltime": ' + jobs["walltime"].astype(str) + ', "res": ' + jobs["nodes"].astype(str)
+             + ', "profile": "' + names + '", "qos": ' + jobs["qos"].map(json.dumps)
+             + ', "user": "' + jobs["user_id"].astype(str) + '"}')
+    if len(lines):
+        f.write(("" if first else ",\n") + ",\n".join(lines))
+    return int(jobs["nodes"].max()) if len(jobs) else 0
+
+
+def convert(paths, swf_path=None, json_path=None, nb_res=None, cores_per_node=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Streams sacct exports into an SWF and/or a Batsim JSON workload; returns conversion counts."""
+    origin = first_submit(paths, chunk_size)
+    swf = open(swf_path, "w") if swf_path else None
+    batsim = open(json_path, "w") if json_path else None
+    qos_codes, profiles = {}, {}
+    counts = {"jobs": 0, "not_started": 0, "requeued": 0, "wasted_node_seconds": 0.0, "states": {}}
+    max_res, first = 0, True
+    try:
+        if swf:
+            swf.write("\n".join(SWF_HEADER) + "\n")
+        if batsim:
+            batsim.write('{"jobs": [\n')
+        for jobs in iter_jobs(paths, origin, chunk_size):
+            counts["jobs"] += int(jobs["started"].sum())
+            counts["not_started"] += int((~jobs["started"]).sum())
+            counts["requeued"] += int((jobs["attempts"] > 1).sum())
+            counts["wasted_node_seconds"] += float(jobs["wasted_node_seconds"].sum())
+            for state, count in jobs.loc[jobs["started"], "state"].value_counts().items():
+                counts["states"][state] = counts["states"].get(state, 0) + int(count)
+            if swf:
+                write_swf(swf, jobs, qos_codes, cores_per_node)
+            if batsim:
+                max_res = max(max_res, write_batsim_jobs(batsim, jobs, profiles, first))
+                first = first and not jobs["started"].any()
+        if swf and qos_codes:
+            swf.write("; Queue numbers: " + ", ".join(f"{code}={qos}" for qos, code in qos_codes.items()) + "\n")
+        if batsim:
+            batsim.write('\n],\n"profiles": ' + json.dumps(profiles, indent=2)
+                         + f',\n"nb_res": {nb_res or max_res}}}\n')
+    finally:
+        for f in (swf, batsim):
+            if f is not None:
+                f.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert sacct CSV exports to SWF and Batsim JSON workloads")
+    parser.add_argument("inputs", nargs="+", help="sacct CSV exports (curatedjobsdata.csv or raw jobsdata.csv)")
+    parser.add_argument("--swf", help="Output SWF file (e.g. for AccaSim)")
+    parser.add_argument("--json", help="Output Batsim JSON workload")
+    parser.add_argument("--nb-res", type=int, default=None, help="nb_res of the Batsim workload (default: largest job)")
+    parser.add_argument("--cores-per-node", type=int, default=1, help="SWF processors per node")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="sacct rows read at a time")
+    args = parser.parse_args()
+    if not args.swf and not args.json:
+        parser.error("give --swf and/or --json")
+
+    counts = convert(args.inputs, args.swf, args.json, args.nb_res, args.cores_per_node, args.chunk_size)
+    print(f"{counts['jobs']} jobs converted ({counts['not_started']} never started and skipped), "
+          f"{counts['requeued']} requeued jobs ({counts['wasted_node_seconds']:.0f} node-seconds "
+          f"in earlier attempts listed by sacct --duplicates)")
+    print("States: " + ", ".join(f"{state}={count}" for state, count in sorted(counts["states"].items())))
+
+
+if __name__ == "__main__":
+    main()
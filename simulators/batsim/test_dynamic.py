@@ -1,126 +1,141 @@
 import zmq
-import json
-import random
 import argparse
+import logging
+from itertools import takewhile
+
+from batsim_protocol import (
+    DEFAULT_CHUNK_SIZE,
+    MessageRecorder,
+    RegistrationBatcher,
+    execute_job_event,
+    interval_set,
+    notify_event,
+    register_job_event,
+    register_profile_event,
+    serve,
+)
+from job_generators import DependencyTracker, add_generator_arguments, delay_profile, jobs_from_arguments
+from online_metrics import DEFAULT_INTERVAL, OnlineMetrics
+from policy_queue import PolicyQueue
+
+logger = logging.getLogger("test_dynamic")
 
 def main():
     parser = argparse.ArgumentParser(description="Dynamic job server for Batsim")
-    parser.add_argument("--num-jobs", type=int, default=10, help="Number of jobs to generate")
+    parser.add_argument("--num-jobs", type=int, default=10, help="Number of jobs to generate (0 for unbounded)")
+    parser.add_argument("--until", type=float, default=None, help="Stop generating jobs after this simulation time")
     parser.add_argument("--min-walltime", type=float, default=10.0, help="Minimum job walltime")
     parser.add_argument("--max-walltime", type=float, default=15.0, help="Maximum job walltime")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Maximum number of REGISTER_JOB events per reply")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (DEBUG prints every event)")
+    parser.add_argument("--record", metavar="PATH", help="Record the protocol message stream to a JSONL file")
+    parser.add_argument("--metrics", metavar="PATH", help="Append online metric snapshots to a JSONL file")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Simulated seconds between metric snapshots")
+    parser.add_argument("--stop-on-convergence", type=float, metavar="TOL", default=None,
+                        help="Stop submitting jobs once mean waiting time and stretch change by less than TOL "
+                             "(relative) over --convergence-windows snapshots")
+    parser.add_argument("--convergence-windows", type=int, default=3)
+    add_generator_arguments(parser)
     args = parser.parse_args()
 
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+
     context = zmq.Context()
     socket = context.socket(zmq.REP)
     socket.bind("tcp://*:28000")
 
     workload_name = "dyn"
-    profile_name = "delay_15s"
-    profile_data = {"type": "delay", "delay": 15.0}
-
-    resource_count = 1
-    #TODO: add a way to either randomize or speciy num resources for jobs
-
-    # Generate jobs with random walltimes in given range and staggered subtime (0,1,2,...)
-    jobs = []
-    for i in range(args.num_jobs):
-        walltime = random.uniform(args.min_walltime, args.max_walltime)
-        jobs.append({
-            "id": f"{workload_name}!job{i+1}",
-            "profile": profile_name,
-            "res": 1,
-            "walltime": walltime,
-            "subtime": i  # stagger jobs by 1 time unit each
-        })
-
-
-    registered_profile = False
-    registered_jobs = set()
-    executed_jobs = set()
-    registration_finished_sent = False
 
-    while True:
-        msg = socket.recv()
-        message = json.loads(msg)
-
-        now = message["now"]
-        events = message["events"]
-        response = {"now": now, "events": []}
+    # Jobs are drawn lazily from the arrival process and size distributions, so
+    # only jobs that are due, blocked on parents or not yet completed live in memory
+    jobs = jobs_from_arguments(args, args.num_jobs or None, workload_name)
+    if args.until is not None:
+        jobs = takewhile(lambda job: job["subtime"] <= args.until, jobs)
 
+    batcher = RegistrationBatcher(jobs, args.chunk_size)
+    dependencies = DependencyTracker()
+    registered_profiles = set()
+    started = False
+    registration_finished_sent = False
+    # Jobs start first come, first served on the lowest free hosts
+    queue = PolicyQueue("fcfs")
+    free_hosts = []
+    nb_hosts = 0
+    running = {}
+    metrics = None
+    if args.metrics or args.stop_on_convergence is not None:
+        metrics = OnlineMetrics(args.metrics, args.metrics_interval, tolerance=args.stop_on_convergence,
+                                windows=args.convergence_windows)
+
+    def submit(now, job, response_events):
+        """Registers and queues `job`; returns the jobs its rejection unblocks."""
+        profile_name, profile_data = delay_profile(job)
+        if profile_name not in registered_profiles:
+            logger.info("[%.2f] Registering profile '%s'.", now, profile_name)
+            response_events.append(register_profile_event(now, workload_name, profile_name, profile_data))
+            registered_profiles.add(profile_name)
+        response_events.append(register_job_event(now, job))
+        if job["res"] > nb_hosts:
+            logger.warning("[%.2f] Rejecting %s: %d hosts requested, %d available.", now, job["id"], job["res"], nb_hosts)
+            response_events.append({"timestamp": now, "type": "REJECT_JOB", "data": {"job_id": job["id"]}})
+            return dependencies.complete(job["id"])
+        queue.push(job["id"], job["subtime"], job["walltime"], job["res"])
+        return []
+
+    def decide(now, events):
+        nonlocal started, registration_finished_sent, nb_hosts
+        response_events = []
+
+        ready = []
         for event in events:
-            etype = event["type"]
-            print(f"[{now:.2f}] Event received: {etype}")
-
-            if etype == "SIMULATION_BEGINS":
-                if not registered_profile:
-                    print(f"[{now:.2f}] Registering profile '{profile_name}' once.")
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "REGISTER_PROFILE",
-                        "data": {
-                            "workload_name": workload_name,
-                            "profile_name": profile_name,
-                            "profile": profile_data
-                        }
-                    })
-                    registered_profile = True
-
-            elif etype == "SIMULATION_ENDS":
-                print(f"[{now:.2f}] Simulation ended.")
-                response["events"] = []
-
-        # Only register and execute jobs after profile registered
-        if registered_profile:
-    # Register all jobs immediately if not registered yet
-            for job in jobs:
-                job_id = job["id"]
-
-                if job_id not in registered_jobs:
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "REGISTER_JOB",
-                        "data": {
-                            "job_id": job_id,
-                            "job": {
-                                "id": job_id,
-                                "profile": job["profile"],
-                                "res": job["res"],
-                                "walltime": job["walltime"],
-                                "subtime": job["subtime"]
-                            }
-                        }
-                    })
-                    registered_jobs.add(job_id)
-
-            # Execute jobs only when their subtime arrives
-            for job in jobs:
-                job_id = job["id"]
-                if job_id in registered_jobs and job_id not in executed_jobs and now >= job["subtime"]:
-                    response["events"].append({
-                        "timestamp": now,
-                        "type": "EXECUTE_JOB",
-                        "data": {
-                            "job_id": job_id,
-                            "alloc": "0"
-                        }
-                    })
-                    executed_jobs.add(job_id)
-
-            # Send registration_finished notification once all jobs registered
-            if (
-                len(registered_jobs) == len(jobs) and
-                not registration_finished_sent
-            ):
-                response["events"].append({
-                    "timestamp": now,
-                    "type": "NOTIFY",
-                    "data": {
-                        "type": "registration_finished"
-                    }
-                })
-                registration_finished_sent = True
-
-        socket.send_json(response)
+            data = event.get("data", {})
+            if event["type"] == "SIMULATION_BEGINS":
+                started = True
+                nb_hosts = data.get("nb_compute_resources", data.get("nb_resources", 1))
+                free_hosts[:] = range(nb_hosts)
+            elif event["type"] == "JOB_COMPLETED":
+                free_hosts.extend(running.pop(data["job_id"], ()))
+                ready.extend(dependencies.complete(data["job_id"]))
+
+        # Converged metrics: let the jobs already submitted drain and end the simulation
+        if metrics is not None and metrics.converged and not batcher.finished:
+            logger.info("[%.2f] Metrics converged, no more jobs are submitted.", now)
+            batcher.close()
+
+        # Only register and execute jobs once the simulation has begun
+        if started:
+            # Jobs whose subtime has arrived, a bounded chunk at a time; jobs with
+            # unfinished parents are held back until their last parent completes
+            for job in batcher.due(now):
+                ready.extend(dependencies.submit(job))
+            for job in ready:
+                ready.extend(submit(now, job, response_events))
+            free_hosts.sort()
+            for job_id, res, _ in queue.select(now, len(free_hosts)):
+                running[job_id] = free_hosts[:res]
+                del free_hosts[:res]
+                response_events.append(execute_job_event(now, job_id, interval_set(running[job_id])))
+
+            # Send registration_finished notification once every job is registered,
+            # otherwise ask Batsim to wake us up for the next arrivals
+            if batcher.finished:
+                if dependencies.nb_blocked == 0 and not registration_finished_sent:
+                    response_events.append(notify_event(now, "registration_finished"))
+                    registration_finished_sent = True
+            else:
+                wakeup = batcher.wakeup_event(now)
+                if wakeup is not None:
+                    response_events.append(wakeup)
+
+        return response_events
+
+    recorder = MessageRecorder(args.record) if args.record else None
+    serve(socket, decide, label="dyn", recorder=recorder, observer=metrics)
+    if recorder is not None:
+        recorder.close()
+    if metrics is not None:
+        metrics.close()
 
 if __name__ == "__main__":
     main()